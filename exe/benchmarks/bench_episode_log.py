@@ -0,0 +1,65 @@
+"""Games/sec of recording, replaying and streaming transitions from an episode log,
+against playing the same games through the rlcard env.
+
+    python -m exe.benchmarks.bench_episode_log --num_games 5000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import rlcard
+
+from src import rlcard_gpt_gen  # noqa: F401
+from src.rlcard_gpt_gen.agents.random_agent import RandomAgent
+from src.rlcard_gpt_gen.utils.episode_log import EpisodeReader, EpisodeWriter
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_games', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    num_games = args.num_games
+
+    env = rlcard.make('cambio', config={'seed': args.seed, 'fast_forward_scripted': False})
+    env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+    np.random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as path:
+        def play_and_record():
+            with EpisodeWriter(path) as writer:
+                for _ in range(num_games):
+                    env.run(is_training=True)
+                    writer.record(env.game)
+
+        def play():
+            for _ in range(num_games):
+                env.run(is_training=True)
+
+        reader = None
+
+        def replay():
+            for k in range(num_games):
+                reader.replay(k)
+
+        def stream():
+            for k in range(num_games):
+                for _ in reader.transitions(k, 0):
+                    pass
+
+        results = [('env run', timed(play)), ('env run + record', timed(play_and_record))]
+        reader = EpisodeReader(path)
+        results += [('replay', timed(replay)), ('replay transitions', timed(stream))]
+
+        num_actions = int(reader.index['num_actions'].sum())
+        size = sum(len(reader._chunk(c)) for c in np.unique(reader.index['chunk'])) + reader.index.nbytes
+        print('{} games, {} actions, {:.1f} bytes/game on disk'.format(num_games, num_actions, size / num_games))
+        for name, elapsed in results:
+            print('{:>20} {:>10.0f} games/s'.format(name, num_games / elapsed))
@@ -0,0 +1,112 @@
+"""Step cost of full-rules games (games.full_rules_game) against the simplified game.
+
+Random legal actions are played on the game core ('game us/step': apply_action
+and legal actions) and through CambioCoreEnv with the vector observation
+('env us/step': also building every state). The full-rules game runs with
+the per-rank stick index and with a scan of every hand; 'eligible ns' times
+one stick eligibility check on the live game, index against scan.
+
+The index only pays off on that isolated check (about 0.8-1 us against 3-8
+us for the scan, growing with the table). The check runs once per played
+card, so end to end the index saves 1-1.5 us of a ~20 us game step at best,
+within run-to-run noise: index and scan steps are about the same. A
+full-rules game step costs 1.5-2x the simplified one (~19-21 against 11-13
+us) and an env step about 2x (53-73 against 33-35 us), mostly the larger
+observation and the extra stick and ability decisions.
+
+    python -m exe.benchmarks.bench_full_rules
+    python -m exe.benchmarks.bench_full_rules --tables 3x4,8x8 --games 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.rlcard_gpt_gen.agents.random_agent import RandomAgent
+from src.rlcard_gpt_gen.envs.core_env import CambioCoreEnv
+from src.rlcard_gpt_gen.games.full_rules_game import FullRulesCambioGame, NUM_RANKS
+from src.rlcard_gpt_gen.games.game import CambioGame
+from src.rlcard_gpt_gen.utils.profiling import perf_counter_ns
+
+MAX_GAME_STEPS = 1000
+
+
+def bench_game(game, num_games, seed):
+    rng = np.random.default_rng(seed)
+    steps = sticks = penalties = 0
+    start = time.perf_counter()
+    for i in range(num_games):
+        game.init_game(seed=seed + i)
+        for _ in range(MAX_GAME_STEPS):
+            if game.is_over():
+                break
+            legal_actions = game.get_legal_action_ids()
+            game.apply_action(legal_actions[rng.integers(len(legal_actions))])
+            steps += 1
+        sticks += getattr(game, 'num_sticks', 0)
+        penalties += getattr(game, 'num_penalties', 0)
+    seconds = time.perf_counter() - start
+    return {'us_per_step': seconds / steps * 1e6, 'steps_per_game': steps / num_games,
+            'sticks_per_game': sticks / num_games, 'penalties_per_game': penalties / num_games}
+
+
+def bench_eligibility(game, num_games, seed, checks_per_step=4):
+    """Mean ns of stick_eligible with the index and with the scan, on the states of random games"""
+    rng = np.random.default_rng(seed)
+    ns = {True: 0, False: 0}
+    checks = 0
+    for i in range(num_games):
+        game.init_game(seed=seed + i)
+        for _ in range(MAX_GAME_STEPS):
+            if game.is_over():
+                break
+            for _ in range(checks_per_step):
+                rank, excluded = int(rng.integers(NUM_RANKS)), int(rng.integers(game.num_players))
+                for stick_index in (True, False):
+                    game.stick_index = stick_index
+                    start = perf_counter_ns()
+                    game.stick_eligible(rank, excluded)
+                    ns[stick_index] += perf_counter_ns() - start
+                checks += 1
+            legal_actions = game.get_legal_action_ids()
+            game.apply_action(legal_actions[rng.integers(len(legal_actions))])
+    game.stick_index = True
+    return ns[True] / checks, ns[False] / checks
+
+
+def bench_env(config, num_games, seed):
+    env = CambioCoreEnv(dict(config, seed=seed, fast_forward_scripted=False))
+    env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+    np.random.seed(seed)
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(num_games):
+        trajectories, _ = env.run()
+        steps += sum(len(trajectory) // 2 for trajectory in trajectories)
+    return (time.perf_counter() - start) / steps * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tables', type=str, default='3x4,5x4,8x8', help='players x hand size')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print('{:>5} {:>14} {:>12} {:>11} {:>11} {:>8} {:>10} {:>12}'.format(
+        'table', 'engine', 'game us/step', 'env us/step', 'steps/game', 'sticks', 'penalties', 'eligible ns'))
+    for table in args.tables.split(','):
+        num_players, hand_size = (int(n) for n in table.split('x'))
+        engines = [
+            ('simplified', CambioGame(num_players, hand_size), {}),
+            ('full, index', FullRulesCambioGame(num_players, hand_size), {'game_full_rules': True}),
+            ('full, scan', FullRulesCambioGame(num_players, hand_size, stick_index=False), None),
+        ]
+        index_ns, scan_ns = bench_eligibility(engines[1][1], max(1, args.games // 10), args.seed)
+        for name, game, env_config in engines:
+            stats = bench_game(game, args.games, args.seed)
+            env_us = '' if env_config is None else '{:.1f}'.format(bench_env(
+                dict(env_config, game_num_players=num_players, game_hand_size=hand_size), args.games, args.seed))
+            eligible = {'full, index': '{:.0f}'.format(index_ns), 'full, scan': '{:.0f}'.format(scan_ns)}.get(name, '')
+            print('{:>5} {:>14} {us_per_step:>12.2f} {:>11} {steps_per_game:>11.1f} {sticks_per_game:>8.2f} '
+                  '{penalties_per_game:>10.2f} {:>12}'.format(table, name, env_us, eligible, **stats))
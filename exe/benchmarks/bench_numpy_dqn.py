@@ -0,0 +1,112 @@
+"""NumpyDQNAgent against rlcard's torch DQNAgent: latency per batch size, Q error, and worker memory.
+
+Latency is the median time of one greedy forward pass on a batch of env
+observations. Memory is the resident set (VmRSS) of a fresh worker process
+that loads the policy and answers one batch: what every evaluation or
+serving worker pays before doing any work.
+
+    python -m exe.benchmarks.bench_numpy_dqn
+    python -m exe.benchmarks.bench_numpy_dqn --checkpoint_path models/cambio_dqn --batch_sizes 1,16,512
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+from rlcard.agents import DQNAgent
+
+from exe.export_dqn import collect_obs
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.numpy_dqn_agent import WEIGHT_DTYPES, NumpyDQNAgent, export_qnet
+
+# Prints the VmRSS in KB of a worker that loaded the policy and ran one batch
+_WORKER_SNIPPET = '''
+import numpy as np
+from src.rlcard_gpt_gen.agents.batched import batch_eval_step
+{load}
+batch_eval_step(policy, np.zeros((64, {state_dim}), dtype=np.float32), np.ones((64, {num_actions}), dtype=bool))
+with open('/proc/self/status') as f:
+    print(next(line.split()[1] for line in f if line.startswith('VmRSS')))
+'''
+_TORCH_LOAD = '''
+import torch
+from rlcard.agents import DQNAgent
+policy = DQNAgent.from_checkpoint(torch.load({path!r}, weights_only=False))
+'''
+_NUMPY_LOAD = '''
+from src.rlcard_gpt_gen.agents.numpy_dqn_agent import NumpyDQNAgent
+policy = NumpyDQNAgent({path!r})
+'''
+
+
+def median_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def worker_rss_mb(load, state_dim, num_actions):
+    snippet = _WORKER_SNIPPET.format(load=load, state_dim=state_dim, num_actions=num_actions)
+    output = subprocess.run([sys.executable, '-c', snippet], check=True, capture_output=True, text=True).stdout
+    return int(output.split()[-1]) / 1024
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checkpoint_path', type=str, default=None, help='Untrained network of --mlp_layers without one')
+    parser.add_argument('--mlp_layers', type=str, default='64,64')
+    parser.add_argument('--batch_sizes', type=str, default='1,8,64,256')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--obs_mode', type=str, default='vector')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    workdir = tempfile.mkdtemp()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.checkpoint_path:
+            path = args.checkpoint_path
+            if os.path.isdir(path):
+                path = os.path.join(path, 'checkpoint_dqn.pt')
+            agent = DQNAgent.from_checkpoint(torch.load(path, weights_only=False))
+        else:
+            obs = collect_obs(args.obs_mode, 1, args.seed)
+            agent = DQNAgent(num_actions=config.NUM_ACTIONS, state_shape=[obs.shape[1]],
+                             mlp_layers=[int(n) for n in args.mlp_layers.split(',')])
+        agent.save_checkpoint(workdir)
+    checkpoint = os.path.join(workdir, 'checkpoint_dqn.pt')
+
+    obs = collect_obs(args.obs_mode, 200, args.seed)
+    expected = agent.q_estimator.predict_nograd(obs)
+    policies = {'torch': None}
+    for dtype in WEIGHT_DTYPES:
+        path = os.path.join(workdir, dtype + '.npz')
+        export_qnet(agent, path, dtype)
+        policies[dtype] = NumpyDQNAgent(path)
+
+    batch_sizes = [int(n) for n in args.batch_sizes.split(',')]
+    print('{:>8} {:>8} {:>8}  {}'.format('policy', 'max err', 'argmax', '  '.join('{:>9}'.format('b={} us'.format(b)) for b in batch_sizes)))
+    for name, policy in policies.items():
+        if policy is None:
+            predict, error, agreement = agent.q_estimator.predict_nograd, 0.0, 1.0
+        else:
+            predict = policy.network.predict
+            q_values = predict(obs)
+            error = np.abs(q_values - expected).max()
+            agreement = np.mean(q_values.argmax(1) == expected.argmax(1))
+        latencies = [median_seconds(lambda: predict(obs[:batch_size]), args.repeat) * 1e6 for batch_size in batch_sizes]
+        print('{:>8} {:>8.2g} {:>8.2%}  {}'.format(name, error, agreement, '  '.join('{:>9.1f}'.format(us) for us in latencies)))
+
+    print('\nWorker RSS after loading the policy and answering one batch:')
+    state_dim, num_actions = obs.shape[1], expected.shape[1]
+    print('{:>8} {:>8.1f} MB'.format('torch', worker_rss_mb(_TORCH_LOAD.format(path=checkpoint), state_dim, num_actions)))
+    print('{:>8} {:>8.1f} MB'.format('numpy', worker_rss_mb(_NUMPY_LOAD.format(path=os.path.join(workdir, 'float32.npz')), state_dim, num_actions)))
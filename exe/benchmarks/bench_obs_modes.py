@@ -0,0 +1,46 @@
+"""Encoding cost per step of each CambioEnv obs_mode, measured with the env profiler.
+
+    python -m exe.benchmarks.bench_obs_modes --num_episodes 2000
+"""
+import argparse
+
+import numpy as np
+import rlcard
+
+from src import rlcard_gpt_gen  # noqa: F401
+from src.rlcard_gpt_gen.agents.random_agent import RandomAgent
+from src.rlcard_gpt_gen.utils.profiling import Profiler
+
+
+def bench(obs_mode, num_episodes, seed):
+    env = rlcard.make('cambio', config={'seed': seed, 'obs_mode': obs_mode, 'fast_forward_scripted': False})
+    env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+    np.random.seed(seed)
+
+    profiler = Profiler()
+    env.profiler = profiler
+    for _ in range(num_episodes):
+        env.run()
+    summary = profiler.summary()
+    obs = env.get_state(env.get_player_id())['obs']
+    return {
+        'obs_mode': obs_mode,
+        'shape': 'x'.join(str(d) for d in obs.shape),
+        'bytes': obs.nbytes,
+        'encode_us': summary['encode_us'],
+        'get_state_us': summary['get_state_us'],
+        'steps_per_sec': summary['env_steps_per_s'],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--obs_modes', type=str, default='vector,incremental,planes')
+    parser.add_argument('--num_episodes', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print('{:>12} {:>8} {:>6} {:>10} {:>13} {:>10}'.format('obs_mode', 'shape', 'bytes', 'encode us', 'get_state us', 'steps/s'))
+    for obs_mode in args.obs_modes.split(','):
+        result = bench(obs_mode, args.num_episodes, args.seed)
+        print('{obs_mode:>12} {shape:>8} {bytes:>6} {encode_us:>10.1f} {get_state_us:>13.1f} {steps_per_sec:>10.0f}'.format(**result))
@@ -0,0 +1,93 @@
+"""Evaluation speed of frozen DQN policies with and without CachedPolicy.
+
+Each row plays --games evaluation games on fresh deals with an empty cache
+(cold), again on fresh deals keeping the cache (warm), as a frozen opponent or
+a served bot would across evaluations, and finally replays the warm deals
+(replay), as the fixed evaluation seeds of a training run do. Speedup is
+uncached over warm time. Keys and lookups cost about a microsecond per
+decision, so the cache only pays off when the hit rate times the forward
+pass cost beats that: large networks, or repeated deals. The DQN seats are
+an untrained network of --mlp_layers (or --checkpoint_path), run by torch or
+by NumpyDQNAgent; in the always_draw rows only seat 0 is a DQN.
+
+    python -m exe.benchmarks.bench_policy_cache
+    python -m exe.benchmarks.bench_policy_cache --games 2000 --mlp_layers 256,256
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import torch
+from rlcard.agents import DQNAgent
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.always_draw_agent import AlwaysDrawAgent
+from src.rlcard_gpt_gen.agents.cached_policy import CachedPolicy
+from src.rlcard_gpt_gen.agents.numpy_dqn_agent import NumpyDQNAgent, export_qnet
+from src.rlcard_gpt_gen.envs.obs_encoder import OBS_DIM
+from src.rlcard_gpt_gen.utils.evaluation import Evaluator
+
+
+def make_agents(checkpoint_path, mlp_layers, num_players):
+    with contextlib.redirect_stdout(io.StringIO()):
+        if checkpoint_path:
+            if os.path.isdir(checkpoint_path):
+                checkpoint_path = os.path.join(checkpoint_path, 'checkpoint_dqn.pt')
+            checkpoint = torch.load(checkpoint_path, weights_only=False)
+            return [DQNAgent.from_checkpoint(checkpoint) for _ in range(num_players)]
+        return [DQNAgent(num_actions=config.NUM_ACTIONS, state_shape=[OBS_DIM], mlp_layers=mlp_layers)
+                for _ in range(num_players)]
+
+
+def run(evaluator, agents, num_games, seed):
+    """Seconds to evaluate num_games deals starting at seed"""
+    evaluator.seed = seed
+    start = time.perf_counter()
+    evaluator.evaluate(agents, num_games)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=1000, help='Games per pass')
+    parser.add_argument('--num_envs', type=int, default=32)
+    parser.add_argument('--checkpoint_path', type=str, default=None)
+    parser.add_argument('--mlp_layers', type=str, default='64,64')
+    parser.add_argument('--max_size', type=int, default=100000, help='Cache entries per policy')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    dqn_agents = make_agents(args.checkpoint_path, [int(n) for n in args.mlp_layers.split(',')], config.N_PLAYERS)
+    workdir = tempfile.mkdtemp()
+    numpy_agents = []
+    for i, agent in enumerate(dqn_agents):
+        path = os.path.join(workdir, '{}.npz'.format(i))
+        export_qnet(agent, path)
+        numpy_agents.append(NumpyDQNAgent(path))
+    always_draw = AlwaysDrawAgent(config.NUM_ACTIONS)
+
+    evaluator = Evaluator(num_envs=args.num_envs, num_workers=1, seed=args.seed)
+    print('{:>22} {:>10} {:>8} {:>8} {:>8} {:>9} {:>9} {:>9}'.format(
+        'policies', 'uncached s', 'cold s', 'warm s', 'replay s', 'cold hit', 'warm hit', 'speedup'))
+    for name, engine_agents in [('torch', dqn_agents), ('numpy', numpy_agents)]:
+        for opponents in ['dqn', 'always_draw']:
+            agents = list(engine_agents) if opponents == 'dqn' else [engine_agents[0]] + [always_draw] * (len(engine_agents) - 1)
+            cached = [CachedPolicy(agent, args.max_size) if agent is not always_draw else agent for agent in agents]
+            caches = [agent for agent in cached if isinstance(agent, CachedPolicy)]
+
+            uncached_s = run(evaluator, agents, args.games, args.seed)
+            cold_s = run(evaluator, cached, args.games, args.seed + args.games)
+            cold_hits = sum(cache.hits for cache in caches) / sum(cache.hits + cache.misses for cache in caches)
+            for cache in caches:
+                cache.reset_stats()
+            warm_s = run(evaluator, cached, args.games, args.seed + 2 * args.games)
+            warm_hits = sum(cache.hits for cache in caches) / sum(cache.hits + cache.misses for cache in caches)
+            replay_s = run(evaluator, cached, args.games, args.seed + 2 * args.games)
+            print('{:>22} {:>10.2f} {:>8.2f} {:>8.2f} {:>8.2f} {:>9.1%} {:>9.1%} {:>8.2f}x'.format(
+                '{} vs {}'.format(name, opponents), uncached_s, cold_s, warm_s, replay_s, cold_hits, warm_hits,
+                uncached_s / warm_s))
+    evaluator.close()
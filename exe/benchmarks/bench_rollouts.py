@@ -0,0 +1,64 @@
+"""Decision latency and win rate of MonteCarloAgent against AlwaysDrawAgent opponents.
+
+    python -m exe.benchmarks.bench_rollouts --workers 0,2,4 --num_rollouts 128
+    python -m exe.benchmarks.bench_rollouts --time_budget 0.05
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.always_draw_agent import AlwaysDrawAgent
+from src.rlcard_gpt_gen.agents.monte_carlo_agent import MonteCarloAgent
+from src.rlcard_gpt_gen.games.game import CambioGame
+from src.rlcard_gpt_gen.search.rollouts import RolloutService
+
+
+def bench(num_workers, num_games, num_rollouts, time_budget, seed):
+    np.random.seed(seed)
+    policies = [AlwaysDrawAgent(config.NUM_ACTIONS) for _ in range(config.N_PLAYERS)]
+    with RolloutService(policies, num_workers=num_workers, seed=seed) as service:
+        agent = MonteCarloAgent(config.NUM_ACTIONS, service, num_rollouts=num_rollouts, time_budget=time_budget)
+        agents = [agent] + policies[1:]
+
+        game = CambioGame()
+        latencies = []
+        wins = 0
+        for i in range(num_games):
+            game.init_game(seed + i)
+            steps = 0
+            while not game.is_over() and steps < 1000:
+                if game.current_player == 0 and len(game.get_legal_action_ids()) > 1:
+                    start = time.perf_counter()
+                    action = agent.game_step(game)
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    action = agents[game.current_player].game_step(game)
+                game.apply_action(action)
+                steps += 1
+            wins += game.get_payoffs()[0] > 0
+
+    latencies = np.array(latencies) * 1e3
+    return {
+        'workers': num_workers,
+        'win_rate': wins / num_games,
+        'p50_ms': np.percentile(latencies, 50),
+        'p99_ms': np.percentile(latencies, 99),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=str, default='0,2')
+    parser.add_argument('--num_games', type=int, default=50)
+    parser.add_argument('--num_rollouts', type=int, default=128)
+    parser.add_argument('--time_budget', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print('{:>8} {:>9} {:>9} {:>9}'.format('workers', 'win rate', 'p50 ms', 'p99 ms'))
+    for num_workers in [int(w) for w in args.workers.split(',')]:
+        num_rollouts = None if args.time_budget else args.num_rollouts
+        result = bench(num_workers, args.num_games, num_rollouts, args.time_budget, args.seed)
+        print('{workers:>8} {win_rate:>9.3f} {p50_ms:>9.1f} {p99_ms:>9.1f}'.format(**result))
@@ -0,0 +1,430 @@
+"""Benchmark suite for the game core, the env wrapper and the training loop.
+
+    python -m exe.benchmarks.bench_suite --output bench.json
+    python -m exe.benchmarks.bench_suite --baseline bench.json --tolerance 0.1
+
+Results are written as JSON: {'meta': ..., 'results': {benchmark: {metric: value}}}.
+With --baseline, every metric is compared to the saved run and the script
+exits with status 1 if any got worse by more than the tolerance. Metrics
+ending in _per_s are higher-is-better, all others lower-is-better.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import rlcard
+from rlcard.utils import reorganize
+
+from src import rlcard_gpt_gen  # noqa: F401
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.always_draw_agent import AlwaysDrawAgent
+from src.rlcard_gpt_gen.agents.random_agent import RandomAgent
+from src.rlcard_gpt_gen.games.batched_game import BatchedCambioGame
+from src.rlcard_gpt_gen.games.dealer import CambioDealer
+from src.rlcard_gpt_gen.games.game import CambioGame
+
+AGENTS = {'always_draw': AlwaysDrawAgent, 'random': RandomAgent}
+MAX_GAME_STEPS = 1000  # Greedy play can cycle through the pile forever
+STARTUP_MODULES = ['numpy', 'src.rlcard_gpt_gen.envs.core_env', 'src.rlcard_gpt_gen.envs.vector_env',
+                   'src.rlcard_gpt_gen.envs.cambio']
+TABLE_SHAPES = [(2, 4), (4, 4), (6, 4), (8, 4), (8, 8)]  # (num_players, hand_size) of the tables suite
+MACRO_PLAYERS = [2, 3, 6]  # Seats of the env.run episodes of the macro suite
+BATCH_SIZES = [64, 1024]  # Games in lockstep in the batched suite
+
+
+def per_op(fn, number):
+    """ns per call of fn, best of 3 runs of number calls"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter_ns() - start) / number)
+    return {'ns_per_op': best, 'ops_per_s': 1e9 / best}
+
+
+def random_game_states(num_states, seed):
+    """Games paused at random points of random play, for the state queries"""
+    rng = np.random.default_rng(seed)
+    games = []
+    while len(games) < num_states:
+        game = CambioGame()
+        game.init_game(int(rng.integers(2 ** 31)))
+        for _ in range(rng.integers(0, 30)):
+            if game.is_over():
+                break
+            game.apply_action(int(rng.choice(game.get_legal_action_ids())))
+        if not game.is_over():
+            games.append(game)
+    return games
+
+
+def bench_micro(number, seed):
+    results = {}
+
+    dealer = CambioDealer(seed)
+    results['dealer.shuffle'] = per_op(dealer.shuffle, number)
+
+    def draw_card():
+        if dealer.deck_is_empty():
+            dealer.reset()
+        dealer.draw_card()
+    results['dealer.draw_card'] = per_op(draw_card, number)
+
+    games = random_game_states(64, seed)
+    player = games[0].players[0]
+    results['player.get_score'] = per_op(player.get_score, number)
+    results['player.get_obs'] = per_op(player.get_obs, number)
+
+    def cycle(fn):
+        it = iter(range(0))
+        def call():
+            nonlocal it
+            game = next(it, None)
+            if game is None:
+                it = iter(games)
+                game = next(it)
+            fn(game)
+        return call
+    results['game.get_state'] = per_op(cycle(lambda game: game.get_state(game.current_player)), number)
+    results['game.get_legal_actions'] = per_op(cycle(lambda game: game.get_legal_actions()), number)
+
+    # Steps of random play, restarting finished games
+    rng = np.random.default_rng(seed)
+    game = CambioGame()
+    game.init_game(seed)
+    choices = rng.random(number * 3)
+    position = 0
+
+    def step():
+        nonlocal position
+        if game.is_over():
+            game.init_game()
+        legal_actions = game.get_legal_action_ids()
+        game.step(legal_actions[int(choices[position % len(choices)] * len(legal_actions))])
+        position += 1
+    results['game.step'] = per_op(step, number)
+
+    # The incremental encoders follow one game, so states are extracted along random play
+    for obs_mode in ('vector', 'incremental', 'planes'):
+        env = rlcard.make('cambio', config={'seed': seed, 'obs_mode': obs_mode})
+        results['env._extract_state[{}]'.format(obs_mode)] = extract_state_per_op(env, number, rng)
+    return results
+
+
+def extract_state_per_op(env, number, rng):
+    """ns per env._extract_state call, timing only the extraction while random play goes on"""
+    best = float('inf')
+    for _ in range(3):
+        env.reset()
+        game = env.game
+        elapsed = 0
+        for _ in range(number):
+            if game.is_over():
+                game.init_game()
+            state = game.get_state(game.current_player)
+            start = time.perf_counter_ns()
+            env._extract_state(state)
+            elapsed += time.perf_counter_ns() - start
+            legal_actions = game.get_legal_action_ids()
+            game.step(legal_actions[int(rng.integers(len(legal_actions)))])
+        best = min(best, elapsed / number)
+    return {'ns_per_op': best, 'ops_per_s': 1e9 / best}
+
+
+def play_core_episode(game, agents):
+    game.init_game()
+    steps = 0
+    while not game.is_over() and steps < MAX_GAME_STEPS:
+        game.apply_action(agents[game.current_player].game_step(game))
+        steps += 1
+    return steps
+
+
+class EnvSeatAgent:
+    """RandomAgent without game_step, so that its seat is played through the env even with fast-forward"""
+
+    def __init__(self, num_actions):
+        self.agent = RandomAgent(num_actions)
+        self.use_raw = False
+
+    def step(self, state):
+        return self.agent.step(state)
+
+
+def bench_macro(num_episodes, seed):
+    """Full episodes through CambioEnv.run at MACRO_PLAYERS seats, and whole games on the game core"""
+    results = {}
+    np.random.seed(seed)
+
+    for num_players in MACRO_PLAYERS:
+        for agent_name, agent_cls in AGENTS.items():
+            for fast_forward in (False, True):
+                env = rlcard.make('cambio', config={
+                    'seed': seed, 'game_num_players': num_players, 'fast_forward_scripted': fast_forward})
+                env.set_agents([EnvSeatAgent(env.num_actions)]
+                               + [agent_cls(env.num_actions) for _ in range(num_players - 1)])
+                start = time.perf_counter()
+                steps = 0
+                for _ in range(num_episodes):
+                    env.run()
+                    steps += env.timestep
+                    env.timestep = 0
+                elapsed = time.perf_counter() - start
+                name = 'env.run[{}p,{},{}]'.format(num_players, agent_name, 'fast_forward' if fast_forward else 'step')
+                results[name] = {'episodes_per_s': num_episodes / elapsed, 'steps_per_s': steps / elapsed}
+
+    # Whole games on the game core, without the env
+    for num_players in (2, 3, 6, 8):
+        for agent_name, agent_cls in AGENTS.items():
+            game = CambioGame(num_players)
+            game.seed(seed)
+            agents = [agent_cls(game.num_actions) for _ in range(num_players)]
+            start = time.perf_counter()
+            steps = sum(play_core_episode(game, agents) for _ in range(num_episodes))
+            elapsed = time.perf_counter() - start
+            results['game[{}p,{}]'.format(num_players, agent_name)] = {
+                'episodes_per_s': num_episodes / elapsed, 'steps_per_s': steps / elapsed}
+    return results
+
+
+def bench_tables(num_episodes, seed):
+    """Steps per second of env.run by table shape and obs_mode, with every seat encoded.
+
+    'full_rules' is the full-rules game (games.full_rules_game) with its vector observation
+    (see bench_full_rules for its cost against the simplified game).
+    """
+    results = {}
+    np.random.seed(seed)
+    for num_players, hand_size in TABLE_SHAPES:
+        for obs_mode in ('vector', 'incremental', 'planes', 'full_rules'):
+            env_config = {'seed': seed, 'game_num_players': num_players, 'game_hand_size': hand_size}
+            if obs_mode == 'full_rules':
+                env_config['game_full_rules'] = True
+            else:
+                env_config['obs_mode'] = obs_mode
+            env = rlcard.make('cambio', config=env_config)
+            env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+            start = time.perf_counter()
+            steps = 0
+            for _ in range(num_episodes):
+                env.run()
+                steps += env.timestep
+                env.timestep = 0
+            elapsed = time.perf_counter() - start
+            results['table[{}p,{}c,{}]'.format(num_players, hand_size, obs_mode)] = {
+                'steps_per_s': steps / elapsed, 'us_per_step': 1e6 * elapsed / steps}
+    return results
+
+
+def bench_batched(num_steps, seed):
+    """Steps per second of random legal play on one CambioGame and on BatchedCambioGame.
+
+    A batched step counts once per game it advances. obs_steps_per_s also encodes
+    every game's observation after each step, as a trainer on the batch would.
+    On 1 CPU, 1024 games give 1.2-1.3M steps/s against ~100k for one game: about
+    12x (8x with observations), not orders of magnitude; 64 games give about 3x.
+    """
+    results = {}
+    rng = np.random.default_rng(seed)
+    game = CambioGame()
+    game.init_game(seed)
+    choices = rng.random(num_steps)
+    start = time.perf_counter()
+    for choice in choices:
+        if game.is_over():
+            game.init_game()
+        legal_actions = game.get_legal_action_ids()
+        game.apply_action(legal_actions[int(choice * len(legal_actions))])
+    results['game.random_play'] = {'steps_per_s': num_steps / (time.perf_counter() - start)}
+
+    for num_envs in BATCH_SIZES:
+        game = BatchedCambioGame(num_envs, seed=seed)
+        iterations = max(1, num_steps // num_envs)
+        metrics = {}
+        for metric, encode in (('steps_per_s', False), ('obs_steps_per_s', True)):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                legal_actions = game.get_legal_actions()
+                game.step(np.argmax(rng.random(legal_actions.shape) * legal_actions, axis=1))
+                if encode:
+                    game.encode_obs()
+            metrics[metric] = iterations * num_envs / (time.perf_counter() - start)
+        results['batched[{}]'.format(num_envs)] = metrics
+    return results
+
+
+def bench_startup(repeat):
+    """Import times in fresh interpreters and the start of a spawned VectorCambioEnv worker"""
+    from src.rlcard_gpt_gen.envs.vector_env import VectorCambioEnv
+    from src.rlcard_gpt_gen.utils.profiling import import_time
+
+    results = {}
+    for module in STARTUP_MODULES:
+        results['import[{}]'.format(module)] = {'ms': import_time(module, repeat)[0]}
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with VectorCambioEnv(1, 1, seed=0, start_method='spawn') as env:
+            env.reset()
+        times.append(time.perf_counter() - start)
+    results['vector_env.spawn_worker'] = {'ms': 1e3 * float(np.median(times))}
+    return results
+
+
+def make_dqn_setup(seed):
+    import torch
+    from rlcard.agents import DQNAgent
+
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    env = rlcard.make('cambio', config={'seed': seed})
+    agents = [DQNAgent(
+        num_actions=config.NUM_ACTIONS,
+        state_shape=env.state_shape[0],
+        mlp_layers=[64, 64],
+        replay_memory_init_size=100,
+        device=torch.device('cpu'),
+    ) for _ in range(env.num_players)]
+    env.set_agents(agents)
+    return env, agents[0]
+
+
+def bench_dqn(num_episodes, seed):
+    """Training iterations as in exe/train_dqn.py: run, reorganize, feed seat 0"""
+    env, agent = make_dqn_setup(seed)
+    # Fill the replay memory first, so that every measured episode trains
+    while agent.total_t < agent.replay_memory_init_size:
+        trajectories, payoffs = env.run(is_training=True)
+        for ts in reorganize(trajectories, payoffs)[0]:
+            agent.feed(ts)
+
+    transitions = 0
+    train_t = agent.train_t
+    start = time.perf_counter()
+    for _ in range(num_episodes):
+        trajectories, payoffs = env.run(is_training=True)
+        trajectories = reorganize(trajectories, payoffs)
+        for ts in trajectories[0]:
+            agent.feed(ts)
+        transitions += len(trajectories[0])
+    elapsed = time.perf_counter() - start
+    return {'dqn.train_iteration': {
+        'episodes_per_s': num_episodes / elapsed,
+        'transitions_per_s': transitions / elapsed,
+        'updates_per_s': (agent.train_t - train_t) / elapsed,
+    }}
+
+
+def bench_memory(num_episodes, seed):
+    """Bytes allocated while playing, and bytes kept by the trajectories of env.run"""
+    results = {}
+    for obs_mode in ('vector', 'incremental', 'planes'):
+        np.random.seed(seed)
+        env = rlcard.make('cambio', config={'seed': seed, 'obs_mode': obs_mode, 'fast_forward_scripted': False})
+        env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+        env.run()  # Warm up caches
+
+        kept = []
+        steps = 0
+        tracemalloc.start()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        for _ in range(num_episodes):
+            kept.append(env.run(is_training=True))
+            steps += env.timestep
+            env.timestep = 0
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results['memory[{}]'.format(obs_mode)] = {
+            'bytes_per_episode': (current - start_bytes) / num_episodes,
+            'bytes_per_step': (current - start_bytes) / steps,
+            'peak_bytes': peak - start_bytes,
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print every metric next to the baseline; returns the regressed (benchmark, metric) pairs"""
+    regressions = []
+    print('{:<40} {:<20} {:>14} {:>14} {:>8}'.format('benchmark', 'metric', 'baseline', 'current', 'change'))
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if base is None or base == 0:
+                continue
+            change = value / base - 1
+            worse = -change if metric.endswith('_per_s') else change
+            flag = ''
+            if worse > tolerance:
+                regressions.append((name, metric))
+                flag = '  REGRESSION'
+            print('{:<40} {:<20} {:>14.4g} {:>14.4g} {:>+7.1%}{}'.format(name, metric, base, value, change, flag))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suites', type=str, default='micro,macro,tables,batched,startup,dqn,memory')
+    parser.add_argument('--micro_ops', type=int, default=20000)
+    parser.add_argument('--episodes', type=int, default=500)
+    parser.add_argument('--batched_steps', type=int, default=200000, help='Game steps per batched suite case')
+    parser.add_argument('--dqn_episodes', type=int, default=100)
+    parser.add_argument('--memory_episodes', type=int, default=200)
+    parser.add_argument('--startup_repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=str, default=None, help='Write the results as JSON')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed relative slowdown')
+    args = parser.parse_args()
+
+    suites = {
+        'micro': lambda: bench_micro(args.micro_ops, args.seed),
+        'macro': lambda: bench_macro(args.episodes, args.seed),
+        'tables': lambda: bench_tables(args.episodes, args.seed),
+        'batched': lambda: bench_batched(args.batched_steps, args.seed),
+        'startup': lambda: bench_startup(args.startup_repeat),
+        'dqn': lambda: bench_dqn(args.dqn_episodes, args.seed),
+        'memory': lambda: bench_memory(args.memory_episodes, args.seed),
+    }
+    results = {}
+    for suite in args.suites.split(','):
+        with contextlib.redirect_stdout(io.StringIO()):  # DQNAgent prints its loss every update
+            results.update(suites[suite]())
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('{} metrics regressed by more than {:.0%}'.format(len(regressions), args.tolerance))
+            sys.exit(1)
+    elif not args.output:
+        print(json.dumps(report, indent=2))
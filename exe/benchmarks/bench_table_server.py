@@ -0,0 +1,73 @@
+"""Load test of the asyncio TableServer: many concurrent tables against one DQN policy.
+
+Every table is bot-only except client_tables tables per client (at most
+half of them), where a client connected over TCP plays seat 0 with random
+legal actions. Bots are an untrained DQN (or --checkpoint_path) behind the
+batched inference queue. All tables play as fast as they can, so the core is
+saturated and tables/core equals the number of tables: with human think time
+it is the number of such tables one core can keep running.
+
+    python -m exe.benchmarks.bench_table_server --tables 100,1000,4000
+    python -m exe.benchmarks.bench_table_server --tables 2000 --max_batch 64 --max_delay 0.001
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from src.rlcard_gpt_gen.server.client import TableClient, play_random
+from src.rlcard_gpt_gen.server.table_server import TableServer, load_policy
+
+
+def make_policy(checkpoint_path, mlp_layers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        if checkpoint_path:
+            return load_policy(checkpoint_path)
+        from rlcard.agents import DQNAgent
+        from src.rlcard_gpt_gen.envs.core_env import CambioCoreEnv
+        env = CambioCoreEnv({})
+        return DQNAgent(num_actions=env.num_actions, state_shape=env.state_shape[0], mlp_layers=mlp_layers)
+
+
+async def bench(policy, num_tables, games_per_table, num_clients, client_tables, max_batch, max_delay, seed):
+    async with TableServer(policy, max_batch=max_batch, max_delay=max_delay, seed=seed) as server:
+        port = await server.start()
+        clients = [await TableClient.connect(port=port) for _ in range(num_clients)]
+        for _ in range(num_tables - num_clients * client_tables):
+            server.open_table(num_games=games_per_table)
+        server.reset_stats()
+        start = time.perf_counter()
+        await asyncio.gather(server.wait_tables(), *[
+            play_random(client, client_tables, games_per_table, seed=seed + i) for i, client in enumerate(clients)])
+        stats = server.stats()
+        stats['seconds'] = time.perf_counter() - start
+        for client in clients:
+            await client.close()
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tables', type=str, default='100,1000,4000')
+    parser.add_argument('--games', type=int, default=4000, help='Games per run, spread over the tables (at least 2 each)')
+    parser.add_argument('--clients', type=int, default=4, help='TCP clients playing seat 0 at some tables')
+    parser.add_argument('--client_tables', type=int, default=25, help='Tables per client')
+    parser.add_argument('--max_batch', type=int, default=256)
+    parser.add_argument('--max_delay', type=float, default=0.005)
+    parser.add_argument('--checkpoint_path', type=str, default=None)
+    parser.add_argument('--mlp_layers', type=str, default='64,64')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    policy = make_policy(args.checkpoint_path, [int(n) for n in args.mlp_layers.split(',')])
+    print('{:>7} {:>8} {:>11} {:>7} {:>8} {:>8} {:>6} {:>12}'.format(
+        'tables', 'games/s', 'decisions/s', 'batch', 'p50 ms', 'p99 ms', 'cpu', 'tables/core'))
+    for num_tables in [int(n) for n in args.tables.split(',')]:
+        # At most half of the tables have a client seat
+        num_clients = min(args.clients, num_tables // (2 * max(args.client_tables, 1)))
+        games_per_table = max(2, -(-args.games // num_tables))
+        stats = asyncio.run(bench(policy, num_tables, games_per_table, num_clients, args.client_tables,
+                                  args.max_batch, args.max_delay, args.seed))
+        print('{:>7} {games_per_s:>8.0f} {decisions_per_s:>11.0f} {mean_batch:>7.1f} {latency_p50_ms:>8.2f} '
+              '{latency_p99_ms:>8.2f} {cpu_utilization:>6.0%} {tables_per_core:>12.0f}'.format(num_tables, **stats))
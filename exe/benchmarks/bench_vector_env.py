@@ -0,0 +1,59 @@
+"""Episodes/sec of VectorCambioEnv against the number of worker processes.
+
+    python -m exe.benchmarks.bench_vector_env --workers 1,2,4,8 --envs_per_worker 16
+    python -m exe.benchmarks.bench_vector_env --agent dqn   # one batched forward pass per step
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.batched import batch_eval_step, sample_legal
+from src.rlcard_gpt_gen.envs.vector_env import VectorCambioEnv
+
+
+def make_policy(agent_name, state_shape, rng):
+    if agent_name == 'random':
+        return lambda obs, legal_actions: sample_legal(legal_actions, rng)
+
+    from rlcard.agents import DQNAgent
+    agent = DQNAgent(num_actions=config.NUM_ACTIONS, state_shape=state_shape, mlp_layers=[64, 64], device='cpu')
+    return lambda obs, legal_actions: batch_eval_step(agent, obs, legal_actions)
+
+
+def bench(num_workers, envs_per_worker, num_steps, agent_name, seed):
+    num_envs = num_workers * envs_per_worker
+    rng = np.random.default_rng(seed)
+    with VectorCambioEnv(num_envs, num_workers, seed=seed) as venv:
+        policy = make_policy(agent_name, venv.state_shape, rng)
+        obs, legal_actions, _ = venv.reset()
+
+        episodes = 0
+        start = time.perf_counter()
+        for _ in range(num_steps):
+            obs, legal_actions, _, _, dones = venv.step(policy(obs, legal_actions))
+            episodes += int(dones.sum())
+        elapsed = time.perf_counter() - start
+
+    return {
+        'workers': num_workers,
+        'envs': num_envs,
+        'steps_per_sec': num_steps * num_envs / elapsed,
+        'episodes_per_sec': episodes / elapsed,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=str, default='1,2,4,8')
+    parser.add_argument('--envs_per_worker', type=int, default=16)
+    parser.add_argument('--num_steps', type=int, default=500)
+    parser.add_argument('--agent', choices=['random', 'dqn'], default='random')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print('{:>8} {:>6} {:>12} {:>12}'.format('workers', 'envs', 'steps/s', 'episodes/s'))
+    for num_workers in [int(w) for w in args.workers.split(',')]:
+        result = bench(num_workers, args.envs_per_worker, args.num_steps, args.agent, args.seed)
+        print('{workers:>8} {envs:>6} {steps_per_sec:>12.0f} {episodes_per_sec:>12.1f}'.format(**result))
@@ -0,0 +1,74 @@
+"""Check the import-time budget of the lightweight import path.
+
+Every module in BUDGETS is imported in a fresh interpreter that has already
+imported NumPy and numpy.random (unless NumPy is one of its forbidden
+packages), and the standard library packages listed in PRELOADS. The check
+fails if the module loads a forbidden package (rlcard or torch) or if its
+import takes longer than its budget. Only the time on top of NumPy is
+budgeted: that is the part this repo controls.
+
+    python -m exe.checks.check_import_time
+    python -m exe.checks.check_import_time --repeat 9 --slack 2.0
+"""
+import argparse
+import sys
+
+from src.rlcard_gpt_gen.utils.profiling import import_time
+
+NUMPY = 'numpy.random'  # Imports numpy; every module that plays games needs both
+
+# Module -> (ms allowed on top of NumPy, packages it must not load)
+BUDGETS = {
+    'src.rlcard_gpt_gen': (15, ('numpy', 'rlcard', 'torch')),
+    'src.rlcard_gpt_gen.games.game': (15, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.games.batched_game': (15, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.games.full_rules_game': (15, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.envs.core_env': (20, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.envs.vector_env': (60, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.utils.evaluation': (60, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.utils.episode_log': (20, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.utils.replay_memory': (20, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.utils.sweep': (20, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.search.rollouts': (40, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.agents.endgame_agent': (40, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.agents.monte_carlo_agent': (40, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.agents.numpy_dqn_agent': (20, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.agents.cached_policy': (20, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.server.table_server': (20, ('rlcard', 'torch')),
+    'src.rlcard_gpt_gen.envs.cambio': (100, ('torch',)),
+}
+
+# Module -> standard library packages imported before the timer starts: their cost is
+# not this repo's to budget (asyncio alone takes about 40 ms)
+PRELOADS = {
+    'src.rlcard_gpt_gen.server.table_server': ('asyncio',),
+}
+
+
+def check(repeat, slack):
+    numpy_ms, _ = import_time(NUMPY, repeat)
+    print('{:<46} {:>9}'.format(NUMPY, '{:.1f} ms'.format(numpy_ms)))
+    failures = []
+    for module, (budget_ms, forbidden) in BUDGETS.items():
+        preload = (() if 'numpy' in forbidden else (NUMPY,)) + PRELOADS.get(module, ())
+        ms, loaded = import_time(module, repeat, preload=preload)
+        problems = ['loads ' + name for name in forbidden if name in loaded]
+        if ms > budget_ms * slack:
+            problems.append('over the {} ms budget'.format(budget_ms))
+        print('{:<46} {:>9}  {}'.format(module, '+{:.1f} ms'.format(ms), '; '.join(problems) or 'ok'))
+        if problems:
+            failures.append(module)
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Import-time budget check')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per module; the median counts')
+    parser.add_argument('--slack', type=float, default=1.0, help='Multiply the budgets, e.g. on noisy CI machines')
+    args = parser.parse_args()
+
+    failures = check(args.repeat, args.slack)
+    if failures:
+        print('{} modules over their import budget'.format(len(failures)))
+        sys.exit(1)
+    print('OK: all modules within their import budget')
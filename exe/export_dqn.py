@@ -0,0 +1,67 @@
+"""Export a DQN checkpoint to a NumPy weights file for NumpyDQNAgent, and check it against torch.
+
+    python -m exe.export_dqn models/cambio_dqn models/cambio_dqn.npz
+    python -m exe.export_dqn models/cambio_dqn/checkpoint_dqn.pt models/cambio_dqn_int8.npz --dtype int8
+
+The check plays random games and compares the Q-values of both networks on
+every observation. The obs_mode is inferred from the checkpoint's state shape
+('planes' for 2-D states, else 'vector', which 'incremental' nets take as
+well) unless --obs_mode is given; the default table must give that shape.
+"""
+import argparse
+import contextlib
+import io
+import os
+
+import numpy as np
+import torch
+from rlcard.agents import DQNAgent
+
+from src.rlcard_gpt_gen.agents.numpy_dqn_agent import WEIGHT_DTYPES, NumpyQNetwork, export_qnet
+from src.rlcard_gpt_gen.agents.random_agent import RandomAgent
+from src.rlcard_gpt_gen.envs.core_env import CambioCoreEnv
+
+
+def checkpoint_obs_mode(state_shape):
+    return 'planes' if len(state_shape) == 2 else 'vector'
+
+
+def collect_obs(obs_mode, num_games, seed, state_shape):
+    env = CambioCoreEnv({'seed': seed, 'obs_mode': obs_mode, 'fast_forward_scripted': False})
+    if list(env.state_shape[0]) != list(state_shape):
+        raise ValueError("obs_mode '{}' gives states of shape {}, the checkpoint takes {}".format(
+            obs_mode, env.state_shape[0], list(state_shape)))
+    env.set_agents([RandomAgent(env.num_actions) for _ in range(env.num_players)])
+    obs = []
+    for _ in range(num_games):
+        trajectories, _ = env.run()
+        obs.extend(state['obs'] for trajectory in trajectories for state in trajectory[::2])
+    return np.array(obs, dtype=np.float32)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('checkpoint', type=str, help='save_checkpoint file or directory')
+    parser.add_argument('output', type=str)
+    parser.add_argument('--dtype', type=str, default='float32', choices=WEIGHT_DTYPES)
+    parser.add_argument('--obs_mode', type=str, default=None,
+                        help="Observations to check on (default: from the checkpoint's state shape)")
+    parser.add_argument('--num_games', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    path = args.checkpoint
+    if os.path.isdir(path):
+        path = os.path.join(path, 'checkpoint_dqn.pt')
+    with contextlib.redirect_stdout(io.StringIO()):  # from_checkpoint prints
+        agent = DQNAgent.from_checkpoint(torch.load(path, weights_only=False))
+    export_qnet(agent, args.output, args.dtype)
+    print('Wrote {} ({} bytes, {})'.format(args.output, os.path.getsize(args.output), args.dtype))
+
+    state_shape = agent.q_estimator.state_shape
+    obs_mode = args.obs_mode or checkpoint_obs_mode(state_shape)
+    obs = collect_obs(obs_mode, args.num_games, args.seed, state_shape)
+    expected = agent.q_estimator.predict_nograd(obs)
+    q_values = NumpyQNetwork.load(args.output).predict(obs)
+    print('{} observations: max abs Q error {:.3g}, greedy action agreement {:.2%}'.format(
+        len(obs), np.abs(q_values - expected).max(), np.mean(q_values.argmax(1) == expected.argmax(1))))
@@ -1,6 +1,6 @@
-import rlcard
 from src import rlcard_gpt_gen
 from src.rlcard_gpt_gen.agents.always_draw_agent import AlwaysDrawAgent
+from src.rlcard_gpt_gen.envs.core_env import CambioCoreEnv
 import sys
 
 
@@ -21,14 +21,12 @@ class HumanAgent:
 
         while True:
             print("\nAvailable actions:")
-            for i, action in enumerate(rlcard_gpt_gen.config.ACTIONS):
-                if action in state['legal_actions']:
-                    print(f"{i}: {action}")
+            for i in state['legal_actions']:
+                print(f"{i}: {rlcard_gpt_gen.config.ACTIONS[i]}")
             
             action_index = int(input("\nEnter your action number: ").strip())
-            action = rlcard_gpt_gen.config.ACTIONS[action_index]
             
-            if action in state['legal_actions']:
+            if action_index in state['legal_actions']:
                 return action_index
             else:
                 print("Invalid action. Try again.")
@@ -61,14 +59,14 @@ class HumanAgent:
                 print(f"Player {player_id}: {discards}")
         
         print("\n=== Available Actions ===")
-        print(f"Legal actions: {state['legal_actions']}")
+        print(f"Legal actions: {state['raw_legal_actions']}")
 
     def eval_step(self, state):
         return self.step(state), []
 
 def main():
-    # Set up Cambio environment
-    env = rlcard.make('cambio')
+    # Set up Cambio environment; playing needs neither rlcard nor torch
+    env = CambioCoreEnv({})
 
     # Set agents: Human vs Random
     human_agent = HumanAgent(num_actions=env.num_actions)
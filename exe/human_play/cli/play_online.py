@@ -0,0 +1,70 @@
+"""Play Cambio against the bots of a running exe/serve_tables.py server.
+
+    python -m exe.human_play.cli.play_online --port 8765 --games 3
+    python -m exe.human_play.cli.play_online --humans 2            # then, in another terminal:
+    python -m exe.human_play.cli.play_online --join 0
+"""
+import argparse
+import asyncio
+
+from src.rlcard_gpt_gen.server.client import TableClient
+
+
+def print_turn(state):
+    print("\n===== Your Turn =====")
+    print(f"Your hand: {state['hand']}")
+    if state['drawn_card'] is not None:
+        print(f"Drawn card: {state['drawn_card']}")
+    print(f"Top of the discard pile: {state['top_card']}")
+    print(f"Cambio has been called: {state['called_cambio']}")
+    for player_id, discards in enumerate(state['discards']):
+        if discards:
+            print(f"Player {player_id} discarded: {discards}")
+    print("\nAvailable actions:")
+    for action, name in zip(state['legal_actions'], state['action_names']):
+        print(f"{action}: {name}")
+
+
+async def play(args):
+    client = await TableClient.connect(args.host, args.port)
+    if args.join is None:
+        await client.new_table(humans=args.humans, games=args.games)
+    else:
+        await client.join(args.join)
+    loop = asyncio.get_running_loop()
+
+    while True:
+        event = await client.next_event()
+        if event is None or event['event'] == 'closed':
+            break
+        if event['event'] == 'table':
+            print(f"Table {event['table']}, seat {event['seat']} of {event['num_players']}")
+            if event['waiting']:
+                print(f"Waiting for {event['waiting']} more players to join table {event['table']}")
+        elif event['event'] == 'turn':
+            state = event['state']
+            print_turn(state)
+            while True:
+                # input() blocks, so it runs in a thread while the connection stays served
+                answer = await loop.run_in_executor(None, input, "\nEnter your action number: ")
+                if answer.strip().isdigit() and int(answer) in state['legal_actions']:
+                    break
+                print("Invalid action. Try again.")
+            await client.act(event['table'], int(answer))
+        elif event['event'] == 'over':
+            print("\n===== Game Over =====")
+            print(f"Scores: {event['scores']}")
+            print(f"Payoffs: {event['payoffs']}")
+        elif event['event'] == 'error':
+            print(f"Server error: {event['message']}")
+    await client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--humans', type=int, default=1, help='Human seats of a new table')
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--join', type=int, default=None, help='Join this table instead of opening one')
+    asyncio.run(play(parser.parse_args()))
@@ -0,0 +1,57 @@
+"""Serve Cambio tables to line-protocol clients, with bots played by a DQN checkpoint.
+
+    python -m exe.serve_tables
+
+Connect with exe/human_play/cli/play_online.py, or any client that speaks the
+JSON-lines protocol of src/rlcard_gpt_gen/server/table_server.py.
+"""
+import asyncio
+
+from src.rlcard_gpt_gen.agents.cached_policy import CachedPolicy
+from src.rlcard_gpt_gen.server.table_server import TableServer, load_policy
+
+
+async def serve(args):
+    policy = load_policy(args['checkpoint_path'])
+    if args['cache_size']:
+        policy = CachedPolicy(policy, args['cache_size'])
+    server = TableServer(
+        policy,
+        env_config={'obs_mode': args['obs_mode']},
+        max_batch=args['max_batch'],
+        max_delay=args['max_delay'],
+        seed=args['seed'],
+    )
+    async with server:
+        port = await server.start(args['host'], args['port'])
+        print('Serving Cambio tables on {}:{}'.format(args['host'], port))
+        while True:
+            await asyncio.sleep(args['stats_every'])
+            stats = server.stats()
+            server.reset_stats()
+            if stats['decisions']:
+                print('tables {open_tables}  games/s {games_per_s:.1f}  decisions/s {decisions_per_s:.0f}  '
+                      'batch {mean_batch:.1f}  p50 {latency_p50_ms:.2f} ms  p99 {latency_p99_ms:.2f} ms  '
+                      'cpu {cpu_utilization:.0%}  tables/core {tables_per_core:.0f}'.format(**stats))
+            if args['cache_size']:
+                print('decision cache: hit rate {hit_rate:.1%}  size {size}  inference {inference_ms:.0f} ms  '
+                      'saved {saved_ms:.0f} ms  overhead {overhead_ms:.0f} ms'.format(**policy.stats()))
+                policy.reset_stats()
+
+
+if __name__ == '__main__':
+    args = {
+        'host': '127.0.0.1',
+        'port': 8765,
+        'checkpoint_path': None,  # e.g. 'models/cambio_dqn_actor_learner', or an exe/export_dqn.py .npz to serve without torch
+        'obs_mode': 'incremental',  # Must give the observation the checkpoint was trained on
+        'max_batch': 256,  # Bot decisions per inference call
+        'max_delay': 0.005,  # Seconds a bot decision may wait for its batch to fill
+        'cache_size': 0,  # Cache this many bot decisions (see agents.cached_policy); 0 disables
+        'stats_every': 10.0,  # Seconds between stats lines
+        'seed': 0,
+    }
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
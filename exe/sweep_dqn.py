@@ -0,0 +1,88 @@
+import csv
+import os
+
+from exe.train_dqn import DEFAULT_ARGS, train
+from src.rlcard_gpt_gen.utils.sweep import (
+    MedianStopping,
+    SweepScheduler,
+    apply_overrides,
+    format_table,
+    grid_search,
+    random_search,
+    summarize_runs,
+)
+
+def make_runs(args):
+    """(run directory, train args, overrides) of every run of the sweep"""
+    if args['search'] == 'grid':
+        configs = grid_search(args['space'])
+    elif args['search'] == 'random':
+        configs = random_search(args['space'], args['num_runs'], args['search_seed'])
+    else:
+        raise ValueError('Unknown search {!r}'.format(args['search']))
+
+    runs = []
+    for i, overrides in enumerate(configs):
+        run_dir = os.path.join(args['sweep_dir'], 'run_{:03d}'.format(i))
+        run_args = apply_overrides(dict(DEFAULT_ARGS, **args['train']), overrides)
+        # Everything a run writes goes to its directory, where it also checkpoints to be resumable
+        run_args.update({
+            'checkpoint_path': run_dir,
+            'log_dir': os.path.join(run_dir, 'logs'),
+            'save_path': os.path.join(run_dir, 'model'),
+            'figure_path': None,
+            'profile_path': os.path.join(run_dir, 'logs', 'profile.jsonl'),
+            'cprofile_path': os.path.join(run_dir, 'logs', 'train.prof'),
+            # Evaluation workers share the CPUs of their run
+            'num_eval_workers': args['cpus_per_run'],
+        })
+        if run_args['episode_log_path']:
+            run_args['episode_log_path'] = os.path.join(run_dir, 'episodes')
+        if run_args['replay_memory_path']:
+            run_args['replay_memory_path'] = os.path.join(run_dir, 'memory')
+        runs.append((run_dir, run_args, overrides))
+    return runs
+
+def write_csv(rows, path):
+    columns = list(dict.fromkeys(name for row in rows for name in row))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+if __name__ == '__main__':
+    # Set the arguments
+    args = {
+        'sweep_dir': 'sweeps/cambio_dqn',  # One run_<i> directory per run; start the sweep again to resume it
+        'search': 'grid',  # or 'random'
+        # Arg -> values to try: any key of exe.train_dqn.DEFAULT_ARGS, or 'agent_kwargs.<DQNAgent setting>'.
+        # Random search also takes ranges: ('uniform', low, high), ('loguniform', low, high) or ('int', low, high)
+        'space': {
+            'mlp_layers': [[64, 64], [128, 128]],
+            'agent_kwargs.learning_rate': [5e-5, 1e-4, 5e-4],
+            'agent_kwargs.batch_size': [32, 64],
+        },
+        'num_runs': 16,  # Random search only
+        'search_seed': 0,  # Random search only
+        'train': {  # Changes to exe.train_dqn.DEFAULT_ARGS for every run
+            'num_episodes': 5000,
+            'evaluate_every': 100,
+            'checkpoint_every': 500,
+        },
+        'cpus_per_run': 1,
+        'max_parallel': None,  # As many runs at a time as there are CPUs for
+        'grace_evaluations': 10,  # Evaluations before the median rule may stop a run (None never stops)
+        'min_runs': 3,  # Other runs that must have reached an episode to compare against
+    }
+
+    runs = make_runs(args)
+    stopping = None
+    if args['grace_evaluations'] is not None:
+        stopping = MedianStopping(args['grace_evaluations'], args['min_runs'])
+    scheduler = SweepScheduler(train, args['cpus_per_run'], args['max_parallel'], stopping)
+    print(f'{len(runs)} runs, {len(scheduler.slots)} at a time on CPUs {scheduler.slots}')
+
+    # Gather every run, including those of earlier invocations, into one table
+    rows = summarize_runs(scheduler.run(runs))
+    write_csv(rows, os.path.join(args['sweep_dir'], 'results.csv'))
+    print(format_table(rows))
@@ -0,0 +1,112 @@
+import os
+import torch
+
+from src import rlcard_gpt_gen
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.random_agent import RandomAgent
+from src.rlcard_gpt_gen.utils.actor_learner import ActorLearner
+from src.rlcard_gpt_gen.utils.evaluation import Evaluator
+import rlcard
+from rlcard.utils import (
+    set_seed,
+    Logger,
+    plot_curve,
+)
+
+def train(args):
+    # Seed numpy, torch, and random
+    set_seed(args['seed'])
+
+    # Actors and learner run on CPU; the state shape depends on the observation mode
+    env_config = {'obs_mode': args['obs_mode']}
+    env = rlcard.make('cambio', config=dict(env_config, seed=args['seed']))
+    agent_kwargs = {
+        'num_actions': config.NUM_ACTIONS,
+        'state_shape': env.state_shape[0],
+        'mlp_layers': [64, 64],
+        'batch_size': args['batch_size'],
+        'replay_memory_size': args['replay_memory_size'],
+        'replay_memory_init_size': args['replay_memory_init_size'],
+        'device': torch.device('cpu'),
+    }
+
+    learner = ActorLearner(
+        agent_kwargs,
+        num_actors=args['num_actors'],
+        env_config=env_config,
+        seed=args['seed'],
+        publish_every=args['publish_every'],
+        refresh_every=args['refresh_every'],
+        pool_path=args['pool_path'],
+        pool_size=args['pool_size'],
+        pool_every=args['pool_every'],
+        self_play_prob=args['self_play_prob'],
+        min_transitions_per_update=args['min_transitions_per_update'],
+    )
+    agent = learner.agent
+
+    # The learner is evaluated against random players
+    evaluator = Evaluator(
+        num_envs=args['num_eval_envs'],
+        num_workers=args['num_eval_workers'],
+        seed=args['seed'],
+        config={'obs_mode': args['obs_mode']} if args['obs_mode'] == 'planes' else None,
+    )
+    eval_opponents = [RandomAgent(config.NUM_ACTIONS) for _ in range(config.N_PLAYERS - 1)]
+
+    with Logger(args['log_dir']) as logger, learner:
+        def evaluate(episode):
+            if episode % args['evaluate_every'] != 0:
+                return
+            results = evaluator.evaluate([agent] + eval_opponents, args['num_eval_games'])
+            logger.log_performance(episode, results['mean_payoff'][0])
+            print(f"Win rate {results['win_rate'][0]:.3f} +/- {results['win_rate_ci'][0]:.3f} "
+                  f"after {agent.train_t} updates")
+
+        stats = learner.train(args['num_episodes'], callback=evaluate)
+        logger.log(f"{stats['transitions_per_s']:.0f} transitions/s, {stats['updates_per_s']:.1f} updates/s, "
+                   f"learner waited {stats['learner_wait_s']:.1f}s of {stats['seconds']:.1f}s")
+    evaluator.close()
+
+    # Plot rewards
+    plot_curve(logger.csv_path, args['figure_path'], 'Actor-learner DQN')
+
+    # Save final model
+    if args['save_path']:
+        os.makedirs(args['save_path'], exist_ok=True)
+        agent.save_checkpoint(args['save_path'])
+
+if __name__ == '__main__':
+    # Set the arguments
+    args = {
+        'seed': 42,
+        'obs_mode': 'vector',  # or 'planes' for the int8 card-plane observation
+        'num_actors': max(1, (os.cpu_count() or 2) - 1),  # The learner takes the remaining core
+        'num_episodes': 20000,
+        'batch_size': 256,  # Larger mini-batches than train_dqn, the learner does not wait on the games
+        'replay_memory_size': 100000,
+        'replay_memory_init_size': 1000,
+        'min_transitions_per_update': 0,  # Train without waiting for new data
+        'publish_every': 20,  # Updates between weight publications
+        'refresh_every': 10,  # Episodes between weight reloads in the actors
+        'pool_path': 'models/cambio_actor_learner/pool',  # None for pure self-play
+        'pool_size': 20,
+        'pool_every': 500,  # Updates between opponent pool snapshots
+        'self_play_prob': 0.5,  # Chance that an opponent plays the current weights
+        'num_eval_games': 100,
+        'num_eval_envs': 32,
+        'num_eval_workers': 1,
+        'evaluate_every': 1000,
+        'log_dir': 'logs/cambio_actor_learner',
+        'save_path': 'models/cambio_actor_learner',
+        'figure_path': 'figures/cambio_actor_learner.png',
+    }
+
+    # Create directories if not exist
+    if not os.path.exists('models'):
+        os.makedirs('models')
+    if not os.path.exists('figures'):
+        os.makedirs('figures')
+
+    # Train the agent
+    train(args)
@@ -1,21 +1,44 @@
 import os
+import random
+import time
+
 import numpy as np
-import torch
 
 from src import rlcard_gpt_gen
 from src.rlcard_gpt_gen import config
-import rlcard
-from rlcard.agents import DQNAgent
-from rlcard.utils import (
-    get_device,
-    set_seed,
-    tournament,
-    reorganize,
-    Logger,
-    plot_curve,
-)
-
-def train(args):
+from src.rlcard_gpt_gen.agents.cached_policy import CachedPolicy
+from src.rlcard_gpt_gen.agents.numpy_dqn_agent import export_qnet
+from src.rlcard_gpt_gen.utils.evaluation import Evaluator
+from src.rlcard_gpt_gen.utils.replay_memory import CambioReplayMemory
+from src.rlcard_gpt_gen.utils.episode_log import EpisodeWriter
+from src.rlcard_gpt_gen.utils.profiling import EpisodeProfile, Profiler, ProfileWriter, perf_counter_ns
+
+# File in checkpoint_path with everything needed to resume a run
+TRAINING_STATE = 'training_state.pt'
+
+def train(args, callback=None):
+    """Train a DQN agent with args (see DEFAULT_ARGS) and return its evaluation curve.
+
+    The curve is a list of dicts with the episode, mean_payoff, win_rate and
+    training seconds of every evaluation. callback(curve) is called after each
+    evaluation and stops training early by returning True. With checkpoint_path
+    set, a run that left a training state there continues from it.
+    """
+    if args['replay_memory_path'] and args['obs_mode'] == 'planes':
+        raise ValueError("replay_memory_path bit-packs vector observations, it cannot be used with obs_mode 'planes'")
+
+    # Imported here: evaluation workers started with spawn or forkserver re-import
+    # this script, and they only play games, so they should not load torch
+    import rlcard
+    from rlcard.agents import DQNAgent
+    from rlcard.utils import (
+        get_device,
+        set_seed,
+        reorganize,
+        Logger,
+        plot_curve,
+    )
+
     # Check if CUDA is available
     device = get_device()
     
@@ -27,92 +50,262 @@ def train(args):
         'cambio',
         config={
             'seed': args['seed'],
+            'obs_mode': args['obs_mode'],
         }
     )
 
-    # Initialize the DQN agent and opponents
-    agent = DQNAgent(
+    # Create the opponents first, so that they only depend on the seed and every
+    # run of a sweep meets the same opponents whatever the agent settings
+    opponent_agents = [DQNAgent(
         num_actions=config.NUM_ACTIONS,
         state_shape=env.state_shape[0],
         mlp_layers=[64, 64],
         device=device,
-    )
-    
-    # Create random agents for other players
-    opponent_agents = [DQNAgent(
+    ) for _ in range(2)]  # 2 opponents for 3 total players
+
+    # Initialize the DQN agent
+    agent = DQNAgent(
         num_actions=config.NUM_ACTIONS,
         state_shape=env.state_shape[0],
-        mlp_layers=[64, 64],
+        mlp_layers=args['mlp_layers'],
         device=device,
-    ) for _ in range(2)]  # 2 opponents for 3 total players
-    
+        **args['agent_kwargs'],
+    )
+
+    # Keep the agent's transitions bit-packed in memory-mapped files, so that runs can be resumed
+    if args['replay_memory_path']:
+        agent.memory = CambioReplayMemory(
+            args['replay_memory_path'],
+            agent.memory.memory_size,
+            agent.batch_size,
+            seed=args['seed'],
+            state_shape=env.state_shape[0],
+        )
+
     # Set the agents in the environment
     env.set_agents([agent] + opponent_agents)
-    
+
+    # Continue an interrupted run
+    start_episode, seconds, curve = 0, 0.0, []
+    if args['checkpoint_path'] and os.path.exists(os.path.join(args['checkpoint_path'], TRAINING_STATE)):
+        start_episode, seconds, curve = load_training_state(agent, env, args['checkpoint_path'])
+        print(f'Resuming from episode {start_episode}')
+
     # Mean rewards for logging
-    rewards = []
-    
-    # Create a Logger instance
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    logger = Logger(log_dir='logs/cambio_dqn')
+    rewards = [point['mean_payoff'] for point in curve]
+
+    # Evaluation games run on worker processes that are kept for the whole run.
+    # Their default 'incremental' obs_mode gives the same observations as 'vector'.
+    evaluator = Evaluator(
+        num_envs=args['num_eval_envs'],
+        num_workers=args['num_eval_workers'],
+        seed=args['seed'],
+        config={'obs_mode': args['obs_mode']} if args['obs_mode'] == 'planes' else None,
+    )
+
+    # Evaluation deals repeat every time and the opponents never train, so their decisions can be
+    # cached; the agent's cache is cleared whenever it trained since the last evaluation
+    eval_agents = [agent] + opponent_agents
+    if args['eval_cache_size']:
+        eval_agents = [CachedPolicy(a, args['eval_cache_size']) for a in eval_agents]
+
+    # Opt-in timers for the env, the game, the agents and the training loop
+    profiler = None
+    if args['profile_every']:
+        profiler = Profiler()
+        env.profiler = profiler
+        evaluator.profiler = profiler
+        profile_writer = ProfileWriter(args['profile_path'])
+    episode_profile = EpisodeProfile(args['cprofile_path'], args['cprofile_episodes'])
+
+    # Training games can be logged for offline training and debugging (see utils.episode_log)
+    episode_writer = EpisodeWriter(args['episode_log_path']) if args['episode_log_path'] else None
 
     # Start training
-    for episode in range(args['num_episodes']):
-        # Generate data from the environment
-        trajectories, payoffs = env.run(is_training=True)
-        
-        # Reorganize the data to be state, action, reward, next_state, done
-        trajectories = reorganize(trajectories, payoffs)
-        
-        # Feed transitions into agent memory, and train the agent
-        # Here, we assume that training on a single episode is enough
-        for ts in trajectories[0]:
-            agent.feed(ts)
-            
-        # Evaluate the performance
-        if episode % args['evaluate_every'] == 0:            # Set up evaluation environment
-            eval_env = rlcard.make('cambio', config={'seed': args['seed']})
-            eval_env.set_agents([agent] + opponent_agents)
-            eval_rewards = tournament(eval_env, args['num_eval_games'])
-            # tournament returns average payoffs, so we can directly use the first player's average
-            rewards.append(eval_rewards[0])
-            
-            # Add point to logger
-            logger.log_point(x=episode, y=np.mean(rewards[-100:]), z=agent.total_loss)
-            
-            # Print out results
-            print(f'\nEpisode {episode}: Average reward is {np.mean(rewards[-100:])}')
-            
-            # Save model
-            if args['save_path'] and np.mean(rewards[-100:]) > args['save_threshold']:
-                agent.save(args['save_path'])
-                
+    start = time.perf_counter()
+    stopped = False
+    with Logger(args['log_dir']) as logger:
+        # The log is rewritten, so the evaluations of a resumed run go back in first
+        for point in curve:
+            logger.writer.writerow({'episode': point['episode'], 'reward': point['mean_payoff']})
+
+        for episode in range(start_episode, args['num_episodes']):
+            # Generate data from the environment
+            trajectories, payoffs = env.run(is_training=True)
+            if episode_writer is not None:
+                episode_writer.record(env.game)
+
+            # Reorganize the data to be state, action, reward, next_state, done
+            trajectories = reorganize(trajectories, payoffs)
+
+            # Feed transitions into agent memory, and train the agent
+            # Here, we assume that training on a single episode is enough
+            for ts in trajectories[0]:
+                if profiler is None:
+                    agent.feed(ts)
+                else:
+                    # Feeds that trigger a training step are timed separately
+                    train_t = agent.train_t
+                    start_ns = perf_counter_ns()
+                    agent.feed(ts)
+                    profiler.add('feed' if agent.train_t == train_t else 'train_update', perf_counter_ns() - start_ns)
+
+            episode_profile.episode_done()
+            if profiler is not None and (episode + 1) % args['profile_every'] == 0:
+                profile_writer.write(profiler, episode=episode + 1)
+                profiler.reset()
+
+            # Evaluate the performance
+            if episode % args['evaluate_every'] == 0:
+                results = evaluator.evaluate(
+                    eval_agents,
+                    args['num_eval_games'],
+                    ci_tolerance=args['eval_ci_tolerance'],
+                )
+                rewards.append(results['mean_payoff'][0])
+                curve.append({
+                    'episode': episode,
+                    'mean_payoff': float(results['mean_payoff'][0]),
+                    'win_rate': float(results['win_rate'][0]),
+                    'seconds': seconds + time.perf_counter() - start,
+                })
+
+                # Add point to logger
+                logger.log_performance(episode, results['mean_payoff'][0])
+
+                # Print out results
+                print(f'\nEpisode {episode}: Average reward is {np.mean(rewards[-100:])}')
+                print(f"Evaluated {results['num_games']} games: "
+                      f"win rate {results['win_rate'][0]:.3f} +/- {results['win_rate_ci'][0]:.3f}, "
+                      f"mean score {results['mean_score'][0]:.2f}")
+                if args['eval_cache_size']:
+                    print('Decision cache hit rate: ' + ', '.join(
+                        f"{a.stats()['hit_rate']:.1%}" for a in eval_agents))
+                    for a in eval_agents:
+                        a.reset_stats()
+
+                # Save model
+                if args['save_path'] and np.mean(rewards[-100:]) > args['save_threshold']:
+                    save(agent, args)
+
+                stopped = callback is not None and bool(callback(curve))
+
+            # Checkpoint for resuming, and always at the end of the run
+            if args['checkpoint_path'] and (
+                    stopped or episode + 1 == args['num_episodes']
+                    or args['checkpoint_every'] and (episode + 1) % args['checkpoint_every'] == 0):
+                save_training_state(agent, env, args['checkpoint_path'], episode + 1,
+                                    seconds + time.perf_counter() - start, curve)
+            if stopped:
+                print(f'\nStopped early after episode {episode}')
+                break
+
+    evaluator.close()
+    if episode_writer is not None:
+        episode_writer.close()
+
     # Plot rewards
-    plot_curve(rewards, args['figure_path'], 'DQN on Cambio')
+    if args['figure_path']:
+        plot_curve(logger.csv_path, args['figure_path'], 'DQN on Cambio')
 
     # Save final model
     if args['save_path']:
-        agent.save(args['save_path'])
+        save(agent, args)
+    return curve
+
+def save(agent, args):
+    """Checkpoint the agent, and export its Q-network for NumpyDQNAgent if export_dtype is set"""
+    os.makedirs(args['save_path'], exist_ok=True)
+    agent.save_checkpoint(args['save_path'])
+    if args['export_dtype']:
+        export_qnet(agent, os.path.join(args['save_path'], 'qnet.npz'), args['export_dtype'])
 
-def evaluate(agent, eval_env, num_games=100):
-    rewards = []
-    for _ in range(num_games):
-        _, payoffs = eval_env.run(is_training=False)
-        rewards.append(payoffs[0])  # Get player 1's payoff
-    return np.mean(rewards)
+def save_training_state(agent, env, path, episode, seconds, curve):
+    """Write everything load_training_state needs to continue the run at episode.
+
+    The state replaces the previous one in a single rename, so an interrupted
+    write leaves the last complete state in place.
+    """
+    import torch
+    os.makedirs(path, exist_ok=True)
+    memory = agent.memory
+    if isinstance(memory, CambioReplayMemory):
+        # Reopened from its own files on resume
+        memory.flush()
+        memory_state = memory.np_random.bit_generator.state
+    else:
+        memory_state = memory.memory
+    state = {
+        'episode': episode,
+        'seconds': seconds,
+        'curve': curve,
+        'qnet': agent.q_estimator.qnet.state_dict(),
+        'optimizer': agent.q_estimator.optimizer.state_dict(),
+        'target_qnet': agent.target_estimator.qnet.state_dict(),
+        'total_t': agent.total_t,
+        'train_t': agent.train_t,
+        'memory': memory_state,
+        'rng': (random.getstate(), np.random.get_state(), torch.get_rng_state(),
+                env.game.dealer.seed_stream.bit_generator.state),
+    }
+    tmp_path = os.path.join(path, TRAINING_STATE + '.tmp')
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, os.path.join(path, TRAINING_STATE))
+
+def load_training_state(agent, env, path):
+    """Restore the agent and the random streams saved by save_training_state.
+
+    Returns the episode to continue at, the training seconds so far and the curve.
+    """
+    import torch
+    state = torch.load(os.path.join(path, TRAINING_STATE), weights_only=False)
+    agent.q_estimator.qnet.load_state_dict(state['qnet'])
+    agent.q_estimator.optimizer.load_state_dict(state['optimizer'])
+    agent.target_estimator.qnet.load_state_dict(state['target_qnet'])
+    agent.total_t = state['total_t']
+    agent.train_t = state['train_t']
+    if isinstance(agent.memory, CambioReplayMemory):
+        agent.memory.np_random.bit_generator.state = state['memory']
+    else:
+        agent.memory.memory = state['memory']
+    python_state, numpy_state, torch_state, deal_state = state['rng']
+    random.setstate(python_state)
+    np.random.set_state(numpy_state)
+    torch.set_rng_state(torch_state)
+    env.game.dealer.seed_stream.bit_generator.state = deal_state
+    return state['episode'], state['seconds'], state['curve']
+
+# Default arguments, also the base of every run of exe.sweep_dqn
+DEFAULT_ARGS = {
+    'seed': 42,
+    'obs_mode': 'vector',  # or 'planes' for the int8 card-plane observation
+    'num_episodes': 5000,
+    'mlp_layers': [64, 64],
+    'agent_kwargs': {},  # Other DQNAgent settings, e.g. {'learning_rate': 1e-4, 'batch_size': 64}
+    'num_eval_games': 100,
+    'num_eval_envs': 32,
+    'num_eval_workers': None,  # One per CPU core
+    'eval_ci_tolerance': None,  # Stop evaluating once the payoff CI is within +/- this
+    'evaluate_every': 100,
+    'eval_cache_size': 0,  # Cache this many evaluation decisions per seat (see agents.cached_policy)
+    'save_path': 'models/cambio_dqn',
+    'checkpoint_path': None,  # e.g. 'models/cambio_dqn/resume' to make the run resumable
+    'checkpoint_every': 500,  # Episodes between training states in checkpoint_path
+    'log_dir': 'logs/cambio_dqn',
+    'episode_log_path': None,  # e.g. 'episodes/cambio_dqn' to log every training game
+    'replay_memory_path': None,  # e.g. 'memory/cambio_dqn' to keep the replay memory on disk
+    'figure_path': 'figures/cambio_dqn.png',  # None skips the plot
+    'profile_every': 0,  # Write phase timings every this many episodes (0 disables profiling)
+    'profile_path': 'logs/cambio_dqn/profile.jsonl',  # .jsonl or .csv
+    'cprofile_episodes': 0,  # cProfile the first this many episodes
+    'cprofile_path': 'logs/cambio_dqn/train.prof',
+    'save_threshold': 0.1,  # Only save if mean reward over last 100 episodes exceeds this
+    'export_dtype': 'float32',  # Also write save_path/qnet.npz for NumpyDQNAgent ('float16', 'int8', or None)
+}
 
 if __name__ == '__main__':
     # Set the arguments
-    args = {
-        'seed': 42,
-        'num_episodes': 5000,
-        'num_eval_games': 100,
-        'evaluate_every': 100,
-        'save_path': 'models/cambio_dqn',
-        'figure_path': 'figures/cambio_dqn.png',
-        'save_threshold': 0.1,  # Only save if mean reward over last 100 episodes exceeds this
-    }
+    args = dict(DEFAULT_ARGS)
 
     # Create directories if not exist
     if not os.path.exists('models'):
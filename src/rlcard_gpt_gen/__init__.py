@@ -1,6 +1,49 @@
-from rlcard.envs.registration import register
+"""Cambio for rlcard.
 
-register(
-    env_id='cambio',
-    entry_point='src.rlcard_gpt_gen.envs.cambio:CambioEnv',
-)
+Importing the package does not import rlcard. The 'cambio' env is registered
+with rlcard's registry as soon as rlcard.envs is imported (right away if it
+already is), so rlcard.make('cambio') works whichever is imported first.
+The game core, the encoders and envs.core_env.CambioCoreEnv only need NumPy.
+"""
+import sys
+
+ENV_ID = 'cambio'
+ENV_MODULE, ENV_CLASS = 'src.rlcard_gpt_gen.envs.cambio', 'CambioEnv'
+
+
+def register():
+    """Register the env with rlcard; does nothing if it already is."""
+    module = sys.modules.get(ENV_MODULE)
+    if module is not None and not hasattr(module, ENV_CLASS):
+        # envs.cambio is being imported (it imports rlcard.envs first) and registers itself when done
+        return
+    from rlcard.envs.registration import registry
+    if ENV_ID not in registry.env_specs:
+        registry.register(ENV_ID, '{}:{}'.format(ENV_MODULE, ENV_CLASS))
+
+
+class _RegisterOnImport:
+    """sys.meta_path finder that calls register() once rlcard.envs has been executed"""
+
+    def find_spec(self, name, path, target=None):
+        if name != 'rlcard.envs':
+            return None
+        import importlib.util
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_register(module):
+            exec_module(module)
+            register()
+
+        spec.loader.exec_module = exec_and_register
+        return spec
+
+
+if 'rlcard.envs' in sys.modules:
+    register()
+else:
+    sys.meta_path.insert(0, _RegisterOnImport())
@@ -1,20 +1,39 @@
 from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.batched import sample_legal
 import numpy as np
 
 
 class AlwaysDrawAgent:
+    """Draws from the deck whenever it can, otherwise plays a random legal action.
+
+    Besides the rlcard agent interface it can act directly on the game core:
+    game_step(CambioGame) and batch_game_step(BatchedCambioGame), which lets
+    CambioEnv advance this seat without encoding observations when
+    fast_forward_scripted is set in the env config.
+    """
+
     def __init__(self, num_actions):
         self.num_actions = num_actions
+        self.use_raw = False
 
     def step(self, state):
-        legal_actions = state['legal_actions']
+        legal_actions = list(state['legal_actions'])
 
-        if "draw_deck" in legal_actions:
-            return legal_actions.index("draw_deck")
+        if config.DRAW_DECK in legal_actions:
+            return config.DRAW_DECK
         else:
             # Randomly select a legal action
-            random_action = np.random.choice(legal_actions)
-            return config.ACTIONS.index(random_action)
+            return legal_actions[np.random.randint(len(legal_actions))]
 
     def eval_step(self, state):
-        return self.step(state), []
\ No newline at end of file
+        return self.step(state), []
+
+    def game_step(self, game):
+        # Drawing from the deck is always legal in the draw phase
+        if game.draw_phase:
+            return config.DRAW_DECK
+        legal_actions = game.get_legal_action_ids()
+        return legal_actions[np.random.randint(len(legal_actions))]
+
+    def batch_game_step(self, game):
+        return np.where(game.draw_phase, config.DRAW_DECK, sample_legal(game.get_legal_actions()))
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+def masked_argmax(values, legal_masks):
+    """Best legal action per row of a (batch, num_actions) array."""
+    return np.argmax(np.where(legal_masks, values, -np.inf), axis=1)
+
+
+def sample_legal(legal_masks, rng=np.random):
+    """Uniformly random legal action per row."""
+    return np.argmax(rng.random(legal_masks.shape) * legal_masks, axis=1)
+
+
+def batch_eval_step(agent, obs, legal_masks):
+    """Greedy actions for a batch of observations, with one forward pass for DQN agents.
+
+    Agents can provide their own batch_eval_step(obs, legal_masks); other agents
+    fall back to one eval_step call per row.
+    """
+    if hasattr(agent, 'batch_eval_step'):
+        return agent.batch_eval_step(obs, legal_masks)
+    if hasattr(agent, 'q_estimator'):  # rlcard DQNAgent
+        return masked_argmax(agent.q_estimator.predict_nograd(obs), legal_masks)
+    return np.array([agent.eval_step(_row_state(o, m))[0] for o, m in zip(obs, legal_masks)])
+
+
+def batch_step(agent, obs, legal_masks, rng=np.random):
+    """Training-time actions for a batch, epsilon-greedy like DQNAgent.step."""
+    if hasattr(agent, 'batch_step'):
+        return agent.batch_step(obs, legal_masks)
+    if hasattr(agent, 'q_estimator'):
+        epsilon = agent.epsilons[min(agent.total_t, agent.epsilon_decay_steps - 1)]
+        explore = rng.random(len(obs)) < epsilon
+        return np.where(explore, sample_legal(legal_masks, rng), batch_eval_step(agent, obs, legal_masks))
+    return np.array([agent.step(_row_state(o, m)) for o, m in zip(obs, legal_masks)])
+
+
+def _row_state(obs, legal_mask):
+    return {'obs': obs, 'legal_actions': OrderedDict.fromkeys(np.flatnonzero(legal_mask).tolist())}
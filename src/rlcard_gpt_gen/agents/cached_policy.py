@@ -0,0 +1,208 @@
+import itertools
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from src.rlcard_gpt_gen.agents.batched import batch_eval_step, batch_step
+from src.rlcard_gpt_gen.utils.profiling import perf_counter_ns
+
+
+def pack_keys(obs, legal_masks, value_columns=()):
+    """Hashable key per row of a batch of observations and legal action masks.
+
+    Observations are almost all zeros and ones, so a key is the bit-packed
+    nonzero mask, the bit-packed legal mask, and the float32 bytes of the
+    value_columns, which must hold every entry other than 0 and 1. Keys are
+    exact at float32, the precision the Q-networks compute in.
+    """
+    obs = np.asarray(obs, dtype=np.float32).reshape(len(obs), -1)
+    parts = [np.packbits(obs != 0, axis=1), np.packbits(legal_masks, axis=1)]
+    if len(value_columns):
+        parts.append(obs[:, value_columns].view(np.uint8))
+    return [row.tobytes() for row in np.concatenate(parts, axis=1)]
+
+
+# Q-network -> its parameter and buffer tensors, which are slow to collect on every call
+_qnet_tensors = weakref.WeakKeyDictionary()
+
+
+def weights_version(agent):
+    """Value that changes whenever the weights of agent change, None for agents without weights.
+
+    For rlcard DQNAgents this reads the in-place version counters of the
+    Q-network tensors, which optimizer steps and load_state_dict both bump.
+    A NumpyDQNAgent changes version when its network is replaced. Other agents
+    can define their own weights_version().
+    """
+    if hasattr(agent, 'weights_version'):
+        return agent.weights_version()
+    if hasattr(agent, 'q_estimator'):
+        qnet = agent.q_estimator.qnet
+        tensors = _qnet_tensors.get(qnet)
+        if tensors is None:
+            tensors = _qnet_tensors[qnet] = list(itertools.chain(qnet.parameters(), qnet.buffers()))
+        return (id(qnet),) + tuple(tensor._version for tensor in tensors)
+    if hasattr(agent, 'network'):
+        return id(agent.network)
+    return None
+
+
+class CachedPolicy:
+    """Greedy policy of a wrapped agent with an LRU cache of its actions and Q-values.
+
+    eval_step and batch_eval_step look every observation and legal mask up in
+    the cache first (see pack_keys) and only run the agent on the misses, in
+    one batch. The cache holds at most max_size entries and is cleared as soon
+    as the weights of the agent change (see weights_version), so it can wrap
+    an agent that is still training. step and batch_step explore, so they go
+    to the agent uncached.
+
+    The wrapped agent must be deterministic in eval_step: DQN agents, or
+    heuristics such as AlwaysDrawAgent, not sampling agents.
+    """
+
+    def __init__(self, agent, max_size=100000):
+        self.agent = agent
+        self.max_size = max_size
+        self.num_actions = agent.num_actions
+        self.use_raw = agent.use_raw
+        self.cache = OrderedDict()  # key -> (action, masked Q-values or None)
+        self.value_mask = None  # Observation entries seen with values other than 0 and 1
+        self.value_columns = np.zeros(0, dtype=np.int64)
+        self.version = weights_version(agent)
+        self.invalidations = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.inference_ns = 0  # Spent in the agent on misses
+        self.total_ns = 0  # Spent in eval_step and batch_eval_step
+
+    def clear(self):
+        self.cache.clear()
+
+    def step(self, state):
+        return self.agent.step(state)
+
+    def batch_step(self, obs, legal_masks):
+        return batch_step(self.agent, obs, legal_masks)
+
+    def eval_step(self, state):
+        start = perf_counter_ns()
+        self._check_weights()
+        legal_actions = list(state['legal_actions'])
+        legal_mask = np.zeros((1, self.num_actions), dtype=bool)
+        legal_mask[0, legal_actions] = True
+        key = self._keys(state['obs'][None], legal_mask)[0]
+        entry = self._get(key)
+        info = {}
+        if entry is None:
+            inference_start = perf_counter_ns()
+            q_values = self._q_values(state['obs'][None], legal_mask)
+            if q_values is None:
+                action, info = self.agent.eval_step(state)
+                entry = (action, None)
+            else:
+                entry = (int(np.argmax(q_values[0])), q_values[0])
+            self.inference_ns += perf_counter_ns() - inference_start
+            self._put(key, entry)
+        action, q_values = entry
+        if q_values is not None:
+            info = {'values': {state['raw_legal_actions'][i]: float(q_values[a]) for i, a in enumerate(legal_actions)}}
+        self.total_ns += perf_counter_ns() - start
+        return action, info
+
+    def batch_eval_step(self, obs, legal_masks):
+        start = perf_counter_ns()
+        self._check_weights()
+        keys = self._keys(obs, legal_masks)
+        actions = np.empty(len(keys), dtype=np.int64)
+        missing = []
+        cache = self.cache
+        for i, key in enumerate(keys):
+            entry = cache.get(key)
+            if entry is None:
+                missing.append(i)
+            else:
+                cache.move_to_end(key)
+                actions[i] = entry[0]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            inference_start = perf_counter_ns()
+            rows = np.array(missing)
+            q_values = self._q_values(obs[rows], legal_masks[rows])
+            if q_values is None:
+                entries = [(int(action), None) for action in batch_eval_step(self.agent, obs[rows], legal_masks[rows])]
+            else:
+                entries = [(int(action), row) for action, row in zip(q_values.argmax(axis=1), q_values)]
+            self.inference_ns += perf_counter_ns() - inference_start
+            for i, entry in zip(missing, entries):
+                actions[i] = entry[0]
+                self._put(keys[i], entry)
+        self.total_ns += perf_counter_ns() - start
+        return actions
+
+    def stats(self):
+        """Hit rate, and the time the cache saved: hits times the mean inference time of a miss"""
+        lookups = self.hits + self.misses
+        saved_ns = self.hits * self.inference_ns / self.misses if self.misses else 0
+        return {
+            'size': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'inference_ms': self.inference_ns / 1e6,
+            'overhead_ms': (self.total_ns - self.inference_ns) / 1e6,
+            'saved_ms': saved_ns / 1e6,
+        }
+
+    def _q_values(self, obs, legal_masks):
+        """Q-values with illegal actions at -inf, or None if the agent has no Q-network"""
+        if hasattr(self.agent, 'q_estimator'):
+            q_values = self.agent.q_estimator.predict_nograd(np.asarray(obs))
+        elif hasattr(self.agent, 'network'):
+            q_values = self.agent.network.predict(obs)
+        else:
+            return None
+        return np.where(legal_masks, q_values, -np.inf).astype(np.float32)
+
+    def _keys(self, obs, legal_masks):
+        obs = np.asarray(obs, dtype=np.float32).reshape(len(obs), -1)
+        if self.value_mask is None:
+            self.value_mask = np.zeros(obs.shape[1], dtype=bool)
+        new_values = ((obs != 0) & (obs != 1)).any(axis=0) & ~self.value_mask
+        if new_values.any():
+            # Keys change layout, so the cached ones can no longer be found
+            self.value_mask |= new_values
+            self.value_columns = np.flatnonzero(self.value_mask)
+            self.cache.clear()
+        return pack_keys(obs, legal_masks, self.value_columns)
+
+    def _check_weights(self):
+        version = weights_version(self.agent)
+        if version != self.version:
+            if self.cache:
+                self.invalidations += 1
+                self.cache.clear()
+            self.version = version
+
+    def _get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return entry
+
+    def _put(self, key, entry):
+        self.cache[key] = entry
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,41 @@
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.agents.always_draw_agent import AlwaysDrawAgent
+from src.rlcard_gpt_gen.search.endgame import EndgameSolver
+
+
+class EndgameAgent:
+    """Plays the endgame with an EndgameSolver and calls cambio when the solver expects it to pay off.
+
+    Before cambio is called, other decisions go to fallback (any agent with
+    game_step). It acts on the game core: CambioEnv.set_agents binds the env's
+    game (bind_game), which step/eval_step play on, and with
+    fast_forward_scripted set in the env config its seat is played through
+    game_step without building observations. VectorCambioEnv keeps its games
+    in the workers, so the Evaluator cannot play it.
+    """
+
+    def __init__(self, num_actions, fallback=None, call_threshold=0.0, solver=None):
+        self.num_actions = num_actions
+        self.use_raw = False
+        self.fallback = fallback if fallback is not None else AlwaysDrawAgent(num_actions)
+        self.call_threshold = call_threshold
+        self.solver = solver if solver is not None else EndgameSolver()
+        self.game = None
+
+    def bind_game(self, game):
+        self.game = game
+
+    def step(self, state):
+        if self.game is None:
+            raise ValueError('EndgameAgent plays on the game core; seat it with CambioEnv.set_agents to bind the game')
+        return self.game_step(self.game)
+
+    def eval_step(self, state):
+        return self.step(state), []
+
+    def game_step(self, game):
+        if game.called_cambio:
+            return self.solver.best_action(game)
+        if game.draw_phase and self.solver.cambio_value(game) > self.call_threshold:
+            return config.CALL_CAMBIO
+        return self.fallback.game_step(game)
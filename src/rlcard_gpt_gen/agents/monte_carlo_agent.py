@@ -0,0 +1,43 @@
+from src.rlcard_gpt_gen.agents.always_draw_agent import AlwaysDrawAgent
+from src.rlcard_gpt_gen.search.rollouts import RolloutService
+
+
+class MonteCarloAgent:
+    """Picks the legal action with the best mean payoff over determinized playouts.
+
+    Every decision samples the cards it has not seen, plays each legal action
+    out with the service's default policies and takes the best one, within
+    num_rollouts playouts per action or time_budget seconds. Like
+    EndgameAgent it acts on the game core: step/eval_step play on the game
+    bound by CambioEnv.set_agents, and with fast_forward_scripted set in the
+    env config its seat is played through game_step.
+    """
+
+    def __init__(self, num_actions, service=None, num_rollouts=64, time_budget=None):
+        self.num_actions = num_actions
+        self.use_raw = False
+        # Without a service, one with AlwaysDrawAgent playouts is made for the first table played
+        self.service = service
+        self.num_rollouts = num_rollouts
+        self.time_budget = time_budget
+        self.game = None
+
+    def bind_game(self, game):
+        self.game = game
+
+    def step(self, state):
+        if self.game is None:
+            raise ValueError('MonteCarloAgent plays on the game core; seat it with CambioEnv.set_agents to bind the game')
+        return self.game_step(self.game)
+
+    def eval_step(self, state):
+        return self.step(state), []
+
+    def game_step(self, game):
+        legal_actions = game.get_legal_action_ids()
+        if len(legal_actions) == 1:
+            return legal_actions[0]
+        if self.service is None:
+            self.service = RolloutService([AlwaysDrawAgent(self.num_actions) for _ in range(game.num_players)])
+        values = self.service.action_values(game, num_rollouts=self.num_rollouts, time_budget=self.time_budget)
+        return max(values, key=values.get)
@@ -0,0 +1,157 @@
+import os
+
+import numpy as np
+
+from src.rlcard_gpt_gen.agents.batched import masked_argmax
+
+WEIGHT_DTYPES = ('float32', 'float16', 'int8')
+BATCH_NORM_EPS = 1e-5  # nn.BatchNorm1d default, used by rlcard's EstimatorNetwork
+
+
+def _qnet_state_dict(source):
+    """State dict of rlcard's EstimatorNetwork from a DQNAgent, a checkpoint dict or a checkpoint path"""
+    if hasattr(source, 'q_estimator'):
+        return source.q_estimator.qnet.state_dict()
+    if isinstance(source, str):
+        import torch
+        if os.path.isdir(source):
+            source = os.path.join(source, 'checkpoint_dqn.pt')
+        source = torch.load(source, map_location='cpu', weights_only=False)
+        if hasattr(source, 'q_estimator'):  # A whole pickled agent
+            return source.q_estimator.qnet.state_dict()
+    if 'q_estimator' in source:  # DQNAgent.checkpoint_attributes()
+        return source['q_estimator']['qnet']
+    if 'qnet' in source:  # Estimator.checkpoint_attributes()
+        return source['qnet']
+    return source
+
+
+def qnet_layers(state_dict):
+    """(input_scale, input_shift, [(weight (in, out), bias)]) of the Q-network, in float64.
+
+    The network is Flatten, BatchNorm1d, then Linear layers with Tanh between
+    them. In eval mode the batch norm is the affine map x * input_scale + input_shift.
+    """
+    params = {key: value.detach().cpu().double().numpy() for key, value in state_dict.items()
+              if not key.endswith('num_batches_tracked')}
+    indices = sorted({int(key.split('.')[1]) for key in params})
+    batch_norm = 'fc_layers.{}.'.format(indices[0])
+    input_scale = params[batch_norm + 'weight'] / np.sqrt(params[batch_norm + 'running_var'] + BATCH_NORM_EPS)
+    input_shift = params[batch_norm + 'bias'] - params[batch_norm + 'running_mean'] * input_scale
+    layers = [(params['fc_layers.{}.weight'.format(i)].T, params['fc_layers.{}.bias'.format(i)]) for i in indices[1:]]
+    return input_scale, input_shift, layers
+
+
+def fold_input(input_scale, input_shift, layers):
+    """Fold the input affine map into the first dense layer"""
+    (weight, bias), rest = layers[0], layers[1:]
+    return [(weight * input_scale[:, None], bias + input_shift @ weight)] + rest
+
+
+def export_qnet(source, path, dtype='float32'):
+    """Write the Q-network of source (see _qnet_state_dict) as an .npz weights file.
+
+    Dense weights are stored as float32, float16, or int8 with one float32
+    scale per output unit (symmetric quantization). Biases and the batch norm
+    map stay float32: the batch norm is only folded into the first layer on
+    load, because its scales differ by orders of magnitude between inputs and
+    would swamp the int8 range. Needs torch only to read checkpoint files.
+    """
+    if dtype not in WEIGHT_DTYPES:
+        raise ValueError('dtype must be one of {}'.format(WEIGHT_DTYPES))
+    input_scale, input_shift, layers = qnet_layers(_qnet_state_dict(source))
+    arrays = {
+        'dtype': np.array(dtype),
+        'input_scale': input_scale.astype(np.float32),
+        'input_shift': input_shift.astype(np.float32),
+    }
+    for i, (weight, bias) in enumerate(layers):
+        if dtype == 'int8':
+            scale = np.abs(weight).max(axis=0) / 127
+            scale[scale == 0] = 1
+            arrays['weight_{}'.format(i)] = np.rint(weight / scale).astype(np.int8)
+            arrays['scale_{}'.format(i)] = scale.astype(np.float32)
+        else:
+            arrays['weight_{}'.format(i)] = weight.astype(dtype)
+        arrays['bias_{}'.format(i)] = bias.astype(np.float32)
+    np.savez(path, **arrays)
+
+
+class NumpyQNetwork:
+    """Forward pass of an exported Q-network in NumPy, on float32 dense layers.
+
+    Weights are expanded to float32 on load, whatever their stored dtype, so
+    quantization only shrinks the file and adds its rounding error; the
+    network itself is a few hundred KB at most.
+    """
+
+    def __init__(self, layers):
+        self.layers = [(np.ascontiguousarray(weight, dtype=np.float32), np.asarray(bias, dtype=np.float32))
+                       for weight, bias in layers]
+        self.state_dim = self.layers[0][0].shape[0]
+        self.num_actions = self.layers[-1][0].shape[1]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            num_layers = sum(1 for key in data.files if key.startswith('weight_'))
+            layers = []
+            for i in range(num_layers):
+                weight = data['weight_{}'.format(i)].astype(np.float64)
+                if 'scale_{}'.format(i) in data.files:
+                    weight *= data['scale_{}'.format(i)]
+                layers.append((weight, data['bias_{}'.format(i)].astype(np.float64)))
+            return cls(fold_input(data['input_scale'].astype(np.float64), data['input_shift'].astype(np.float64), layers))
+
+    @classmethod
+    def from_agent(cls, agent):
+        """Network with the current weights of a DQNAgent, without going through a file"""
+        return cls(fold_input(*qnet_layers(agent.q_estimator.qnet.state_dict())))
+
+    def predict(self, obs):
+        """Q-values (batch, num_actions) of a batch of observations"""
+        x = np.asarray(obs, dtype=np.float32).reshape(len(obs), self.state_dim)
+        last = len(self.layers) - 1
+        for i, (weight, bias) in enumerate(self.layers):
+            x = x @ weight
+            x += bias
+            if i < last:
+                np.tanh(x, out=x)
+        return x
+
+
+class NumpyDQNAgent:
+    """Greedy DQN policy on a NumpyQNetwork, usable without torch.
+
+    Acts like DQNAgent.eval_step for both step and eval_step, so it drops into
+    env.set_agents for evaluation and play; batch_eval_step serves a whole
+    batch with one forward pass and one masked argmax.
+    """
+
+    def __init__(self, network):
+        self.network = NumpyQNetwork.load(network) if isinstance(network, str) else network
+        self.num_actions = self.network.num_actions
+        self.use_raw = False
+
+    def predict(self, state):
+        """Q-values of the state with illegal actions set to -inf"""
+        q_values = self.network.predict(state['obs'][None])[0]
+        masked = np.full(self.num_actions, -np.inf, dtype=np.float32)
+        legal_actions = list(state['legal_actions'])
+        masked[legal_actions] = q_values[legal_actions]
+        return masked
+
+    def step(self, state):
+        return int(np.argmax(self.predict(state)))
+
+    def eval_step(self, state):
+        q_values = self.predict(state)
+        info = {'values': {state['raw_legal_actions'][i]: float(q_values[action])
+                           for i, action in enumerate(state['legal_actions'])}}
+        return int(np.argmax(q_values)), info
+
+    def batch_eval_step(self, obs, legal_masks):
+        return masked_argmax(self.network.predict(obs), legal_masks)
+
+    def batch_step(self, obs, legal_masks):
+        return self.batch_eval_step(obs, legal_masks)
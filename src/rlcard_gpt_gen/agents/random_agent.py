@@ -0,0 +1,28 @@
+from src.rlcard_gpt_gen.agents.batched import sample_legal
+import numpy as np
+
+
+class RandomAgent:
+    """Plays a uniformly random legal action.
+
+    Same interface as AlwaysDrawAgent, including game_step/batch_game_step
+    for scripted seats.
+    """
+
+    def __init__(self, num_actions):
+        self.num_actions = num_actions
+        self.use_raw = False
+
+    def step(self, state):
+        legal_actions = list(state['legal_actions'])
+        return legal_actions[np.random.randint(len(legal_actions))]
+
+    def eval_step(self, state):
+        return self.step(state), []
+
+    def game_step(self, game):
+        legal_actions = game.get_legal_action_ids()
+        return legal_actions[np.random.randint(len(legal_actions))]
+
+    def batch_game_step(self, game):
+        return sample_legal(game.get_legal_actions())
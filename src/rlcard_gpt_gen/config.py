@@ -1,11 +1,45 @@
 # CAMBIO FIXED VALUES
 
-# Number of players in the game
+# Number of players in the game (default; games and envs take num_players)
 N_PLAYERS = 3
+MIN_PLAYERS = 2
+MAX_PLAYERS = 8
 
-# Actions
-ACTIONS = ['draw_deck', 'draw_pile', 'call_cambio', 'discard', 
-           'swap_0', 'swap_1', 'swap_2', 'swap_3']
+# Number of cards in each player's hand (default; games and envs take hand_size)
+HAND_SIZE = 4
+MIN_HAND_SIZE = 2  # Two cards are looked at in the beginning
+MAX_HAND_SIZE = 8
+
+# Actions, with one swap action per hand slot
+def action_list(hand_size=HAND_SIZE):
+    return ['draw_deck', 'draw_pile', 'call_cambio', 'discard'] + ['swap_{}'.format(i) for i in range(hand_size)]
+
+
+def num_actions(hand_size=HAND_SIZE):
+    return 4 + hand_size
+
+
+# Full-rules games (games.full_rules_game) have extra hand slots for penalty cards, and
+# ability and stick actions after the simplified ones
+PENALTY_SLOTS = 2
+
+
+def full_rules_action_list(hand_capacity, num_players):
+    return (action_list(hand_capacity) + ['pass']
+            + ['slot_{}'.format(i) for i in range(hand_capacity)]
+            + ['player_{}'.format(i) for i in range(num_players)]
+            + ['stick_{}'.format(i) for i in range(hand_capacity)] + ['stick_other'])
+
+
+ACTIONS = action_list()
 NUM_ACTIONS = len(ACTIONS)
 CALL_CAMBIO_ACTION = 'call_cambio'
 
+# Integer action ids (indices into ACTIONS), used by the game core
+# The ids do not depend on the hand size: swap_i is always SWAP_0 + i
+ACTION_IDS = {action: i for i, action in enumerate(action_list(MAX_HAND_SIZE))}
+DRAW_DECK = ACTION_IDS['draw_deck']
+DRAW_PILE = ACTION_IDS['draw_pile']
+CALL_CAMBIO = ACTION_IDS['call_cambio']
+DISCARD = ACTION_IDS['discard']
+SWAP_0 = ACTION_IDS['swap_0']
@@ -0,0 +1,292 @@
+from src.rlcard_gpt_gen.games.full_rules_game import FullRulesCambioGame
+from src.rlcard_gpt_gen.games.game import CambioGame
+from src.rlcard_gpt_gen import config as cambio_config
+from src.rlcard_gpt_gen.envs.obs_encoder import (
+    CARD_SLOTS, CardPlaneObsEncoder, FullRulesObsEncoder, IncrementalObsEncoder, NUM_RANKS, PLANE_HISTORY,
+    UNKNOWN_SLOT, VectorLayout,
+)
+from src.rlcard_gpt_gen.utils.profiling import perf_counter_ns
+from collections import OrderedDict
+
+import numpy as np
+
+class CambioCoreEnv:
+    """The Cambio env on NumPy alone, without importing rlcard.
+
+    Same config, observations, stepping and run() as CambioEnv, which adds
+    rlcard's Env base class on top; use this one directly in processes that
+    only play games (workers, the human CLI).
+    """
+
+    def __init__(self, config):
+        self.name = 'cambio'
+        # Table shape, following rlcard's 'game_' prefix for game settings
+        table = (
+            config.get('game_num_players', cambio_config.N_PLAYERS),
+            config.get('game_hand_size', cambio_config.HAND_SIZE),
+            config.get('game_num_decks'),
+        )
+        # 'game_full_rules' plays abilities, sticking and penalty cards (see games.full_rules_game)
+        self.full_rules = config.get('game_full_rules', False)
+        if self.full_rules:
+            self.game = FullRulesCambioGame(*table, config.get('game_penalty_slots', cambio_config.PENALTY_SLOTS))
+            self.action_list = self.game.action_list
+        else:
+            self.game = CambioGame(*table)
+            self.action_list = cambio_config.action_list(self.game.hand_size)
+        num_players = self.game.num_players
+
+        # State shape components:
+        # - Player's hand (hand_size cards * 15 values; 14 card values + 1 for unknown)
+        # - Discard pile (15 positions one-hot, showing only top card)
+        # - Per-player visible discards (15 values * num_players)
+        # - Game state flags (draw_phase, called_cambio, current_player) = 3
+        # Total: 123 dimensions for 3 players with 4 cards
+        self.vector_layout = VectorLayout(num_players, self.game.hand_size)
+        self.state_shape = [[self.vector_layout.dim] for _ in range(num_players)]
+        self.action_shape = [None for _ in range(num_players)]
+
+        # Observation encoding:
+        # - 'vector': encode every state from scratch
+        # - 'incremental': update per-player buffers from the game's deltas; the discard
+        #   histories are then only put in raw_obs if 'raw_history' is set
+        # - 'planes': int8 card planes of shape (num_planes, 14), see CardPlaneObsEncoder, with
+        #   the last 'plane_history' actions; raw_obs histories work as with 'incremental'
+        # With 'share_obs_buffer' the incremental encoder returns its buffer without copying,
+        # which is only safe if agents do not keep observations across steps.
+        # Full-rules games only have the 'vector' observation, see FullRulesObsEncoder
+        self.obs_mode = config.get('obs_mode', 'vector')
+        if self.full_rules:
+            if self.obs_mode != 'vector':
+                raise ValueError("Full-rules games only support obs_mode 'vector'")
+            self.obs_encoder = FullRulesObsEncoder.for_game(self.game)
+            self.state_shape = [[self.obs_encoder.dim] for _ in range(num_players)]
+        elif self.obs_mode == 'vector':
+            self.obs_encoder = None
+        elif self.obs_mode == 'incremental':
+            self.obs_encoder = IncrementalObsEncoder(num_players, self.game.hand_size)
+            self.game.include_history = config.get('raw_history', False)
+        elif self.obs_mode == 'planes':
+            self.obs_encoder = CardPlaneObsEncoder.for_game(self.game, config.get('plane_history', PLANE_HISTORY))
+            self.game.include_history = config.get('raw_history', False)
+            self.state_shape = [[self.obs_encoder.num_planes, NUM_RANKS] for _ in range(num_players)]
+        else:
+            raise ValueError('Unknown obs_mode: {}'.format(self.obs_mode))
+        self.share_obs_buffer = config.get('share_obs_buffer', False)
+
+        # Opt-in: seats whose agent implements game_step(game) are played directly on the
+        # game core, without building their observations (see set_agents), so run() leaves
+        # their trajectories empty; scripted agents only know the simplified rules
+        self.fast_forward_scripted = config.get('fast_forward_scripted', False) and not self.full_rules
+
+        # Optional utils.profiling.Profiler timing the game, the encoding and the agents
+        self.profiler = None
+
+        # What rlcard's Env.__init__ sets up
+        self.allow_step_back = self.game.allow_step_back = config.get('allow_step_back', False)
+        self.action_recorder = []
+        self.num_players = self.game.get_num_players()
+        self.num_actions = self.game.get_num_actions()
+        self.timestep = 0
+        self.seed(config.get('seed'))
+        self.agents = None
+        self.scripted_agents = [None for _ in range(self.num_players)]
+
+    def seed(self, seed=None):
+        self.game.seed(seed)
+        return seed
+
+    def set_agents(self, agents):
+        if self.full_rules:
+            for agent in agents:
+                if hasattr(agent, 'bind_game') or (hasattr(agent, 'game_step') and not hasattr(agent, 'step')):
+                    raise ValueError('{} only plays the simplified rules on the game core, '
+                                     'it cannot sit at a full-rules table'.format(type(agent).__name__))
+        scripted_agents = [
+            agent if self.fast_forward_scripted and hasattr(agent, 'game_step') else None
+            for agent in agents
+        ]
+        for agent, scripted in zip(agents, scripted_agents):
+            if scripted is None and not hasattr(agent, 'step'):
+                raise ValueError('{} has no step(state); agents that only implement game_step need '
+                                 'fast_forward_scripted in the env config'.format(type(agent).__name__))
+        self.agents = agents
+        self.scripted_agents = scripted_agents
+        # Agents that search the game core play step(state) on this env's game
+        for agent in agents:
+            if hasattr(agent, 'bind_game'):
+                agent.bind_game(self.game)
+
+    def reset(self, seed=None):
+        """Start a new game, optionally dealt from the given seed"""
+        self.game.init_game(seed)
+        self.action_recorder = []
+        return self._advance()
+
+    def step(self, action, raw_action=False):
+        if not raw_action:
+            action = self._decode_action(action)
+
+        self.timestep += 1
+        self.action_recorder.append((self.get_player_id(), action))
+        if self.profiler is None:
+            self.game.apply_action(action)
+        else:
+            start = perf_counter_ns()
+            self.game.apply_action(action)
+            self.profiler.add('game_step', perf_counter_ns() - start)
+            self.profiler.count('env_steps')
+        return self._advance()
+
+    def _advance(self):
+        """Let scripted seats play, then return the state of the next seat to act"""
+        game = self.game
+        profiler = self.profiler
+        if profiler is not None:
+            start, timestep = perf_counter_ns(), self.timestep
+
+        while not game.is_over():
+            agent = self.scripted_agents[game.current_player]
+            if agent is None:
+                break
+            action = agent.game_step(game)
+            self.timestep += 1
+            self.action_recorder.append((game.current_player, action))
+            game.apply_action(action)
+
+        player_id = game.current_player
+        if profiler is None:
+            return self._extract_state(game.get_state(player_id)), player_id
+
+        if self.timestep > timestep:
+            profiler.add('scripted_step', perf_counter_ns() - start, self.timestep - timestep)
+        start = perf_counter_ns()
+        state = game.get_state(player_id)
+        mid = perf_counter_ns()
+        extracted_state = self._extract_state(state)
+        profiler.add('get_state', mid - start)
+        profiler.add('encode', perf_counter_ns() - mid)
+        return extracted_state, player_id
+
+    def _extract_state(self, state):
+        """Extract the state representation from state dictionary for agent"""
+        extracted_state = {}
+        
+        # Convert legal actions to an OrderedDict as expected by DQN agent
+        extracted_state['legal_actions'] = OrderedDict.fromkeys(state['legal_action_ids'])
+
+        if self.obs_encoder is None:
+            obs = self._encode_vector(state)
+        else:
+            obs = self.obs_encoder.encode(self.game, state['player_id'])
+            if not self.share_obs_buffer:
+                obs = obs.copy()
+
+        extracted_state['obs'] = obs
+        extracted_state['raw_obs'] = state
+        extracted_state['raw_legal_actions'] = state['legal_actions']
+        
+        return extracted_state
+
+    def _encode_vector(self, state):
+        """Encode a state dictionary into the observation vector"""
+        layout = self.vector_layout
+        # Initialize observation vector
+        obs = np.zeros(layout.dim)
+        
+        # Encode player's hand (15 possible values per card)
+        # Value 14 represents unknown card, values 0-13 represent actual cards
+        hand = state['obs']
+        for card_idx, card in enumerate(hand):
+            if card >= 0:  # known card
+                obs[card_idx * CARD_SLOTS + card] = 1
+            else:  # unknown card
+                obs[card_idx * CARD_SLOTS + UNKNOWN_SLOT] = 1
+        
+        # Encode top card of discard pile (next 15 positions)
+        public_cards = state['public_cards']
+        top_card = public_cards['top_card']
+        if top_card is not None and top_card >= 0:
+            obs[layout.top_offset + top_card] = 1
+        
+        # Encode per-player visible discards (15 positions per player)
+        for player_idx, discards in enumerate(public_cards['player_discards'].values()):
+            if discards:  # Only encode the most recent discard for each player
+                last_discard = discards[-1]
+                if last_discard >= 0:
+                    obs[layout.discards_offset + player_idx * CARD_SLOTS + last_discard] = 1
+        
+        # Encode game state flags (last 3 positions)
+        offset = layout.flags_offset
+        obs[offset] = 1 if state['draw_phase'] else 0
+        obs[offset + 1] = 1 if state['called_cambio'] else 0
+        obs[offset + 2] = state['current_player'] / layout.num_players  # Normalize player ID
+
+        return obs
+
+    def _decode_action(self, action_id):
+        # The game core works on action ids directly
+        return int(action_id)
+
+    def _encode_action(self, action):
+        return cambio_config.ACTION_IDS[action]
+
+    def _get_legal_actions(self):
+        return self.game.get_legal_action_ids()
+
+    def get_payoffs(self):
+        return self.game.get_payoffs()
+
+    def is_over(self):
+        return self.game.is_over()
+
+    def get_player_id(self):
+        return self.game.get_player_id()
+
+    def get_state(self, player_id):
+        """Get state representation for current player"""
+        return self._extract_state(self.game.get_state(player_id))
+
+    def run(self, is_training=False):
+        """Run a complete game and get trajectories and payoffs.
+        Overriding the default run method to handle payoffs format differently for training vs evaluation.
+        """
+        trajectories = [[] for _ in range(self.num_players)]
+        state, player_id = self.reset()
+
+        # Loop until the game is over
+        while not self.is_over():
+            # Save state
+            trajectories[player_id].append(state)
+
+            # Agent plays
+            if self.profiler is None:
+                action = self.agents[player_id].step(state)
+            else:
+                start = perf_counter_ns()
+                action = self.agents[player_id].step(state)
+                self.profiler.add('agent_step', perf_counter_ns() - start)
+
+            # Save action
+            trajectories[player_id].append(action)
+
+            # Environment step
+            next_state, next_player_id = self.step(action, self.agents[player_id].use_raw)
+            state = next_state
+            player_id = next_player_id
+
+        # Save final state; a scripted seat may have moved last, so with fast-forward
+        # every seat played through the env gets one
+        if self.fast_forward_scripted:
+            for player_id in range(self.num_players):
+                if self.scripted_agents[player_id] is None:
+                    trajectories[player_id].append(self.get_state(player_id))
+        else:
+            trajectories[player_id].append(state)
+
+        # Get payoffs
+        payoffs = self.get_payoffs()
+        if self.profiler is not None:
+            self.profiler.count('episodes')
+        
+        return trajectories, payoffs
\ No newline at end of file
@@ -0,0 +1,333 @@
+import itertools
+from collections import deque
+
+import numpy as np
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.games.dealer import BASE_DECK
+from src.rlcard_gpt_gen.games.full_rules_game import EMPTY_SLOT, NUM_PHASES
+from src.rlcard_gpt_gen.games.game import DELTA_HAND, DELTA_TOP, DELTA_DISCARD, DELTA_ACTION
+
+
+# Layout of the vector observation built by CambioEnv._extract_state:
+# hand slots, top card and each player's last discard as CARD_SLOTS one-hots, then 3 flags
+CARD_SLOTS = 15  # 14 card values + 1 for unknown
+UNKNOWN_SLOT = 14
+
+
+class VectorLayout:
+    """Offsets of the vector observation for a table shape"""
+
+    def __init__(self, num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE):
+        self.num_players = num_players
+        self.hand_size = hand_size
+        self.top_offset = hand_size * CARD_SLOTS
+        self.discards_offset = self.top_offset + CARD_SLOTS
+        self.flags_offset = self.discards_offset + num_players * CARD_SLOTS
+        self.dim = self.flags_offset + 3
+
+
+# Offsets of the default table
+_DEFAULT_LAYOUT = VectorLayout()
+TOP_CARD_OFFSET = _DEFAULT_LAYOUT.top_offset
+DISCARDS_OFFSET = _DEFAULT_LAYOUT.discards_offset
+FLAGS_OFFSET = _DEFAULT_LAYOUT.flags_offset
+OBS_DIM = _DEFAULT_LAYOUT.dim
+
+
+class _PlayerBuffer:
+    """Preallocated observation of one player plus the slots currently set in it."""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.obs = np.zeros(layout.dim)
+        self.episode_id = None
+        self.cursor = 0  # Number of game deltas already applied
+        self.hand = [None] * layout.hand_size  # Set index per hand slot
+        self.top = None
+        self.discards = [None] * layout.num_players
+
+    def set_hand(self, slot, card):
+        self.hand[slot] = self._set(self.hand[slot], slot * CARD_SLOTS + (card if card >= 0 else UNKNOWN_SLOT))
+
+    def set_top(self, card):
+        self.top = self._set(self.top, self.layout.top_offset + card if card is not None and card >= 0 else None)
+
+    def set_discard(self, player_idx, card):
+        self.discards[player_idx] = self._set(
+            self.discards[player_idx],
+            self.layout.discards_offset + player_idx * CARD_SLOTS + card if card >= 0 else None)
+
+    def _set(self, old_index, new_index):
+        """Move a one-hot entry from old_index to new_index (either may be None)."""
+        if old_index is not None:
+            self.obs[old_index] = 0
+        if new_index is not None:
+            self.obs[new_index] = 1
+        return new_index
+
+
+class IncrementalObsEncoder:
+    """Keeps one observation buffer per player and updates it from CambioGame.deltas.
+
+    Produces the same vector as CambioEnv._extract_state, but only touches the
+    slots changed since the player's last observation. A buffer is rebuilt from
+    the game state once per episode.
+    """
+
+    def __init__(self, num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE):
+        self.num_players = num_players
+        self.layout = VectorLayout(num_players, hand_size)
+        self.buffers = [_PlayerBuffer(self.layout) for _ in range(num_players)]
+
+    def encode(self, game, player_id):
+        """Return the player's observation buffer. It is overwritten by later calls."""
+        buffer = self.buffers[player_id]
+        if buffer.episode_id != game.episode_id:
+            self._rebuild(buffer, game, player_id)
+        else:
+            self._apply_deltas(buffer, game, player_id)
+
+        # Game state flags
+        obs = buffer.obs
+        flags_offset = self.layout.flags_offset
+        obs[flags_offset] = 1 if game.draw_phase else 0
+        obs[flags_offset + 1] = 1 if game.called_cambio else 0
+        obs[flags_offset + 2] = game.current_player / self.num_players  # Normalize player ID
+        return obs
+
+    def _rebuild(self, buffer, game, player_id):
+        buffer.obs[:] = 0
+        buffer.hand = [None] * self.layout.hand_size
+        buffer.top = None
+        buffer.discards = [None] * self.num_players
+
+        for slot, card in enumerate(game.players[player_id].get_obs()):
+            buffer.set_hand(slot, card)
+        buffer.set_top(game.public_deck[-1] if game.public_deck else None)
+        for player_idx, discards in game.player_discards.items():
+            if discards:
+                buffer.set_discard(player_idx, discards[-1])
+
+        buffer.episode_id = game.episode_id
+        buffer.cursor = len(game.deltas)
+
+    def _apply_deltas(self, buffer, game, player_id):
+        deltas = game.deltas
+        for i in range(buffer.cursor, len(deltas)):
+            delta = deltas[i]
+            kind = delta[0]
+            if kind == DELTA_TOP:
+                buffer.set_top(delta[1])
+            elif kind == DELTA_DISCARD:
+                buffer.set_discard(delta[1], delta[2])
+            elif kind == DELTA_HAND and delta[1] == player_id:
+                buffer.set_hand(delta[2], delta[3])
+        buffer.cursor = len(deltas)
+
+
+# Card-plane observation: int8 planes of NUM_RANKS columns, one column per card value
+NUM_RANKS = 14
+RANK_COUNTS = np.bincount(BASE_DECK, minlength=NUM_RANKS).astype(np.int8)  # In one deck
+PLANE_HISTORY = 8  # Default number of past actions in the planes
+
+
+def history_rows(num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE):
+    """Planes per past action: the acting player gets its own plane if it does not fit next to the action"""
+    return 1 if config.num_actions(hand_size) + num_players <= NUM_RANKS else 2
+
+
+def num_card_planes(num_players=config.N_PLAYERS, history=PLANE_HISTORY, hand_size=config.HAND_SIZE):
+    return hand_size + 5 + num_players + history * history_rows(num_players, hand_size)
+
+
+class CardPlaneObsEncoder:
+    """Card-plane observation of shape (num_card_planes(), NUM_RANKS), dtype int8.
+
+    Planes, seen from player_id (other players are ordered relative to it):
+    - hand_size planes: one-hot card of each own hand slot, empty if unknown
+    - known mask: column i is set if hand slot i is known
+    - top card of the discard pile, one-hot
+    - drawn card (only for the player who drew it), one-hot
+    - flags: draw_phase, called_cambio, then the relative current player one-hot
+    - num_players planes: how many cards of each rank every player has discarded
+    - cards of each rank the player has not seen (deck and hidden hand cards)
+    - history planes: the last actions, most recent first, as the action
+      one-hot plus the relative acting player at column num_actions + offset;
+      on tables where that does not fit in NUM_RANKS columns, the player
+      one-hot takes a second plane per action (see history_rows)
+
+    Per-rank counters for the discards, the pile and the hand cards everybody
+    knows of (taken from the pile) are updated from CambioGame.deltas, so no
+    history is rescanned. They are built lazily: only when encode is called.
+    """
+
+    def __init__(self, num_players=config.N_PLAYERS, history=PLANE_HISTORY, hand_size=config.HAND_SIZE, num_decks=1):
+        self.num_players = num_players
+        self.history = history
+        self.hand_size = hand_size
+        self.rank_counts = RANK_COUNTS * num_decks
+        self.num_actions = config.num_actions(hand_size)
+        self.history_rows = history_rows(num_players, hand_size)
+        # Column of the relative acting player in the history planes
+        self.history_player_column = self.num_actions if self.history_rows == 1 else 0
+
+        self.known_row = hand_size
+        self.top_row = self.known_row + 1
+        self.drawn_row = self.top_row + 1
+        self.flags_row = self.drawn_row + 1
+        self.discards_row = self.flags_row + 1
+        self.unseen_row = self.discards_row + num_players
+        self.actions_row = self.unseen_row + 1
+        self.num_planes = self.actions_row + history * self.history_rows
+        assert self.num_planes == num_card_planes(num_players, history, hand_size)
+
+        self.buffers = np.zeros((num_players, self.num_planes, NUM_RANKS), dtype=np.int8)
+        # Seats ordered relative to each player
+        self.seat_orders = [[(player_id + offset) % num_players for offset in range(num_players)]
+                            for player_id in range(num_players)]
+        self.episode_id = None
+
+    @classmethod
+    def for_game(cls, game, history=PLANE_HISTORY):
+        """Encoder for the table shape of game"""
+        return cls(game.num_players, history, game.hand_size, game.dealer.num_decks)
+
+    def _reset(self, game):
+        num_players = self.num_players
+        self.episode_id = game.episode_id
+        self.cursor = 0
+        self.top = None
+        self.discard_counts = np.zeros((num_players, NUM_RANKS), dtype=np.int8)
+        self.pile_counts = np.zeros(NUM_RANKS, dtype=np.int8)
+        self.public_counts = np.zeros(NUM_RANKS, dtype=np.int8)  # Cards in hands (or drawn) known to all
+        self.public_hand = [[-1] * self.hand_size for _ in range(num_players)]
+        self.pile_draws = [None] * num_players  # Card a player holds after drawing from the pile
+        self.actions = deque(maxlen=self.history)
+
+    def _apply_deltas(self, deltas):
+        for i in range(self.cursor, len(deltas)):
+            delta = deltas[i]
+            kind = delta[0]
+            if kind == DELTA_ACTION:
+                player_id, action = delta[1], delta[2]
+                self.actions.append((player_id, action))
+                if action == config.DRAW_PILE and self.top is not None:
+                    self.pile_counts[self.top] -= 1
+                    self.public_counts[self.top] += 1
+                    self.pile_draws[player_id] = self.top
+            elif kind == DELTA_TOP:
+                self.top = delta[1]
+            elif kind == DELTA_DISCARD:
+                player_id, card = delta[1], delta[2]
+                self.discard_counts[player_id, card] += 1
+                self.pile_counts[card] += 1
+                if self.pile_draws[player_id] is not None:  # The card taken from the pile went back
+                    self.public_counts[self.pile_draws[player_id]] -= 1
+                    self.pile_draws[player_id] = None
+            elif kind == DELTA_HAND:
+                player_id, slot = delta[1], delta[2]
+                public_hand = self.public_hand[player_id]
+                if public_hand[slot] >= 0:  # Swapped out; counted again by the discard
+                    self.public_counts[public_hand[slot]] -= 1
+                public_hand[slot] = -1
+                if self.pile_draws[player_id] is not None:
+                    public_hand[slot] = self.pile_draws[player_id]
+                    self.pile_draws[player_id] = None
+        self.cursor = len(deltas)
+
+    def encode(self, game, player_id):
+        """Return the player's planes. They are overwritten by later calls for the same player."""
+        if self.episode_id != game.episode_id:
+            self._reset(game)
+        self._apply_deltas(game.deltas)
+
+        num_players = self.num_players
+        planes = self.buffers[player_id]
+        planes[:] = 0
+        unseen = planes[self.unseen_row]
+        unseen[:] = self.rank_counts
+        unseen -= self.pile_counts
+        unseen -= self.public_counts
+        planes[self.discards_row:self.unseen_row] = self.discard_counts[self.seat_orders[player_id]]
+
+        public_hand = self.public_hand[player_id]
+        for slot, card in enumerate(game.players[player_id].get_obs()):
+            if card >= 0:
+                planes[slot, card] = 1
+                planes[self.known_row, slot] = 1
+                if public_hand[slot] < 0:
+                    unseen[card] -= 1
+
+        if self.top is not None:
+            planes[self.top_row, self.top] = 1
+        if game.current_player == player_id and not game.draw_phase and game.drawn_card is not None:
+            planes[self.drawn_row, game.drawn_card] = 1
+            if self.pile_draws[player_id] is None:
+                unseen[game.drawn_card] -= 1
+
+        flags = planes[self.flags_row]
+        flags[0] = game.draw_phase
+        flags[1] = game.called_cambio
+        flags[2 + (game.current_player - player_id) % num_players] = 1
+
+        row = self.actions_row
+        player_row = self.history_rows - 1
+        player_column = self.history_player_column
+        for acting_player, action in reversed(self.actions):
+            planes[row, action] = 1
+            planes[row + player_row, player_column + (acting_player - player_id) % num_players] = 1
+            row += self.history_rows
+        return planes
+
+
+class FullRulesObsEncoder:
+    """Vector observation of a full-rules game (games.full_rules_game), from one player's seat.
+
+    Every hand slot of every seat, own seat first, as the player knows it:
+    a card one-hot, UNKNOWN_SLOT for an unknown card, all zeros for an empty
+    slot. Then the top card, each seat's last discard, the drawn card (for
+    the player whose turn it is), the decision phase, the seat of the pending
+    target and the called_cambio flag. Seats are relative to the player.
+    """
+
+    def __init__(self, num_players, hand_capacity):
+        self.num_players = num_players
+        self.hand_capacity = hand_capacity
+        self.top_offset = num_players * hand_capacity * CARD_SLOTS
+        self.discards_offset = self.top_offset + CARD_SLOTS
+        self.drawn_offset = self.discards_offset + num_players * CARD_SLOTS
+        self.phase_offset = self.drawn_offset + CARD_SLOTS
+        self.target_offset = self.phase_offset + NUM_PHASES
+        self.flags_offset = self.target_offset + num_players
+        self.dim = self.flags_offset + 1
+        self.slot_offsets = range(0, self.top_offset, CARD_SLOTS)
+        self.buffers = [np.zeros(self.dim) for _ in range(num_players)]
+
+    @classmethod
+    def for_game(cls, game):
+        return cls(game.num_players, game.hand_capacity)
+
+    def encode(self, game, player_id):
+        """Return the player's observation. It is overwritten by later calls for the same player."""
+        num_players = self.num_players
+        obs = self.buffers[player_id]
+        obs[:] = 0
+        views = game.views[player_id]
+        obs[[offset + (card if card >= 0 else UNKNOWN_SLOT)
+             for offset, card in zip(self.slot_offsets, itertools.chain.from_iterable(views[player_id:] + views[:player_id]))
+             if card != EMPTY_SLOT]] = 1
+
+        if game.public_deck:
+            obs[self.top_offset + game.public_deck[-1]] = 1
+        for i in range(num_players):
+            discards = game.player_discards[(player_id + i) % num_players]
+            if discards:
+                obs[self.discards_offset + i * CARD_SLOTS + discards[-1]] = 1
+        if game.turn_player == player_id and game.drawn_card is not None:
+            obs[self.drawn_offset + game.drawn_card] = 1
+        obs[self.phase_offset + game.phase] = 1
+        if game.target_player is not None:
+            obs[self.target_offset + (game.target_player - player_id) % num_players] = 1
+        obs[self.flags_offset] = game.called_cambio
+        return obs
@@ -0,0 +1,193 @@
+import multiprocessing as mp
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.rlcard_gpt_gen.envs.core_env import CambioCoreEnv
+
+
+# Env config used by the workers unless overridden; observations are copied into
+# shared memory right away, so the per-step copy in CambioCoreEnv can be skipped.
+DEFAULT_WORKER_CONFIG = {
+    'obs_mode': 'incremental',
+    'share_obs_buffer': True,
+}
+
+
+def _shared_specs(num_envs, state_shape, num_players, num_actions):
+    return {
+        'obs': ((num_envs, *state_shape), np.float32),
+        'legal_actions': ((num_envs, num_actions), bool),
+        'player_ids': ((num_envs,), np.int64),
+        'actions': ((num_envs,), np.int64),
+        'payoffs': ((num_envs, num_players), np.float32),
+        'scores': ((num_envs, num_players), np.float32),
+        'dones': ((num_envs,), bool),
+        'truncated': ((num_envs,), bool),
+        'seeds': ((num_envs,), np.int64),
+    }
+
+
+def _attach(blocks, specs):
+    return {name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+            for name, (shape, dtype) in specs.items()}
+
+
+def _worker(conn, block_names, specs, env_ids, config, seed, max_game_steps):
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, block_name in block_names.items()}
+    arrays = _attach(blocks, specs)
+
+    # Forked workers inherit the parent's random state, so reseed them
+    random.seed(seed)
+    np.random.seed(seed)
+    envs = [CambioCoreEnv(dict(config, seed=seed + i)) for i in range(len(env_ids))]
+    game_steps = [0] * len(envs)
+
+    def reset(i, env):
+        seed = int(arrays['seeds'][i])
+        return env.reset(seed=seed if seed >= 0 else None)
+
+    def write(i, env, state, player_id):
+        arrays['obs'][i] = state['obs']
+        arrays['legal_actions'][i] = env.game.get_legal_action_mask()
+        arrays['player_ids'][i] = player_id
+
+    try:
+        while True:
+            cmd = conn.recv()
+            if cmd == 'reset':
+                for k, (i, env) in enumerate(zip(env_ids, envs)):
+                    state, player_id = reset(i, env)
+                    write(i, env, state, player_id)
+                    game_steps[k] = 0
+                    arrays['payoffs'][i] = 0
+                    arrays['dones'][i] = False
+                    arrays['truncated'][i] = False
+            elif cmd == 'step':
+                for k, (i, env) in enumerate(zip(env_ids, envs)):
+                    state, player_id = env.step(int(arrays['actions'][i]))
+                    game_steps[k] += 1
+                    # Drawing from the pile and discarding it again leaves the table unchanged,
+                    # so deterministic policies can loop forever without a step limit
+                    over = env.is_over()
+                    truncated = not over and max_game_steps is not None and game_steps[k] >= max_game_steps
+                    done = over or truncated
+                    if done:
+                        arrays['payoffs'][i] = env.get_payoffs()
+                        arrays['scores'][i] = [player.get_score() for player in env.game.players]
+                        state, player_id = reset(i, env)
+                        game_steps[k] = 0
+                    else:
+                        arrays['payoffs'][i] = 0
+                    arrays['dones'][i] = done
+                    arrays['truncated'][i] = truncated
+                    write(i, env, state, player_id)
+            elif cmd == 'close':
+                break
+            conn.send(None)
+    finally:
+        del arrays
+        for block in blocks.values():
+            block.close()
+
+
+class VectorCambioEnv:
+    """Runs num_envs CambioCoreEnv instances across a pool of worker processes.
+
+    Workers write observations, legal action masks, player ids, payoffs and done
+    flags straight into shared-memory arrays. Finished games are reset by the
+    workers; their payoffs and final hand scores are reported on the step that
+    ended them. Setting seeds[i] >= 0 deals env i's next game from that seed.
+    With max_game_steps, games still running after that many steps are ended
+    early (scored on the current hands) and flagged in truncated.
+    The arrays returned by reset() and step() are overwritten by the next call.
+    """
+
+    def __init__(self, num_envs, num_workers=None, config=None, seed=None, max_game_steps=None, start_method=None):
+        if num_workers is None:
+            num_workers = min(num_envs, mp.cpu_count())
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+
+        env_config = dict(DEFAULT_WORKER_CONFIG, **(config or {}))
+        seed = random.randrange(2 ** 31) if seed is None else seed
+        # The shapes depend on the obs_mode and the table shape
+        env = CambioCoreEnv(env_config)
+        self.num_players = env.num_players
+        self.num_actions = env.num_actions
+        self.state_shape = list(env.state_shape[0])
+
+        specs = _shared_specs(num_envs, self.state_shape, self.num_players, self.num_actions)
+        self._blocks = {}
+        for name, (shape, dtype) in specs.items():
+            size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            self._blocks[name] = shared_memory.SharedMemory(create=True, size=size)
+        arrays = _attach(self._blocks, specs)
+        self.obs = arrays['obs']
+        self.legal_actions = arrays['legal_actions']
+        self.player_ids = arrays['player_ids']
+        self.actions = arrays['actions']
+        self.payoffs = arrays['payoffs']
+        self.scores = arrays['scores']
+        self.dones = arrays['dones']
+        self.truncated = arrays['truncated']
+        self.seeds = arrays['seeds']
+        self.seeds[:] = -1
+
+        ctx = mp.get_context(start_method)
+        block_names = {name: block.name for name, block in self._blocks.items()}
+        self._conns = []
+        self._processes = []
+        worker_seeds = [int(seq.generate_state(1)[0]) for seq in np.random.SeedSequence(seed).spawn(num_workers)]
+        for env_ids, worker_seed in zip(np.array_split(np.arange(num_envs), num_workers), worker_seeds):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(child_conn, block_names, specs, env_ids.tolist(), env_config, worker_seed, max_game_steps),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+        self.closed = False
+
+    def _run(self, cmd):
+        for conn in self._conns:
+            conn.send(cmd)
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self):
+        """Reset every env. Returns (obs, legal_actions, player_ids)."""
+        self._run('reset')
+        return self.obs, self.legal_actions, self.player_ids
+
+    def step(self, actions):
+        """Apply one action per env for its current player.
+
+        Returns (obs, legal_actions, player_ids, payoffs, dones).
+        """
+        self.actions[:] = actions
+        self._run('step')
+        return self.obs, self.legal_actions, self.player_ids, self.payoffs, self.dones
+
+    def close(self):
+        if self.closed:
+            return
+        for conn in self._conns:
+            conn.send('close')
+        for process in self._processes:
+            process.join()
+        del self.obs, self.legal_actions, self.player_ids, self.actions, self.payoffs, self.scores, self.dones, self.truncated, self.seeds
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
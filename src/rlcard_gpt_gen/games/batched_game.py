@@ -0,0 +1,263 @@
+import numpy as np
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.games.dealer import BASE_DECK, num_decks_for, shuffled_deck
+from src.rlcard_gpt_gen.games import player
+from src.rlcard_gpt_gen.games.game import legal_action_tables
+from src.rlcard_gpt_gen.envs.obs_encoder import CARD_SLOTS, UNKNOWN_SLOT, VectorLayout
+
+
+NO_CARD = -1  # Empty slot in drawn card / discard arrays (None in CambioGame)
+
+CARD_VALUES = np.array(player.CARD_VALUES, dtype=np.int16)
+
+
+class BatchedCambioGame:
+    """Runs num_envs independent Cambio games in lockstep on fixed-shape arrays.
+
+    Rules follow CambioGame.step / get_legal_actions / get_payoffs; actions are
+    integer ids into config.action_list(hand_size). The table shape is set as
+    in CambioGame. Finished games are reset inside step().
+    """
+
+    def __init__(self, num_envs, num_players=config.N_PLAYERS, seed=None, hand_size=config.HAND_SIZE, num_decks=None):
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.hand_size = hand_size
+        self.num_decks = num_decks if num_decks is not None else num_decks_for(num_players, hand_size)
+        self.total_cards = self.num_decks * len(BASE_DECK)
+        self.legal_action_masks = legal_action_tables(hand_size)[2]
+        self.vector_layout = VectorLayout(num_players, hand_size)
+        self.np_random = np.random.default_rng(seed)
+        self._rows = np.arange(num_envs)
+
+        # Card state
+        self.hands = np.zeros((num_envs, num_players, hand_size), dtype=np.int8)
+        self.known_cards = np.zeros((num_envs, num_players, hand_size), dtype=bool)
+        self.deck = np.zeros((num_envs, self.total_cards), dtype=np.int8)  # Drawn from the end
+        self.deck_size = np.zeros(num_envs, dtype=np.int16)
+        self.pile = np.full((num_envs, self.total_cards), NO_CARD, dtype=np.int8)  # Public discard pile
+        self.pile_size = np.zeros(num_envs, dtype=np.int16)
+        self.last_discards = np.full((num_envs, num_players), NO_CARD, dtype=np.int8)
+
+        # Turn state
+        self.drawn_card = np.full(num_envs, NO_CARD, dtype=np.int8)
+        self.draw_phase = np.ones(num_envs, dtype=bool)
+        self.called_cambio = np.zeros(num_envs, dtype=bool)
+        self.turns_after_cambio = np.zeros(num_envs, dtype=np.int16)
+        self.terminal = np.zeros(num_envs, dtype=bool)
+        self.current_player = np.zeros(num_envs, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, env_ids=None, seeds=None):
+        """Start new games for env_ids (all games if None).
+
+        With seeds, game i is dealt exactly like CambioGame.init_game(seeds[i]).
+        """
+        if env_ids is None:
+            env_ids = self._rows
+        env_ids = np.asarray(env_ids)
+        if env_ids.dtype == bool:
+            env_ids = np.nonzero(env_ids)[0]
+        if len(env_ids) == 0:
+            return
+
+        if seeds is None:
+            decks = self.np_random.permuted(np.tile(BASE_DECK, (len(env_ids), self.num_decks)), axis=1)
+        else:
+            decks = np.stack([shuffled_deck(seed, num_decks=self.num_decks) for seed in seeds])
+
+        # Deal like CambioGame: each player pops hand_size cards off the end
+        num_dealt = self.num_players * self.hand_size
+        dealt = decks[:, ::-1][:, :num_dealt]
+        self.hands[env_ids] = dealt.reshape(len(env_ids), self.num_players, self.hand_size)
+        self.known_cards[env_ids] = False
+        self.known_cards[env_ids, :, :2] = True
+        self.deck[env_ids] = decks
+        self.deck_size[env_ids] = self.total_cards - num_dealt
+
+        self.pile[env_ids] = NO_CARD
+        self.pile_size[env_ids] = 0
+        self.last_discards[env_ids] = NO_CARD
+
+        self.drawn_card[env_ids] = NO_CARD
+        self.draw_phase[env_ids] = True
+        self.called_cambio[env_ids] = False
+        self.turns_after_cambio[env_ids] = 0
+        self.terminal[env_ids] = False
+        self.current_player[env_ids] = 0
+
+    # Per-game arrays, in the layout set_state takes
+    STATE_FIELDS = (
+        'hands', 'known_cards', 'deck', 'deck_size', 'pile', 'pile_size', 'last_discards',
+        'drawn_card', 'draw_phase', 'called_cambio', 'turns_after_cambio', 'terminal', 'current_player',
+    )
+
+    def set_state(self, env_ids, state):
+        """Overwrite the games in env_ids with state, a dict of arrays with one row per game."""
+        for name in self.STATE_FIELDS:
+            getattr(self, name)[env_ids] = state[name]
+
+    def step(self, actions, active=None):
+        """Advance every game (or only the games where active is set) by one action.
+
+        Returns (current_player, payoffs, done). payoffs has shape
+        (num_envs, num_players) and is zero for games that are still running;
+        games with done set have already been reset.
+        """
+        actions = np.asarray(actions)
+        draw_phase = self.draw_phase.copy()
+        action_phase = ~draw_phase
+        if active is not None:
+            draw_phase &= active
+            action_phase &= active
+        self._step_draw_phase(np.nonzero(draw_phase)[0], actions)
+        self._step_action_phase(np.nonzero(action_phase)[0], actions)
+
+        done = self.is_over()
+        payoffs = np.zeros((self.num_envs, self.num_players), dtype=np.float32)
+        if done.any():
+            payoffs[done] = self.get_payoffs()[done]
+            self.reset(done)
+
+        return self.current_player.copy(), payoffs, done
+
+    def fast_forward(self, policies):
+        """Let scripted seats play until every game waits on a seat without a policy.
+
+        policies[seat] is an agent with batch_game_step(game), or None for seats
+        that act through step(). Returns the payoffs and done flags of the games
+        that finished meanwhile.
+        """
+        scripted = np.array([policy is not None for policy in policies])
+        if scripted.all():
+            raise ValueError('At least one seat must be played through step()')
+
+        payoffs = np.zeros((self.num_envs, self.num_players), dtype=np.float32)
+        done = np.zeros(self.num_envs, dtype=bool)
+        actions = np.zeros(self.num_envs, dtype=np.int64)
+        while True:
+            active = scripted[self.current_player]
+            if not active.any():
+                return payoffs, done
+            for seat, policy in enumerate(policies):
+                rows = active & (self.current_player == seat)
+                if policy is not None and rows.any():
+                    actions[rows] = policy.batch_game_step(self)[rows]
+            _, step_payoffs, step_done = self.step(actions, active)
+            payoffs += step_payoffs
+            done |= step_done
+
+    def _step_draw_phase(self, idx, actions):
+        a = actions[idx]
+
+        call = idx[a == config.CALL_CAMBIO]
+        self.called_cambio[call] = True
+        self.turns_after_cambio[call] = self.num_players - 1
+        self.current_player[call] = (self.current_player[call] + 1) % self.num_players
+
+        from_deck = idx[a == config.DRAW_DECK]
+        size = self.deck_size[from_deck]
+        has_card = size > 0
+        self.drawn_card[from_deck] = np.where(
+            has_card, self.deck[from_deck, np.maximum(size - 1, 0)], NO_CARD)
+        self.deck_size[from_deck] = np.maximum(size - 1, 0)
+        self.draw_phase[from_deck] = False
+
+        # Drawing from an empty pile is a no-op, as in CambioGame
+        from_pile = idx[(a == config.DRAW_PILE) & (self.pile_size[idx] > 0)]
+        top = self.pile_size[from_pile] - 1
+        self.drawn_card[from_pile] = self.pile[from_pile, top]
+        self.pile[from_pile, top] = NO_CARD
+        self.pile_size[from_pile] = top
+        self.draw_phase[from_pile] = False
+
+    def _step_action_phase(self, idx, actions):
+        a = actions[idx]
+        player = self.current_player[idx]
+        drawn = self.drawn_card[idx]
+
+        # Anything that is not a swap is treated as a discard, as in CambioGame
+        is_swap = (a >= config.SWAP_0) & (a < config.SWAP_0 + self.hand_size)
+        slot = np.where(is_swap, a - config.SWAP_0, 0)
+        old_card = self.hands[idx, player, slot]
+        discarded = np.where(is_swap, old_card, drawn)
+
+        swap_idx, swap_player, swap_slot = idx[is_swap], player[is_swap], slot[is_swap]
+        self.hands[swap_idx, swap_player, swap_slot] = drawn[is_swap]
+        self.known_cards[swap_idx, swap_player, swap_slot] = True
+
+        self.pile[idx, self.pile_size[idx]] = discarded
+        self.pile_size[idx] += 1
+        self.last_discards[idx, player] = discarded
+        self.drawn_card[idx] = NO_CARD
+
+        self.draw_phase[idx] = True
+        self.current_player[idx] = (player + 1) % self.num_players
+
+        cambio = idx[self.called_cambio[idx]]
+        self.turns_after_cambio[cambio] -= 1
+        self.terminal[cambio] |= self.turns_after_cambio[cambio] <= 0
+
+    def get_legal_actions(self):
+        """Boolean mask of shape (num_envs, num_actions) for the current players."""
+        return self.legal_action_masks[self.draw_phase.astype(np.intp),
+                                  self.called_cambio.astype(np.intp),
+                                  (self.pile_size > 0).astype(np.intp)]
+
+    def get_obs(self, player_ids=None):
+        """Hands as seen by player_ids (current players if None), -1 for unknown cards."""
+        if player_ids is None:
+            player_ids = self.current_player
+        hands = self.hands[self._rows, player_ids]
+        known = self.known_cards[self._rows, player_ids]
+        return np.where(known, hands, NO_CARD)
+
+    def get_scores(self):
+        return CARD_VALUES[self.hands].sum(axis=2)
+
+    def get_payoffs(self):
+        # The first player with the lowest score wins, everyone else gets -1
+        winner = np.argmin(self.get_scores(), axis=1)
+        payoffs = np.full((self.num_envs, self.num_players), -1, dtype=np.float32)
+        payoffs[self._rows, winner] = 1
+        return payoffs
+
+    def is_over(self):
+        return self.terminal | (self.deck_size == 0)
+
+    @property
+    def obs_dim(self):
+        return self.vector_layout.dim
+
+    def encode_obs(self, out=None):
+        """Encode the current players' views with the CambioEnv._extract_state layout."""
+        layout = self.vector_layout
+        if out is None:
+            out = np.zeros((self.num_envs, layout.dim), dtype=np.float32)
+        else:
+            out[:] = 0
+        rows = self._rows
+
+        # Cards are stored as int8, which wraps once column offsets are added, so they are widened first
+        # Hand: CARD_SLOTS slots per card, the last one for unknown
+        obs = self.get_obs().astype(np.intp)
+        values = np.where(obs >= 0, obs, UNKNOWN_SLOT)
+        out[rows[:, None], np.arange(self.hand_size) * CARD_SLOTS + values] = 1
+
+        # Top card of the discard pile
+        has_top = np.nonzero(self.pile_size > 0)[0]
+        out[has_top, layout.top_offset + self.pile[has_top, self.pile_size[has_top] - 1].astype(np.intp)] = 1
+
+        # Each player's most recent discard
+        for player_idx in range(self.num_players):
+            last = self.last_discards[:, player_idx].astype(np.intp)
+            has_discard = np.nonzero(last >= 0)[0]
+            out[has_discard, layout.discards_offset + player_idx * CARD_SLOTS + last[has_discard]] = 1
+
+        # Game state flags
+        out[:, layout.flags_offset] = self.draw_phase
+        out[:, layout.flags_offset + 1] = self.called_cambio
+        out[:, layout.flags_offset + 2] = self.current_player / self.num_players
+        return out
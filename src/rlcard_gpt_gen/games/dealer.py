@@ -1,23 +1,77 @@
-import random
+import numpy as np
+
+
+BASE_DECK = np.array(
+    [i for i in range(1, 14)] * 4  # 1=Ace, 11-13 = J/Q/K
+    + [0] * 2,  # 2 Jokers
+    dtype=np.uint8,
+)
+DECK_SIZE = len(BASE_DECK)  # Cards in one deck
+
+
+def num_decks_for(num_players, hand_size):
+    """Decks shuffled together, so that at least as many cards are left to draw as are dealt"""
+    return -(-2 * num_players * hand_size // DECK_SIZE)
+
+
+def shuffled_deck(seed, out=None, num_decks=1):
+    """The deck order a game dealt from seed starts with (cards are drawn from the end)."""
+    if out is None:
+        out = np.empty(num_decks * DECK_SIZE, dtype=np.uint8)
+    out.reshape(-1, DECK_SIZE)[:] = BASE_DECK
+    np.random.default_rng(seed).shuffle(out)
+    return out
+
 
 class CambioDealer:
-    def __init__(self):
-        self.deck = self._generate_deck()
+    def __init__(self, seed=None, num_decks=1):
+        self.num_decks = num_decks
+        self.deck_size = num_decks * DECK_SIZE
+        self.deck = np.tile(BASE_DECK, num_decks)
+        self.num_cards = self.deck_size  # Cards left to draw: deck[:num_cards]
         self.discard_pile = []
 
-    def _generate_deck(self):
-        deck = [i for i in range(1, 14)] * 4  # 1=Ace, 11-13 = J/Q/K  TODO: add jokers?
-        deck += [0] * 2  # 2 Jokers
-        return deck
+        # Every game gets its own seed, drawn from this stream unless given explicitly
+        self.seed(seed)
+        self.game_seed = None
+
+    def seed(self, seed=None):
+        self.seed_stream = np.random.default_rng(seed)
+
+    def reset(self, seed=None, deck=None):
+        """Put every card back in the deck and shuffle it in place.
 
-    def shuffle(self):
-        random.shuffle(self.deck)
+        The order only depends on the game seed, which is kept in game_seed.
+        A recorded deck order can be given instead of shuffling.
+        """
+        if seed is None and deck is None:
+            seed = int(self.seed_stream.integers(2 ** 63))
+        self.game_seed = seed
+        if deck is None:
+            shuffled_deck(seed, out=self.deck)
+        else:
+            self.deck[:] = deck
+        self.num_cards = self.deck_size
+
+    def shuffle(self, rng=None):
+        """Shuffle the cards still in the deck."""
+        (rng or self.seed_stream).shuffle(self.deck[:self.num_cards])
 
     def draw_card(self):
-        return self.deck.pop() if self.deck else None
+        if self.num_cards == 0:
+            return None
+        self.num_cards -= 1
+        return int(self.deck[self.num_cards])
+
+    def draw_cards(self, k):
+        """Draw k cards at once, in the order k calls to draw_card would return them."""
+        k = min(k, self.num_cards)
+        cards = self.deck[self.num_cards - k:self.num_cards][::-1].tolist()
+        self.num_cards -= k
+        return cards
 
     def deal_four(self):
-        return [self.draw_card() for _ in range(4)]
+        return self.draw_cards(4)
 
     def deck_is_empty(self):
-        return self.deck == []
\ No newline at end of file
+        return self.num_cards == 0
@@ -0,0 +1,394 @@
+from collections import deque
+
+import numpy as np
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.games.game import CambioGame, DELTA_ACTION, DELTA_DISCARD, DELTA_TOP
+from src.rlcard_gpt_gen.games.player import CARD_VALUES
+
+NUM_RANKS = 14
+EMPTY_SLOT = -2  # In a player's obs: no card in this slot (-1 is a card the player does not know)
+
+# Decision phases. Turns go through PHASE_DRAW and PHASE_PLAY, then an ability if the
+# played card has one, then a PHASE_STICK decision for every queued stick event.
+PHASE_DRAW = 0
+PHASE_PLAY = 1
+PHASE_PEEK_OWN = 2  # 7 or 8 played: look at one of your cards
+PHASE_PEEK_PLAYER = 3  # 9 or 10 played: choose whose card to look at...
+PHASE_PEEK_SLOT = 4  # ...and which one
+PHASE_SWAP_OWN = 5  # Jack or Queen played: blind switch one of your cards...
+PHASE_SWAP_PLAYER = 6  # ...with a card of another player...
+PHASE_SWAP_SLOT = 7  # ...at this slot
+PHASE_STICK = 8  # Out of turn: stick a card matching the top of the pile, or pass
+PHASE_STICK_PLAYER = 9  # Sticking another player's card: whose...
+PHASE_STICK_SLOT = 10  # ...which one...
+PHASE_GIVE = 11  # ...and which of your cards they get in its place
+NUM_PHASES = 12
+
+# Abilities of cards played right after being drawn from the deck
+ABILITY_PHASES = {7: PHASE_PEEK_OWN, 8: PHASE_PEEK_OWN, 9: PHASE_PEEK_PLAYER, 10: PHASE_PEEK_PLAYER,
+                  11: PHASE_SWAP_OWN, 12: PHASE_SWAP_OWN}
+
+_OWN_SLOT_PHASES = (PHASE_PLAY, PHASE_PEEK_OWN, PHASE_SWAP_OWN, PHASE_GIVE)
+_PLAYER_PHASES = (PHASE_PEEK_PLAYER, PHASE_SWAP_PLAYER, PHASE_STICK_PLAYER)
+_TARGET_SLOT_PHASES = (PHASE_PEEK_SLOT, PHASE_SWAP_SLOT, PHASE_STICK_SLOT)
+
+
+def _slots(mask):
+    return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+class FullRulesCambioGame(CambioGame):
+    """Cambio with the card abilities, sticking and penalty cards of rules/cambio/rules.txt.
+
+    Played cards drawn from the deck trigger their ability: 7/8 look at one
+    of your cards, 9/10 at another player's, J/Q blind switch one of yours with
+    another player's; targets are chosen one decision at a time. Every card
+    put on the pile opens a stick window: the players other than the one who
+    played it and who know a card of that rank get a PHASE_STICK decision, in
+    seat order, from an event queue. They may stick one of their cards or,
+    through stick_other, another player's card and then give them one of
+    theirs. The first correct stick closes the window; a wrong one reveals
+    the card and costs a penalty card, dealt face down into an empty slot.
+    Hands have penalty_slots extra slots and shrink as cards are stuck
+    (empty slots are EMPTY_SLOT in obs). Kings are all red kings here, so the
+    black king ability is not played.
+
+    Who knows which card is kept as a bitmask of players per hand slot, and
+    rank_index holds the slots of known cards per rank, so finding the
+    players who can stick a discard only looks at the known cards of that
+    rank. With stick_index=False every hand is scanned instead (for
+    benchmarking).
+
+    Search and rollouts (search.endgame, search.rollouts) model the simplified
+    game only and reject full-rules games, which cannot be snapshot.
+    """
+
+    full_rules = True
+
+    def __init__(self, num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE, num_decks=None,
+                 penalty_slots=config.PENALTY_SLOTS, stick_index=True):
+        self.penalty_slots = penalty_slots
+        self.hand_capacity = hand_size + penalty_slots
+        self.stick_index = stick_index
+        super().__init__(num_players, hand_size, num_decks)
+        self.action_list = config.full_rules_action_list(self.hand_capacity, num_players)
+        self.action_ids = {action: i for i, action in enumerate(self.action_list)}
+        self.num_actions = len(self.action_list)
+        self.pass_action = self.action_ids['pass']
+        self.slot_0 = self.action_ids['slot_0']
+        self.player_0 = self.action_ids['player_0']
+        self.stick_0 = self.action_ids['stick_0']
+        self.stick_other = self.action_ids['stick_other']
+        self.all_players = (1 << num_players) - 1
+        self.legal_cache = {}  # Legal key -> (ids, names, mask)
+
+    def _set_up_game(self, seed=None, deck=None):
+        super()._set_up_game(seed, deck)
+        self.knowers = [[0] * self.hand_capacity for _ in range(self.num_players)]  # Bitmask of players per slot
+        self.occupied = [(1 << self.hand_size) - 1] * self.num_players  # Bitmask of slots holding a card
+        self.rank_index = [set() for _ in range(NUM_RANKS)]  # Rank -> {(owner, slot)} of cards someone knows
+        # Every hand as each player knows it, see known_hands
+        hidden_hand = (-1,) * self.hand_size + (EMPTY_SLOT,) * self.penalty_slots
+        self.views = [[hidden_hand] * self.num_players for _ in range(self.num_players)]
+        for owner, player in enumerate(self.players):
+            player.hand = player.hand + [None] * self.penalty_slots
+            player.known_cards = [False] * self.hand_capacity
+            player.obs = hidden_hand
+            for slot in (0, 1):
+                self._learn(owner, owner, slot)
+
+        self.phase = PHASE_DRAW
+        self.turn_player = 0
+        self.drawn_from_deck = False
+        self.events = deque()  # Players with a pending stick decision
+        self.stick_rank = None
+        self.own_slot = None  # Slot of the current player chosen for a blind switch
+        self.target_player = None
+        self.target_slot = None
+        self.num_sticks = 0
+        self.num_penalties = 0
+
+    def snapshot(self):
+        raise TypeError('Full-rules games cannot be snapshot')
+
+    def restore(self, snapshot):
+        raise TypeError('Full-rules games cannot be restored')
+
+    def _set_slot(self, owner, slot, card, knowers):
+        """Put card (None empties the slot) at a slot of owner, known by the knowers bitmask."""
+        player = self.players[owner]
+        old_card = player.hand[slot]
+        if old_card is not None:
+            player.score -= CARD_VALUES[old_card]
+            if self.knowers[owner][slot]:
+                self.rank_index[old_card].discard((owner, slot))
+        player.hand[slot] = card
+        if card is None:
+            knowers = 0
+            self.occupied[owner] &= ~(1 << slot)
+        else:
+            player.score += CARD_VALUES[card]
+            self.occupied[owner] |= 1 << slot
+            if knowers:
+                self.rank_index[card].add((owner, slot))
+        self.knowers[owner][slot] = knowers
+        player.known_cards[slot] = bool(knowers >> owner & 1)
+        for knower, views in enumerate(self.views):
+            view = views[owner]
+            seen = EMPTY_SLOT if card is None else card if knowers >> knower & 1 else -1
+            if view[slot] != seen:
+                views[owner] = view[:slot] + (seen,) + view[slot + 1:]
+        player.obs = self.views[owner][owner]
+
+    def _learn(self, knower, owner, slot):
+        knowers = self.knowers[owner][slot]
+        if not knowers >> knower & 1:
+            self._set_slot(owner, slot, self.players[owner].hand[slot], knowers | 1 << knower)
+
+    def _move(self, owner, slot, to_owner, to_slot):
+        """Move a card to an empty slot; everyone sees it happen, so whoever knew it still does."""
+        card, knowers = self.players[owner].hand[slot], self.knowers[owner][slot]
+        self._set_slot(owner, slot, None, 0)
+        self._set_slot(to_owner, to_slot, card, knowers)
+
+    def _put_on_pile(self, player_id, card):
+        self.public_deck.append(card)
+        self.player_discards[player_id].append(card)
+        self.deltas.append((DELTA_DISCARD, player_id, card))
+        self.deltas.append((DELTA_TOP, card))
+
+    def _penalize(self, player_id):
+        """Deal a face-down penalty card, if there is an empty slot and a card left"""
+        empty = ~self.occupied[player_id] & ((1 << self.hand_capacity) - 1)
+        if empty and not self.dealer.deck_is_empty():
+            self._set_slot(player_id, (empty & -empty).bit_length() - 1, self.dealer.draw_card(), 0)
+            self.num_penalties += 1
+
+    def stick_eligible(self, rank, excluded):
+        """Bitmask of the players other than excluded who know a card of this rank"""
+        eligible = 0
+        if self.stick_index:
+            for owner, slot in self.rank_index[rank]:
+                eligible |= self.knowers[owner][slot]
+        else:
+            for owner, player in enumerate(self.players):
+                for slot, card in enumerate(player.hand):
+                    if card == rank:
+                        eligible |= self.knowers[owner][slot]
+        return eligible & ~(1 << excluded)
+
+    def _finish_play(self):
+        """The played card is on the pile and its ability resolved: queue the stick events"""
+        rank = self.public_deck[-1]
+        eligible = self.stick_eligible(rank, self.turn_player)
+        if eligible:
+            self.stick_rank = rank
+            for i in range(1, self.num_players):
+                player_id = (self.turn_player + i) % self.num_players
+                if eligible >> player_id & 1:
+                    self.events.append(player_id)
+        self._next_decision()
+
+    def _next_decision(self):
+        """Hand the next stick event out, or end the turn"""
+        if self.events:
+            self.current_player = self.events[0]
+            self.phase = PHASE_STICK
+            return
+        self.phase = PHASE_DRAW
+        self.stick_rank = self.target_player = self.target_slot = self.own_slot = None
+        self.turn_player = self.current_player = (self.turn_player + 1) % self.num_players
+        if self.called_cambio:
+            self.turns_after_cambio -= 1
+            if self.turns_after_cambio <= 0:
+                self.terminal = True
+
+    def _others_with_cards(self, player_id):
+        return sum(1 << i for i in range(self.num_players) if i != player_id and self.occupied[i])
+
+    def _has_targets(self, ability, player_id):
+        """Whether there are cards to play the ability on; it is skipped otherwise"""
+        if ability == PHASE_PEEK_OWN:
+            return self.occupied[player_id] != 0
+        if ability == PHASE_PEEK_PLAYER:
+            return self._others_with_cards(player_id) != 0
+        return self.occupied[player_id] != 0 and self._others_with_cards(player_id) != 0
+
+    def _stick(self, owner, slot):
+        """The current player sticks the card at owner's slot; returns whether it matched"""
+        player_id = self.current_player
+        card = self.players[owner].hand[slot]
+        if card != self.stick_rank:
+            # The card is shown and stays, and the player who tried gets a penalty card
+            self._set_slot(owner, slot, card, self.all_players)
+            self._penalize(player_id)
+            self.events.popleft()
+            return False
+        self._set_slot(owner, slot, None, 0)
+        self._put_on_pile(player_id, card)
+        self.num_sticks += 1
+        self.events.clear()  # Only one player may stick per card
+        return True
+
+    def apply_action(self, action):
+        """Play an action for the current player without building a state."""
+        if isinstance(action, str):
+            action = self.action_ids[action]
+        player_id = self.current_player
+        self.deltas.append((DELTA_ACTION, player_id, action))
+        phase = self.phase
+
+        if phase == PHASE_DRAW:
+            if action == config.CALL_CAMBIO:
+                self.called_cambio = True
+                self.turns_after_cambio = self.num_players - 1
+                self.turn_player = self.current_player = self.next_player()
+            elif action == config.DRAW_DECK:
+                self.drawn_card = self.dealer.draw_card()
+                self.drawn_from_deck = True
+                self.phase = PHASE_PLAY
+            elif action == config.DRAW_PILE and self.public_deck:
+                self.drawn_card = self.public_deck.pop()
+                self.deltas.append((DELTA_TOP, self.public_deck[-1] if self.public_deck else None))
+                self.drawn_from_deck = False
+                self.phase = PHASE_PLAY
+            return
+
+        if phase == PHASE_PLAY:
+            card, self.drawn_card = self.drawn_card, None
+            if config.SWAP_0 <= action < config.SWAP_0 + self.hand_capacity:
+                # Everyone saw a card drawn from the pile
+                slot = action - config.SWAP_0
+                old_card = self.players[player_id].hand[slot]
+                self._set_slot(player_id, slot, card, 1 << player_id if self.drawn_from_deck else self.all_players)
+                self._put_on_pile(player_id, old_card)
+            else:
+                self._put_on_pile(player_id, card)
+                ability = ABILITY_PHASES.get(card) if self.drawn_from_deck else None
+                if ability is not None and self._has_targets(ability, player_id):
+                    self.phase = ability
+                    return
+            self._finish_play()
+            return
+
+        if action == self.pass_action:
+            if phase in (PHASE_STICK, PHASE_STICK_PLAYER):
+                self.events.popleft()
+                self._next_decision()
+            elif phase == PHASE_GIVE:
+                self._next_decision()
+            else:
+                self._finish_play()
+            return
+
+        if phase == PHASE_STICK:
+            if action == self.stick_other:
+                self.phase = PHASE_STICK_PLAYER
+            else:
+                self._stick(player_id, action - self.stick_0)
+                self._next_decision()
+        elif phase in _PLAYER_PHASES:
+            self.target_player = action - self.player_0
+            self.phase += 1  # The matching slot phase
+        else:
+            slot = action - self.slot_0
+            if phase == PHASE_PEEK_OWN:
+                self._learn(player_id, player_id, slot)
+                self._finish_play()
+            elif phase == PHASE_PEEK_SLOT:
+                self._learn(player_id, self.target_player, slot)
+                self._finish_play()
+            elif phase == PHASE_SWAP_OWN:
+                self.own_slot = slot
+                self.phase = PHASE_SWAP_PLAYER
+            elif phase == PHASE_SWAP_SLOT:
+                # A blind switch: the cards move in plain sight, unseen
+                own = self.players[player_id].hand[self.own_slot], self.knowers[player_id][self.own_slot]
+                other = self.players[self.target_player].hand[slot], self.knowers[self.target_player][slot]
+                self._set_slot(player_id, self.own_slot, *other)
+                self._set_slot(self.target_player, slot, *own)
+                self._finish_play()
+            elif phase == PHASE_STICK_SLOT:
+                if self._stick(self.target_player, slot) and self.occupied[player_id]:
+                    self.target_slot = slot
+                    self.phase = PHASE_GIVE
+                else:
+                    self._next_decision()
+            elif phase == PHASE_GIVE:
+                self._move(player_id, slot, self.target_player, self.target_slot)
+                self._next_decision()
+
+    def _legal_key(self):
+        phase = self.phase
+        if phase == PHASE_DRAW:
+            return phase, int(self.called_cambio), int(len(self.public_deck) > 0)
+        player_id = self.current_player
+        if phase in _OWN_SLOT_PHASES:
+            return phase, self.occupied[player_id]
+        if phase in _PLAYER_PHASES:
+            return phase, self._others_with_cards(player_id)
+        if phase in _TARGET_SLOT_PHASES:
+            return phase, self.occupied[self.target_player]
+        return phase, self.occupied[player_id], int(self._others_with_cards(player_id) > 0)
+
+    def _legal(self):
+        """(ids, names, mask) of the legal actions, cached per legal key"""
+        key = self._legal_key()
+        legal = self.legal_cache.get(key)
+        if legal is None:
+            phase = key[0]
+            if phase == PHASE_DRAW:
+                ids = list(self.legal_action_ids[1, key[1], key[2]])
+            elif phase == PHASE_PLAY:
+                ids = [config.DISCARD] + [config.SWAP_0 + i for i in _slots(key[1])]
+            elif phase in _PLAYER_PHASES:
+                ids = [self.player_0 + i for i in _slots(key[1])]
+            elif phase in _TARGET_SLOT_PHASES:
+                ids = [self.slot_0 + i for i in _slots(key[1])]
+            elif phase == PHASE_STICK:
+                ids = [self.stick_0 + i for i in _slots(key[1])] + ([self.stick_other] if key[2] else [])
+            else:
+                ids = [self.slot_0 + i for i in _slots(key[1])]
+            if phase not in (PHASE_DRAW, PHASE_PLAY) and phase not in _TARGET_SLOT_PHASES:
+                ids = [self.pass_action] + ids
+            mask = np.zeros(self.num_actions, dtype=bool)
+            mask[ids] = True
+            mask.setflags(write=False)
+            legal = self.legal_cache[key] = (tuple(ids), tuple(self.action_list[i] for i in ids), mask)
+        return legal
+
+    def get_legal_action_ids(self):
+        return self._legal()[0]
+
+    def get_legal_action_mask(self):
+        return self._legal()[2]
+
+    def get_legal_actions(self):
+        return list(self._legal()[1])
+
+    def known_hands(self, player_id):
+        """Every hand as player_id knows it: the card, -1 if unknown, EMPTY_SLOT if there is none"""
+        return tuple(self.views[player_id])
+
+    def get_state(self, player_id):
+        """CambioGame.get_state plus the decision phase, the pending target and what the player knows of every hand"""
+        ids, names, _ = self._legal()
+        public_cards = {'top_card': self.public_deck[-1] if self.public_deck else None}
+        if self.include_history:
+            public_cards['discard_pile'] = self.public_deck.copy()
+            public_cards['player_discards'] = self.player_discards.copy()
+        return {
+            'obs': self.players[player_id].get_obs(),
+            'legal_actions': names,
+            'legal_action_ids': ids,
+            'public_cards': public_cards,
+            'drawn_card': self.drawn_card if player_id == self.turn_player else None,
+            'draw_phase': self.phase == PHASE_DRAW,
+            'called_cambio': self.called_cambio,
+            'current_player': self.current_player,
+            'player_id': player_id,
+            'phase': self.phase,
+            'target_player': self.target_player,
+            'known_hands': self.known_hands(player_id),
+        }
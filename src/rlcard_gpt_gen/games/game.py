@@ -1,16 +1,80 @@
+from collections import namedtuple
+from functools import lru_cache
+
 import numpy as np
 
-from src.rlcard_gpt_gen.games.dealer import CambioDealer
+from src.rlcard_gpt_gen.games.dealer import CambioDealer, num_decks_for
 from src.rlcard_gpt_gen.games.player import CambioPlayer
 from src.rlcard_gpt_gen import config
 
 
+@lru_cache(maxsize=None)
+def legal_action_tables(hand_size=config.HAND_SIZE):
+    """Legal action ids, names and masks for every (draw_phase, called_cambio, pile_nonempty) combination."""
+    actions = config.action_list(hand_size)
+    ids = np.empty((2, 2, 2), dtype=object)
+    names = np.empty((2, 2, 2), dtype=object)
+    masks = np.zeros((2, 2, 2, len(actions)), dtype=bool)
+    for draw_phase in (0, 1):
+        for called_cambio in (0, 1):
+            for pile_nonempty in (0, 1):
+                if draw_phase:
+                    legal = [config.DRAW_DECK]
+                    if pile_nonempty:
+                        legal.append(config.DRAW_PILE)
+                    if not called_cambio:
+                        legal.append(config.CALL_CAMBIO)
+                else:
+                    # When player has drawn a card, they can swap with any position or discard
+                    legal = [config.DISCARD] + [config.SWAP_0 + i for i in range(hand_size)]
+                ids[draw_phase, called_cambio, pile_nonempty] = tuple(legal)
+                names[draw_phase, called_cambio, pile_nonempty] = tuple(actions[i] for i in legal)
+                masks[draw_phase, called_cambio, pile_nonempty, legal] = True
+    masks.setflags(write=False)
+    return ids, names, masks
+
+
+# Looked up with [draw_phase, called_cambio, pile_nonempty], for the default hand size
+LEGAL_ACTION_IDS, LEGAL_ACTION_NAMES, LEGAL_ACTION_MASKS = legal_action_tables()
+
+# Observation deltas recorded in CambioGame.deltas
+DELTA_HAND = 0  # (DELTA_HAND, player_id, slot, card): a card in a hand was replaced and is now known
+DELTA_TOP = 1  # (DELTA_TOP, card): top of the discard pile changed, card is None for an empty pile
+DELTA_DISCARD = 2  # (DELTA_DISCARD, player_id, card): player's most recent discard changed
+DELTA_ACTION = 3  # (DELTA_ACTION, player_id, action): recorded before the deltas the action causes
+
+# Immutable copy of a game's state, see CambioGame.snapshot. Per-player fields hold one entry per player.
+GameSnapshot = namedtuple('GameSnapshot', [
+    'deck', 'num_cards', 'game_seed',
+    'hands', 'known_cards', 'scores', 'obs',
+    'public_deck', 'player_discards',
+    'drawn_card', 'draw_phase', 'called_cambio', 'turns_after_cambio', 'terminal', 'current_player',
+    'deltas',
+])
+
+
 class CambioGame:
-    def __init__(self, num_players=config.N_PLAYERS):
+    """Cambio for num_players players with hand_size cards each.
+
+    Without num_decks, enough decks are shuffled together for the table
+    (see dealer.num_decks_for). All sizes are fixed at construction.
+    """
+
+    # Search, rollouts and scripted agents only model these simplified rules
+    full_rules = False
+
+    def __init__(self, num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE, num_decks=None):
+        if not config.MIN_PLAYERS <= num_players <= config.MAX_PLAYERS:
+            raise ValueError('num_players must be between {} and {}'.format(config.MIN_PLAYERS, config.MAX_PLAYERS))
+        if not config.MIN_HAND_SIZE <= hand_size <= config.MAX_HAND_SIZE:
+            raise ValueError('hand_size must be between {} and {}'.format(config.MIN_HAND_SIZE, config.MAX_HAND_SIZE))
         self.num_players = num_players
+        self.hand_size = hand_size
+        self.num_actions = config.num_actions(hand_size)
+        self.legal_action_ids, self.legal_action_names, self.legal_action_masks = legal_action_tables(hand_size)
         self.player_discards = {i: [] for i in range(self.num_players)}  # Track discards per player
 
-        self.dealer = CambioDealer()
+        self.dealer = CambioDealer(num_decks=num_decks if num_decks is not None else num_decks_for(num_players, hand_size))
         
         # Game state variables
 
@@ -26,55 +90,141 @@ class CambioGame:
         self.drawn_card = None  # Store the currently drawn card
         self.draw_phase = True  # Track if we're in drawing phase
 
+        # Changes to the observable state, consumed incrementally by observation encoders.
+        # The log is cleared and episode_id bumped whenever a new game is set up.
+        self.deltas = []
+        self.episode_id = -1
+        self.include_history = True  # Copy the discard histories into get_state
+
         self._set_up_game()
 
-    def _set_up_game(self):
-        self.players = [CambioPlayer(i) for i in range(self.num_players)]
+    def _set_up_game(self, seed=None, deck=None):
+        self.players = [CambioPlayer(i, self.hand_size) for i in range(self.num_players)]
+
+        # Start every game from a full deck and an empty table
+        self.dealer.reset(seed, deck)
+        self.public_deck = []
+        self.player_discards = {i: [] for i in range(self.num_players)}
+        self.drawn_card = None
+        self.draw_phase = True
+        self.terminal = False
 
-        self.dealer.shuffle()
         for player in self.players:
-            player.receive_initial_cards(self.dealer.deal_four())
+            player.receive_initial_cards(self.dealer.draw_cards(self.hand_size))
 
         self.current_player = 0
         self.called_cambio = False
         self.turns_after_cambio = 0
 
-    def init_game(self):
-        self._set_up_game()
+        self.deltas = []
+        self.episode_id += 1
+
+    def snapshot(self):
+        """Copy the game state into a GameSnapshot, without deep-copying the game."""
+        dealer = self.dealer
+        players = self.players
+        return GameSnapshot(
+            deck=dealer.deck.copy(),
+            num_cards=dealer.num_cards,
+            game_seed=dealer.game_seed,
+            hands=tuple(tuple(player.hand) for player in players),
+            known_cards=tuple(tuple(player.known_cards) for player in players),
+            scores=tuple(player.score for player in players),
+            obs=tuple(player.obs for player in players),
+            public_deck=tuple(self.public_deck),
+            player_discards=tuple(tuple(self.player_discards[i]) for i in range(self.num_players)),
+            drawn_card=self.drawn_card,
+            draw_phase=self.draw_phase,
+            called_cambio=self.called_cambio,
+            turns_after_cambio=self.turns_after_cambio,
+            terminal=self.terminal,
+            current_player=self.current_player,
+            deltas=tuple(self.deltas),
+        )
+
+    def restore(self, snapshot):
+        """Return to a state saved by snapshot (possibly of another game with the same table shape).
+
+        This counts as a new episode for observation encoders.
+        """
+        dealer = self.dealer
+        dealer.deck[:] = snapshot.deck
+        dealer.num_cards = snapshot.num_cards
+        dealer.game_seed = snapshot.game_seed
+        for player, hand, known_cards, score, obs in zip(
+                self.players, snapshot.hands, snapshot.known_cards, snapshot.scores, snapshot.obs):
+            player.hand = list(hand)
+            player.known_cards = list(known_cards)
+            player.score = score
+            player.obs = obs
+        self.public_deck = list(snapshot.public_deck)
+        self.player_discards = {i: list(discards) for i, discards in enumerate(snapshot.player_discards)}
+        self.drawn_card = snapshot.drawn_card
+        self.draw_phase = snapshot.draw_phase
+        self.called_cambio = snapshot.called_cambio
+        self.turns_after_cambio = snapshot.turns_after_cambio
+        self.terminal = snapshot.terminal
+        self.current_player = snapshot.current_player
+        self.deltas = list(snapshot.deltas)
+        self.episode_id += 1
+
+    def seed(self, seed=None):
+        """Seed the stream the per-game deal seeds are drawn from."""
+        self.dealer.seed(seed)
+
+    def init_game(self, seed=None, deck=None):
+        """Start a new game. A seed fixes the deal of this game only; a deck order replaces the shuffle."""
+        self._set_up_game(seed, deck)
         return self.get_state(self.current_player), self.current_player
     
     def step(self, action):
+        self.apply_action(action)
+        return self.get_state(self.current_player), self.current_player
+
+    def apply_action(self, action):
+        """Play an action for the current player without building a state."""
+        # Actions are ids into config.action_list(hand_size); action names are accepted for compatibility
+        if isinstance(action, str):
+            action = config.ACTION_IDS[action]
+        self.deltas.append((DELTA_ACTION, self.current_player, action))
+
         # First phase: player must choose between draw actions or calling cambio
         if self.draw_phase:
-            if action == 'call_cambio':
+            if action == config.CALL_CAMBIO:
                 self.called_cambio = True
                 self.turns_after_cambio = len(self.players) - 1
                 self.current_player = self.next_player()
                 self.draw_phase = True  # TODO: not sure why True gen : This might need to be False if you want to end the turn immediately after calling cambi
-                return self.get_state(self.current_player), self.current_player
+                return
             
-            elif action == 'draw_deck':
+            elif action == config.DRAW_DECK:
                 self.drawn_card = self.dealer.draw_card()
                 self.draw_phase = False
-                return self.get_state(self.current_player), self.current_player
+                return
             
-            elif action == 'draw_pile':
+            elif action == config.DRAW_PILE:
                 if len(self.public_deck) > 0:
                     self.drawn_card = self.public_deck.pop()
+                    self.deltas.append((DELTA_TOP, self.public_deck[-1] if self.public_deck else None))
                     self.draw_phase = False
-                    return self.get_state(self.current_player), self.current_player
+                    return
                 
         # Second phase: player must choose what to do with drawn card
         else:
-            if action.startswith('swap_'):
-                idx = int(action[-1])
+            if config.SWAP_0 <= action < config.SWAP_0 + self.hand_size:
+                idx = action - config.SWAP_0
                 old_card = self.players[self.current_player].swap_card(idx, self.drawn_card)
                 self.public_deck.append(old_card)
                 self.player_discards[self.current_player].append(old_card)
+                self.deltas.append((DELTA_HAND, self.current_player, idx, self.drawn_card))
+                self.deltas.append((DELTA_DISCARD, self.current_player, old_card))
+                self.deltas.append((DELTA_TOP, old_card))
                 self.drawn_card = None
             else:  # discard
                 self.public_deck.append(self.drawn_card)
                 self.player_discards[self.current_player].append(self.drawn_card)
+                self.deltas.append((DELTA_DISCARD, self.current_player, self.drawn_card))
+                self.deltas.append((DELTA_TOP, self.drawn_card))
                 self.drawn_card = None
             
             self.draw_phase = True
@@ -85,25 +235,34 @@ class CambioGame:
                 if self.turns_after_cambio <= 0:
                     self.terminal = True
 
-        return self.get_state(self.current_player), self.current_player
+    def _legal_key(self):
+        return int(self.draw_phase), int(self.called_cambio), int(len(self.public_deck) > 0)
+
+    def get_legal_action_ids(self):
+        """Tuple of legal action ids, shared between calls."""
+        return self.legal_action_ids[self._legal_key()]
+
+    def get_legal_action_mask(self):
+        """Read-only boolean mask over the num_actions actions, shared between calls."""
+        return self.legal_action_masks[self._legal_key()]
 
     def get_legal_actions(self):
-        if self.draw_phase:
-            actions = ['draw_deck']
-            if len(self.public_deck) > 0:
-                actions.append('draw_pile')
-            if not self.called_cambio:
-                actions.append('call_cambio')
-            return actions
-        else:
-            # When player has drawn a card, they can swap with any position or discard
-            actions = ['discard']
-            actions.extend([f'swap_{i}' for i in range(4)])
-            return actions
+        return list(self.legal_action_names[self._legal_key()])
 
     def get_state(self, player_id):
-        """Get game state from the perspective of the given player."""
+        """Get game state from the perspective of the given player.
+
+        The discard histories are only copied in when include_history is set.
+        """
         player = self.players[player_id]
+        legal_key = self._legal_key()
+
+        public_cards = {
+            'top_card': self.public_deck[-1] if self.public_deck else None,
+        }
+        if self.include_history:
+            public_cards['discard_pile'] = self.public_deck.copy()  # All cards in discard pile
+            public_cards['player_discards'] = self.player_discards.copy()  # History of each player's discards
 
         # Get known cards for each player
         # all_known_cards = []
@@ -119,21 +278,18 @@ class CambioGame:
 
         return {
             'obs': player.get_obs(),  # Current player's hand
-            'legal_actions': self.get_legal_actions(),
-            'public_cards': {
-                'top_card': self.public_deck[-1] if self.public_deck else None,
-                'discard_pile': self.public_deck.copy(),  # All cards in discard pile
-                # 'all_known_cards': all_known_cards,  # Known cards for each player
-                'player_discards': self.player_discards.copy(),  # History of each player's discards
-            },
+            'legal_actions': self.legal_action_names[legal_key],
+            'legal_action_ids': self.legal_action_ids[legal_key],
+            'public_cards': public_cards,
             'drawn_card': self.drawn_card,
             'draw_phase': self.draw_phase,
             'called_cambio': self.called_cambio,
             'current_player': self.current_player,
+            'player_id': player_id,
         }
 
     def get_num_actions(self):
-        return len(self.get_legal_actions())
+        return self.num_actions
 
     def get_payoffs(self):
         scores = [p.get_score() for p in self.players]
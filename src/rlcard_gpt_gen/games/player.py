@@ -1,30 +1,45 @@
+from src.rlcard_gpt_gen import config
+
+
+# Card value indexed by card: Joker 0, Ace 1, 2-10 face value, J/Q 10, Red King -1
+CARD_VALUES = (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, -1)
+
+
 class CambioPlayer:
-    def __init__(self, player_id):
+    # The score and the observed hand are kept up to date in swap_card,
+    # so get_score and get_obs do not depend on the hand size
+    __slots__ = ('player_id', 'hand', 'known_cards', 'score', 'obs')
+
+    def __init__(self, player_id, hand_size=config.HAND_SIZE):
         self.player_id = player_id
-        self.hand = [None] * 4
-        self.known_cards = [False] * 4
+        self.hand = [None] * hand_size
+        self.known_cards = [False] * hand_size
+        self.score = 0
+        self.obs = (-1,) * hand_size
 
     def receive_initial_cards(self, cards):
         self.hand = cards
         self.known_cards[0] = True
         self.known_cards[1] = True
+        self.score = sum(CARD_VALUES[card] for card in cards)
+        self.obs = tuple(card if known else -1 for card, known in zip(self.hand, self.known_cards))
 
     def swap_card(self, index, new_card):
         old_card = self.hand[index]
         self.hand[index] = new_card
         self.known_cards[index] = True
 
+        self.score += CARD_VALUES[new_card] - CARD_VALUES[old_card]
+        self.obs = self.obs[:index] + (new_card,) + self.obs[index + 1:]
+
         return old_card
 
     def get_score(self):
-        return sum(self._card_value(card) for card in self.hand)
+        return self.score
 
     def _card_value(self, card):
-        if card == 0: return 0  # Joker
-        if card == 13: return -1  # Red King
-        if card == 1: return 1  # Ace
-        if card >= 11: return 10  # Face cards
-        return card
+        return CARD_VALUES[card]
 
     def get_obs(self):
-        return [card if known else -1 for card, known in zip(self.hand, self.known_cards)]
+        """Own hand with -1 for unknown cards, as an immutable tuple"""
+        return self.obs
@@ -0,0 +1,220 @@
+import weakref
+from collections import OrderedDict
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.envs.obs_encoder import CardPlaneObsEncoder, NUM_RANKS
+from src.rlcard_gpt_gen.games.player import CARD_VALUES
+
+
+# The game only uses cards through their values, so the search works on card values:
+# counts are indexed by value - MIN_VALUE, and hands hold values or HIDDEN.
+MIN_VALUE = min(CARD_VALUES)
+NUM_VALUES = max(CARD_VALUES) - MIN_VALUE + 1
+HIDDEN = MIN_VALUE - 1  # A card the searching player has not seen
+
+
+class EndgameSolver:
+    """Expectimax search of the endgame, from the moment cambio is called.
+
+    The search runs on the information set of one player: hand cards it has not
+    seen are valued at the mean of its unseen cards, and cards drawn from the
+    deck (or swapped out of hidden slots while the pile still matters) are
+    chance events over the unseen multiset. Every player picks the action with
+    the best expected payoff for itself, and games are scored on the expected
+    hand totals, so values are exact once every hand card is known.
+
+    Node values are kept in a transposition table keyed on (hands, unseen
+    counts, relevant pile cards, player, turns left, drawn card) with LRU
+    eviction after max_entries nodes. Hands are sorted, since slot order does
+    not change values, so equal positions share entries whatever the slots.
+    """
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.table = OrderedDict()
+        self._means = {}
+        self.hits = 0
+        self.misses = 0
+        self._encoders = weakref.WeakKeyDictionary()  # Tracks the public information of each game
+
+    def clear(self):
+        self.table.clear()
+        self.hits = self.misses = 0
+
+    def value(self, game, player_id=None):
+        """Expected payoff of every player, as estimated by player_id (the current player by default)"""
+        self._check_endgame(game)
+        state, _ = self._root(game, player_id)
+        if game.is_over():
+            return self._payoffs(self._scores(state[0], state[1]))
+        return self._state_value(state)
+
+    def action_values(self, game):
+        """Expected payoff of each legal action for the current player"""
+        self._check_endgame(game)
+        state, slots = self._root(game, game.current_player)
+        player = game.current_player
+        action_values = {}
+        for action, values in self._action_values(state).items():
+            if action >= config.SWAP_0:  # Swaps are searched on the sorted hand
+                action = config.SWAP_0 + slots[action - config.SWAP_0]
+            action_values[action] = values[player]
+        return action_values
+
+    def best_action(self, game):
+        action_values = self.action_values(game)
+        return max(action_values, key=action_values.get)
+
+    def cambio_value(self, game, player_id=None):
+        """Expected payoff of calling cambio now for the current player, who must be in the draw phase"""
+        if game.full_rules:
+            raise ValueError('The endgame solver only models the simplified rules, not full-rules games')
+        if game.called_cambio or not game.draw_phase:
+            raise ValueError('Cambio can only be called in the draw phase of a game where it was not called yet')
+        player = game.current_player if player_id is None else player_id
+        (hands, counts, pile, deck_left, _, _, _), _ = self._root(game, player)
+        state = (hands, counts, pile, deck_left, (game.current_player + 1) % game.num_players, game.num_players - 1, None)
+        return self._state_value(state)[player]
+
+    def _check_endgame(self, game):
+        if game.full_rules:
+            raise ValueError('The endgame solver only models the simplified rules, not full-rules games')
+        if not game.called_cambio:
+            raise ValueError('The endgame starts once cambio is called')
+
+    def _root(self, game, player_id):
+        """Search state of the game as seen by player_id, and the slot of each card of the current player's sorted hand"""
+        if player_id is None:
+            player_id = game.current_player
+        encoder = self._encoders.get(game)
+        if encoder is None:
+            encoder = self._encoders[game] = CardPlaneObsEncoder.for_game(game, history=0)
+        unseen = encoder.encode(game, player_id)[encoder.unseen_row]
+
+        counts = [0] * NUM_VALUES
+        for card in range(NUM_RANKS):
+            counts[CARD_VALUES[card] - MIN_VALUE] += int(unseen[card])
+
+        hands = []
+        for i, player in enumerate(game.players):
+            cards = player.get_obs() if i == player_id else encoder.public_hand[i]
+            values = [CARD_VALUES[card] if card >= 0 else HIDDEN for card in cards]
+            order = sorted(range(len(values)), key=values.__getitem__)
+            if i == game.current_player:
+                slots = tuple(order)
+            hands.append(tuple(values[slot] for slot in order))
+
+        holding = None
+        if not game.draw_phase:
+            current = game.current_player
+            visible = current == player_id or encoder.pile_draws[current] is not None
+            holding = CARD_VALUES[game.drawn_card] if visible else HIDDEN
+
+        pile = tuple(CARD_VALUES[card] for card in game.public_deck)
+        turns = game.turns_after_cambio if game.called_cambio else game.num_players - 1
+        state = (tuple(hands), tuple(counts), pile, game.dealer.num_cards, game.current_player, turns, holding)
+        return state, slots
+
+    def _state_value(self, state):
+        hands, counts, pile, deck_left, player, turns, holding = state
+        if turns == 1 and holding is not None and holding != HIDDEN:
+            # The last player to move just takes the lowest expected score
+            scores = self._scores(hands, counts)
+            mean = self._mean(counts)
+            highest = max(mean if card == HIDDEN else card for card in hands[player])
+            scores[player] += min(0, holding - highest)
+            return self._payoffs(scores)
+
+        # At most one pile card is taken per turn and the deck only runs out if it is shorter than the turns left
+        key = (hands, counts, pile[-turns:], min(deck_left, turns + 1), player, turns, holding)
+        table = self.table
+        value = table.get(key)
+        if value is not None:
+            self.hits += 1
+            table.move_to_end(key)
+            return value
+        self.misses += 1
+
+        if holding == HIDDEN:  # Another player holds a card we have not seen
+            value = self._expect(counts, lambda card, rest: self._state_value(
+                (hands, rest, pile, deck_left, player, turns, card)))
+        else:
+            value = max(self._action_values(state).values(), key=lambda values: values[player])
+
+        table[key] = value
+        if len(table) > self.max_entries:
+            table.popitem(last=False)
+        return value
+
+    def _action_values(self, state):
+        hands, counts, pile, deck_left, player, turns, holding = state
+        if holding is None:
+            def after_draw(card, rest):
+                if deck_left == 1:  # The game ends as the deck runs out
+                    return self._payoffs(self._scores(hands, rest))
+                return self._state_value((hands, rest, pile, deck_left - 1, player, turns, card))
+
+            values = {config.DRAW_DECK: self._expect(counts, after_draw)}
+            if pile:
+                values[config.DRAW_PILE] = self._state_value(
+                    (hands, counts, pile[:-1], deck_left, player, turns, pile[-1]))
+            return values
+
+        values = {config.DISCARD: self._end_turn(hands, counts, pile + (holding,), deck_left, player, turns)}
+        swap_values = {}  # Swapping out equal cards has the same value
+        for slot, old in enumerate(hands[player]):
+            if old not in swap_values:
+                # Hands are kept sorted, slot order does not matter for the value
+                hand = tuple(sorted(hands[player][:slot] + (holding,) + hands[player][slot + 1:]))
+                new_hands = hands[:player] + (hand,) + hands[player + 1:]
+                if old != HIDDEN:
+                    value = self._end_turn(new_hands, counts, pile + (old,), deck_left, player, turns)
+                elif turns > 1:  # The revealed card may still be drawn from the pile
+                    value = self._expect(counts, lambda card, rest: self._end_turn(
+                        new_hands, rest, pile + (card,), deck_left, player, turns))
+                else:
+                    value = self._end_turn(new_hands, counts, pile, deck_left, player, turns)
+                swap_values[old] = value
+            values[config.SWAP_0 + slot] = swap_values[old]
+        return values
+
+    def _end_turn(self, hands, counts, pile, deck_left, player, turns):
+        if turns <= 1:
+            return self._payoffs(self._scores(hands, counts))
+        return self._state_value((hands, counts, pile, deck_left, (player + 1) % len(hands), turns - 1, None))
+
+    def _expect(self, counts, child):
+        """Expected value of child(card, remaining counts) over a card drawn from counts"""
+        total = sum(counts)
+        expected = None
+        for i, n in enumerate(counts):
+            if n == 0:
+                continue
+            rest = counts[:i] + (n - 1,) + counts[i + 1:]
+            values = child(i + MIN_VALUE, rest)
+            if expected is None:
+                expected = [n * v for v in values]
+            else:
+                for j, v in enumerate(values):
+                    expected[j] += n * v
+        return tuple(v / total for v in expected)
+
+    def _mean(self, counts):
+        """Mean value of the unseen cards"""
+        mean = self._means.get(counts)
+        if mean is None:
+            if len(self._means) >= self.max_entries:
+                self._means.clear()
+            total = sum(counts)
+            mean = sum((i + MIN_VALUE) * n for i, n in enumerate(counts)) / total if total else 0.0
+            self._means[counts] = mean
+        return mean
+
+    def _scores(self, hands, counts):
+        """Expected hand totals, with hidden cards at the mean unseen value"""
+        hidden_value = self._mean(counts) - HIDDEN
+        return [sum(hand) + hand.count(HIDDEN) * hidden_value for hand in hands]
+
+    def _payoffs(self, scores):
+        winner = scores.index(min(scores))
+        return tuple(1.0 if i == winner else -1.0 for i in range(len(scores)))
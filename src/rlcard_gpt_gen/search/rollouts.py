@@ -0,0 +1,213 @@
+import multiprocessing as mp
+import os
+import time
+import weakref
+
+import numpy as np
+
+from src.rlcard_gpt_gen.agents.batched import batch_eval_step
+from src.rlcard_gpt_gen.envs.obs_encoder import CardPlaneObsEncoder, NUM_RANKS
+from src.rlcard_gpt_gen.games.batched_game import NO_CARD, BatchedCambioGame
+from src.rlcard_gpt_gen.games.dealer import DECK_SIZE
+
+
+def sample_determinizations(game, player_id, num_samples, rng, encoder=None):
+    """Sample num_samples full game states consistent with what player_id knows.
+
+    The cards player_id has not seen (its own unknown slots, other players'
+    cards not taken from the pile, a card another player drew from the deck,
+    and the deck) are dealt at random from its unseen cards. Returns a dict
+    of arrays for BatchedCambioGame.set_state.
+    """
+    if game.full_rules:
+        raise ValueError('Determinizations only model the simplified rules, not full-rules games')
+    if encoder is None:
+        encoder = CardPlaneObsEncoder.for_game(game, history=0)
+    unseen = encoder.encode(game, player_id)[encoder.unseen_row]
+    snapshot = game.snapshot()
+
+    hands = np.array(snapshot.hands, dtype=np.int8)
+    hidden = np.zeros(hands.shape, dtype=bool)
+    for i in range(game.num_players):
+        for slot in range(hands.shape[1]):
+            if i == player_id:
+                hidden[i, slot] = not snapshot.known_cards[i][slot]
+            else:
+                hidden[i, slot] = encoder.public_hand[i][slot] < 0
+    drawn_hidden = (not snapshot.draw_phase and snapshot.current_player != player_id
+                    and encoder.pile_draws[snapshot.current_player] is None)
+
+    pool = np.repeat(np.arange(NUM_RANKS, dtype=np.int8), unseen)
+    num_hidden = int(hidden.sum())
+    assert len(pool) == num_hidden + drawn_hidden + snapshot.num_cards
+    cards = rng.permuted(np.tile(pool, (num_samples, 1)), axis=1)
+
+    state_hands = np.tile(hands, (num_samples, 1, 1))
+    state_hands[:, hidden] = cards[:, :num_hidden]
+    drawn_card = NO_CARD if snapshot.drawn_card is None else snapshot.drawn_card
+    state_drawn = np.full(num_samples, drawn_card, dtype=np.int8)
+    if drawn_hidden:
+        state_drawn[:] = cards[:, num_hidden]
+    deck_size = game.dealer.deck_size
+    deck = np.zeros((num_samples, deck_size), dtype=np.int8)
+    deck[:, :snapshot.num_cards] = cards[:, num_hidden + drawn_hidden:]
+
+    pile = np.full(deck_size, NO_CARD, dtype=np.int8)
+    pile[:len(snapshot.public_deck)] = snapshot.public_deck
+    last_discards = [discards[-1] if discards else NO_CARD for discards in snapshot.player_discards]
+
+    def repeat(value, dtype):
+        value = np.asarray(value, dtype=dtype)
+        return np.broadcast_to(value, (num_samples,) + value.shape)
+
+    return {
+        'hands': state_hands,
+        'known_cards': repeat(snapshot.known_cards, bool),
+        'deck': deck,
+        'deck_size': repeat(snapshot.num_cards, np.int16),
+        'pile': repeat(pile, np.int8),
+        'pile_size': repeat(len(snapshot.public_deck), np.int16),
+        'last_discards': repeat(last_discards, np.int8),
+        'drawn_card': state_drawn,
+        'draw_phase': repeat(snapshot.draw_phase, bool),
+        'called_cambio': repeat(snapshot.called_cambio, bool),
+        'turns_after_cambio': repeat(snapshot.turns_after_cambio, np.int16),
+        'terminal': repeat(snapshot.terminal, bool),
+        'current_player': repeat(snapshot.current_player, np.int64),
+    }
+
+
+def policy_actions(policy, game, rows):
+    """Actions of a default policy for the given rows of a BatchedCambioGame.
+
+    Agents with batch_game_step act on the game core; other agents (e.g. DQN)
+    get the encoded observations.
+    """
+    if hasattr(policy, 'batch_game_step'):
+        return policy.batch_game_step(game)[rows]
+    return batch_eval_step(policy, game.encode_obs()[rows], game.get_legal_actions()[rows])
+
+
+def rollout_payoffs(states, actions, player_id, policies, max_steps=1000):
+    """Total payoff of player_id per action, over one playout from every determinization.
+
+    Each determinization is played once per action: the action is applied
+    first, then policies[seat] plays every seat. Playouts still running after
+    max_steps are scored on the hands at that point.
+    """
+    num_samples, num_players, hand_size = states['hands'].shape
+    num_envs = num_samples * len(actions)
+    game = BatchedCambioGame(num_envs, num_players, hand_size=hand_size,
+                             num_decks=states['deck'].shape[1] // DECK_SIZE)
+    game.set_state(slice(None), {name: np.concatenate([value] * len(actions)) for name, value in states.items()})
+
+    payoffs = np.zeros((num_envs, len(policies)), dtype=np.float32)
+    finished = np.zeros(num_envs, dtype=bool)
+    step_actions = np.repeat(np.asarray(actions, dtype=np.int64), num_samples)
+    for _ in range(max_steps):
+        _, step_payoffs, done = game.step(step_actions, ~finished)
+        done &= ~finished
+        payoffs[done] = step_payoffs[done]
+        finished |= done
+        if finished.all():
+            break
+        for seat, policy in enumerate(policies):
+            rows = np.nonzero(~finished & (game.current_player == seat))[0]
+            if len(rows):
+                step_actions[rows] = policy_actions(policy, game, rows)
+    else:
+        payoffs[~finished] = game.get_payoffs()[~finished]
+
+    return payoffs[:, player_id].reshape(len(actions), num_samples).sum(axis=1)
+
+
+_worker_policies = None
+
+
+def _init_worker(policies, seed):
+    global _worker_policies
+    _worker_policies = policies
+    np.random.seed((seed + os.getpid()) % 2 ** 32)
+
+
+def _rollout_task(states, actions, player_id, max_steps):
+    return rollout_payoffs(states, actions, player_id, _worker_policies, max_steps)
+
+
+class RolloutService:
+    """Monte Carlo action values over determinizations, played out in batches.
+
+    policies[seat] is the default policy of each seat during playouts. With
+    num_workers > 0 every batch of determinizations is split over a process
+    pool (the policies are sent to the workers once).
+    """
+
+    def __init__(self, policies, num_workers=0, batch_size=32, max_steps=1000, seed=None):
+        self.policies = policies
+        self.batch_size = batch_size
+        self.max_steps = max_steps
+        self.np_random = np.random.default_rng(seed)
+        self._encoders = weakref.WeakKeyDictionary()
+
+        self.num_workers = num_workers
+        self.pool = None
+        if num_workers > 0:
+            self.pool = mp.Pool(num_workers, initializer=_init_worker,
+                                initargs=(policies, int(self.np_random.integers(2 ** 31))))
+
+    def action_values(self, game, player_id=None, num_rollouts=None, time_budget=None):
+        """Mean payoff of each legal action for the current player, as {action: value}.
+
+        Determinizations are sampled from player_id's information (the current
+        player by default) in batches of batch_size, until num_rollouts per
+        action are done or time_budget seconds have passed; at least one batch
+        is always played.
+        """
+        if game.full_rules:
+            raise ValueError('Rollouts only model the simplified rules, not full-rules games')
+        if game.is_over():
+            raise ValueError('The game is over')
+        if len(self.policies) != game.num_players:
+            raise ValueError('{} default policies for a {}-player game'.format(len(self.policies), game.num_players))
+        if player_id is None:
+            player_id = game.current_player
+        if num_rollouts is None and time_budget is None:
+            num_rollouts = self.batch_size
+        encoder = self._encoders.get(game)
+        if encoder is None:
+            encoder = self._encoders[game] = CardPlaneObsEncoder.for_game(game, history=0)
+
+        actions = list(game.get_legal_action_ids())
+        totals = np.zeros(len(actions))
+        count = 0
+        start = time.perf_counter()
+        while True:
+            batch_size = self.batch_size if num_rollouts is None else min(self.batch_size, num_rollouts - count)
+            states = sample_determinizations(game, player_id, batch_size, self.np_random, encoder)
+            totals += self._run(states, actions, player_id)
+            count += batch_size
+            if num_rollouts is not None and count >= num_rollouts:
+                break
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                break
+        return dict(zip(actions, totals / count))
+
+    def _run(self, states, actions, player_id):
+        if self.pool is None:
+            return rollout_payoffs(states, actions, player_id, self.policies, self.max_steps)
+        chunks = np.array_split(np.arange(len(states['hands'])), self.num_workers)
+        tasks = [({name: value[chunk] for name, value in states.items()}, actions, player_id, self.max_steps)
+                 for chunk in chunks if len(chunk)]
+        return np.sum(self.pool.starmap(_rollout_task, tasks), axis=0)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
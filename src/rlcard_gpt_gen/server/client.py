@@ -0,0 +1,75 @@
+import asyncio
+import json
+import random
+
+
+class TableClient:
+    """Client side of the TableServer line protocol.
+
+    Events from the server are read with next_event(); requests are sent with
+    the op helpers. One client can sit at any number of tables.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765):
+        reader, writer = await asyncio.open_connection(host, port, limit=2 ** 20)
+        return cls(reader, writer)
+
+    async def send(self, **request):
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+
+    async def next_event(self):
+        """Next event from the server, or None once the connection is closed"""
+        line = await self.reader.readline()
+        return json.loads(line) if line else None
+
+    async def new_table(self, humans=1, games=1):
+        await self.send(op='new_table', humans=humans, games=games)
+
+    async def join(self, table_id):
+        await self.send(op='join', table=table_id)
+
+    async def act(self, table_id, action):
+        await self.send(op='act', table=table_id, action=action)
+
+    async def stats(self):
+        """Ask for the server stats and wait for them (other events are dropped)"""
+        await self.send(op='stats')
+        while True:
+            event = await self.next_event()
+            if event is None or event['event'] == 'stats':
+                return event
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_random(client, num_tables, games_per_table=1, seed=None):
+    """Open num_tables tables with the client in seat 0 and play random legal actions.
+
+    Returns the payoffs of the client's seat, one per game.
+    """
+    rng = random.Random(seed)
+    for _ in range(num_tables):
+        await client.new_table(humans=1, games=games_per_table)
+    payoffs = []
+    open_tables = num_tables
+    while open_tables:
+        event = await client.next_event()
+        if event is None:
+            break
+        if event['event'] == 'turn':
+            await client.act(event['table'], rng.choice(event['state']['legal_actions']))
+        elif event['event'] == 'over':
+            payoffs.append(event['payoffs'][0])
+        elif event['event'] == 'closed':
+            open_tables -= 1
+        elif event['event'] == 'error':
+            raise RuntimeError(event['message'])
+    return payoffs
@@ -0,0 +1,384 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from src.rlcard_gpt_gen import config as cambio_config
+from src.rlcard_gpt_gen.agents.always_draw_agent import AlwaysDrawAgent
+from src.rlcard_gpt_gen.agents.batched import batch_eval_step
+from src.rlcard_gpt_gen.agents.numpy_dqn_agent import NumpyDQNAgent
+from src.rlcard_gpt_gen.envs.core_env import CambioCoreEnv
+from src.rlcard_gpt_gen.utils.profiling import perf_counter_ns
+
+# Env config of the tables unless overridden; bots read their observation once, so the
+# encoder buffer does not need to be copied per step
+DEFAULT_TABLE_CONFIG = {
+    'obs_mode': 'incremental',
+    'share_obs_buffer': True,
+}
+
+
+class InferenceBatcher:
+    """Gathers the pending bot decisions of all tables into batched policy calls.
+
+    decide() queues one observation and waits for its action. A batch runs
+    when max_batch decisions are pending, when the oldest one has waited
+    max_delay seconds, or as soon as the event loop has nothing else to run
+    (no table can add a decision before the batch is answered anyway).
+    Decision latencies, from decide() to the action, are kept for the last
+    latency_window decisions. If the policy raises, decide() raises the error
+    for every decision of that batch and the batcher goes on with the next.
+    """
+
+    def __init__(self, policy, max_batch=256, max_delay=0.005, latency_window=100000):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_delay_ns = int(max_delay * 1e9)
+        self.pending = []  # (submit time ns, obs, legal mask, future)
+        self.wakeup = asyncio.Event()
+        self.latencies = deque(maxlen=latency_window)
+        self.num_decisions = 0
+        self.num_batches = 0
+
+    async def decide(self, obs, legal_mask):
+        future = asyncio.get_running_loop().create_future()
+        # The obs buffer may be shared with the env's encoder: copy it before yielding
+        self.pending.append((perf_counter_ns(), np.array(obs, dtype=np.float32), legal_mask, future))
+        self.wakeup.set()
+        return await future
+
+    async def run(self):
+        while True:
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            deadline = self.pending[0][0] + self.max_delay_ns
+            # Yield until the other tables stop adding decisions
+            while len(self.pending) < self.max_batch and perf_counter_ns() < deadline:
+                num_pending = len(self.pending)
+                await asyncio.sleep(0)
+                if len(self.pending) == num_pending:
+                    break
+            self._flush()
+
+    def _flush(self):
+        batch = self.pending[:self.max_batch]
+        del self.pending[:self.max_batch]
+        try:
+            obs = np.stack([request[1] for request in batch])
+            legal_masks = np.stack([request[2] for request in batch])
+            actions = batch_eval_step(self.policy, obs, legal_masks)
+        except Exception as exc:
+            # The tables waiting on this batch fail with the error instead of hanging; the others play on
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        now = perf_counter_ns()
+        for (submitted, _, _, future), action in zip(batch, actions):
+            if not future.done():
+                future.set_result(int(action))
+            self.latencies.append(now - submitted)
+        self.num_decisions += len(batch)
+        self.num_batches += 1
+
+
+def load_policy(checkpoint_path=None, num_actions=cambio_config.NUM_ACTIONS):
+    """Greedy DQNAgent from a save_checkpoint file or directory, NumpyDQNAgent from an
+    exported .npz file, or AlwaysDrawAgent without a path.
+
+    torch and rlcard are only imported for a save_checkpoint checkpoint.
+    """
+    if checkpoint_path is None:
+        return AlwaysDrawAgent(num_actions)
+    if checkpoint_path.endswith('.npz'):
+        return NumpyDQNAgent(checkpoint_path)
+    import torch
+    from rlcard.agents import DQNAgent
+    if os.path.isdir(checkpoint_path):
+        checkpoint_path = os.path.join(checkpoint_path, 'checkpoint_dqn.pt')
+    return DQNAgent.from_checkpoint(torch.load(checkpoint_path, weights_only=False))
+
+
+def public_state(game, player_id):
+    """JSON-serializable view of the game for the player at player_id"""
+    legal_actions = game.get_legal_action_ids()
+    return {
+        'hand': [int(card) for card in game.players[player_id].get_obs()],
+        'drawn_card': None if game.drawn_card is None else int(game.drawn_card),
+        'top_card': int(game.public_deck[-1]) if game.public_deck else None,
+        'discards': [[int(card) for card in game.player_discards[i]] for i in range(game.num_players)],
+        'draw_phase': bool(game.draw_phase),
+        'called_cambio': bool(game.called_cambio),
+        'current_player': int(game.current_player),
+        'legal_actions': list(legal_actions),
+        'action_names': game.get_legal_actions(),
+    }
+
+
+class Table:
+    """One table: a CambioCoreEnv and who plays each seat.
+
+    seats[i] is the _Client playing seat i, or None for a bot. A table plays
+    num_games games once every human seat is taken.
+    """
+
+    def __init__(self, table_id, num_humans, env_config, num_games, seed):
+        self.table_id = table_id
+        self.env = CambioCoreEnv(dict(env_config, seed=seed))
+        if num_humans > self.env.num_players:
+            raise ValueError('A table has only {} seats'.format(self.env.num_players))
+        self.num_humans = num_humans
+        self.seats = [None] * self.env.num_players
+        self.num_joined = 0
+        self.num_games = num_games
+        self.start = None  # perf_counter time the table became ready
+        self.ready = asyncio.Event()
+        if num_humans == 0:
+            self.ready.set()
+
+    def join(self, client):
+        if self.num_joined == self.num_humans:
+            raise ValueError('Table {} is full'.format(self.table_id))
+        seat = self.num_joined
+        self.seats[seat] = client
+        self.num_joined += 1
+        if self.num_joined == self.num_humans:
+            self.ready.set()
+        return seat
+
+    def humans(self):
+        return [client for client in self.seats if client is not None]
+
+
+class _Client:
+    """A connection and the actions it owes, by table id"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.waiting = {}  # table id -> (seat, legal actions, future)
+        self.tables = {}  # table id -> Table
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b'\n')
+
+
+class TableServer:
+    """Hosts Cambio tables for clients of a JSON-lines TCP protocol.
+
+    Bots at every table are played by policy through one InferenceBatcher.
+    Each client line is a JSON object with an 'op':
+    - {'op': 'new_table', 'humans': 1, 'games': 1}: open a table with the
+      client in seat 0; the other human seats are taken with 'join' and
+      bots play the rest. Answered with {'event': 'table', 'table', 'seat'}.
+    - {'op': 'join', 'table': id}: take the next free human seat.
+    - {'op': 'act', 'table': id, 'action': action id}: answer a 'turn'.
+    - {'op': 'stats'}: answered with {'event': 'stats', ...}, see stats().
+    The server sends {'event': 'turn', 'table', 'seat', 'state'} when a client
+    is to act (state is public_state()), {'event': 'over', 'table', 'game',
+    'payoffs', 'scores', 'truncated'} after every game, {'event': 'closed',
+    'table'} after the last one and {'event': 'error', 'message'} for bad
+    requests. Seats of clients that disconnect are played by the bots.
+    """
+
+    def __init__(self, policy, env_config=None, max_batch=256, max_delay=0.005, max_game_steps=1000, seed=0):
+        self.env_config = dict(DEFAULT_TABLE_CONFIG, **(env_config or {}))
+        self.batcher = InferenceBatcher(policy, max_batch, max_delay)
+        # Games still running after max_game_steps are scored on the current hands
+        self.max_game_steps = max_game_steps
+        self.seed = seed
+        self.table_ids = itertools.count()
+        self.tables = {}
+        self.tasks = set()
+        self.connections = {}  # _Client -> task handling its connection
+        self.server = None
+        self.batcher_task = None
+        self.num_games = 0
+        self.table_seconds = 0.0  # Summed lifetime of the tables
+        self.reset_stats()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start serving; returns the port (a free one by default)"""
+        self.batcher_task = asyncio.create_task(self.batcher.run())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    def open_table(self, num_humans=0, num_games=1):
+        """Open a table; it starts playing once num_humans clients have joined"""
+        table_id = next(self.table_ids)
+        table = Table(table_id, num_humans, self.env_config, num_games, self.seed + table_id)
+        self.tables[table_id] = table
+        task = asyncio.create_task(self._play(table))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return table
+
+    async def wait_tables(self):
+        """Wait until every open table has played all its games"""
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks))
+
+    async def _play(self, table):
+        env = table.env
+        game = env.game
+        try:
+            # Tables cancelled while waiting for their humans are cleaned up as well
+            await table.ready.wait()
+            table.start = time.perf_counter()
+            for game_idx in range(table.num_games):
+                state, player_id = env.reset()
+                steps = 0
+                while not env.is_over() and steps < self.max_game_steps:
+                    client = table.seats[player_id]
+                    action = None
+                    if client is not None:
+                        action = await self._human_action(table, client, player_id)
+                    if action is None:  # Bot, or a client that left
+                        action = await self.batcher.decide(state['obs'], game.get_legal_action_mask())
+                    state, player_id = env.step(action)
+                    steps += 1
+                self.num_games += 1
+                over = {
+                    'event': 'over', 'table': table.table_id, 'game': game_idx,
+                    'payoffs': [int(payoff) for payoff in env.get_payoffs()],
+                    'scores': [int(player.get_score()) for player in game.players],
+                    'truncated': not env.is_over(),
+                }
+                for client in table.humans():
+                    client.send(over)
+        finally:
+            for client in table.humans():
+                client.send({'event': 'closed', 'table': table.table_id})
+                client.tables.pop(table.table_id, None)
+            del self.tables[table.table_id]
+            if table.start is not None:
+                self.table_seconds += time.perf_counter() - table.start
+
+    async def _human_action(self, table, client, seat):
+        future = asyncio.get_running_loop().create_future()
+        legal_actions = table.env.game.get_legal_action_ids()
+        client.waiting[table.table_id] = (seat, legal_actions, future)
+        client.send({'event': 'turn', 'table': table.table_id, 'seat': seat,
+                     'state': public_state(table.env.game, seat)})
+        await client.writer.drain()
+        return await future
+
+    async def _handle(self, reader, writer):
+        client = _Client(writer)
+        self.connections[client] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self._request(client, json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    client.send({'event': 'error', 'message': str(e)})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Bots take over the seats of a client that left, and the free seats of tables it was waiting at
+            for table in client.tables.values():
+                table.seats = [None if seat is client else seat for seat in table.seats]
+                table.ready.set()
+            for _, _, future in client.waiting.values():
+                if not future.done():
+                    future.set_result(None)
+            client.waiting.clear()
+            del self.connections[client]
+            writer.close()
+
+    def _request(self, client, request):
+        op = request['op']
+        if op == 'act':
+            table_id = request['table']
+            if table_id not in client.waiting:
+                raise ValueError('Not your turn at table {}'.format(table_id))
+            seat, legal_actions, future = client.waiting[table_id]
+            action = int(request['action'])
+            if action not in legal_actions:
+                raise ValueError('Illegal action {} at table {}'.format(action, table_id))
+            del client.waiting[table_id]
+            future.set_result(action)
+        elif op == 'new_table':
+            table = self.open_table(int(request.get('humans', 1)), int(request.get('games', 1)))
+            self._join(client, table)
+        elif op == 'join':
+            table_id = request['table']
+            if table_id not in self.tables:
+                raise ValueError('No table {}'.format(table_id))
+            self._join(client, self.tables[table_id])
+        elif op == 'stats':
+            client.send(dict(self.stats(), event='stats'))
+        else:
+            raise ValueError('Unknown op: {}'.format(op))
+
+    def _join(self, client, table):
+        seat = table.join(client)
+        client.tables[table.table_id] = table
+        client.send({'event': 'table', 'table': table.table_id, 'seat': seat,
+                     'num_players': table.env.num_players, 'waiting': table.num_humans - table.num_joined})
+
+    def reset_stats(self):
+        """Start a new measurement window for stats()"""
+        self.batcher.latencies.clear()
+        self.stats_start = (time.perf_counter(), time.process_time(), self.batcher.num_decisions,
+                            self.batcher.num_batches, self.num_games, self.table_seconds_now())
+
+    def table_seconds_now(self):
+        """Time finished and running tables have been playing, summed over tables"""
+        now = time.perf_counter()
+        return self.table_seconds + sum(now - table.start for table in self.tables.values() if table.start is not None)
+
+    def stats(self):
+        """Decision latency percentiles and throughput since reset_stats().
+
+        tables_per_core is table lifetime per CPU second of this process: how
+        many tables like the measured ones one busy core can keep running.
+        """
+        wall_start, cpu_start, decisions_start, batches_start, games_start, table_seconds_start = self.stats_start
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        decisions = self.batcher.num_decisions - decisions_start
+        batches = self.batcher.num_batches - batches_start
+        latencies = np.array(self.batcher.latencies) / 1e6
+        table_seconds = self.table_seconds_now() - table_seconds_start
+        return {
+            'open_tables': len(self.tables),
+            'games': self.num_games - games_start,
+            'decisions': decisions,
+            'mean_batch': decisions / batches if batches else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'decisions_per_s': decisions / wall if wall > 0 else 0.0,
+            'games_per_s': (self.num_games - games_start) / wall if wall > 0 else 0.0,
+            'cpu_utilization': cpu / wall if wall > 0 else 0.0,
+            'tables_per_core': table_seconds / cpu if cpu > 0 else 0.0,
+            'cpu_count': os.cpu_count(),
+        }
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            # Closing the connections ends their handlers
+            handlers = list(self.connections.values())
+            for client in list(self.connections):
+                client.writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self.server.wait_closed()
+        for task in list(self.tasks) + [self.batcher_task]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
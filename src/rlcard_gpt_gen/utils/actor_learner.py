@@ -0,0 +1,335 @@
+import glob
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+from rlcard.agents import DQNAgent
+from rlcard.utils import reorganize
+
+
+class WeightBuffer:
+    """Latest weights of a network in shared memory, with a version counter.
+
+    The learner publishes the state dict of its Q-network; actors copy it into
+    their own network when the version changed. All tensors are stored as
+    float32 and cast back on load.
+    """
+
+    def __init__(self, state_dict=None, name=None, layout=None, lock=None, version=None):
+        if state_dict is not None:
+            layout = [(key, tuple(value.shape), value.dtype) for key, value in state_dict.items()]
+            size = sum(int(np.prod(shape)) for _, shape, _ in layout)
+            self.block = shared_memory.SharedMemory(create=True, size=max(size, 1) * 4)
+            self.lock = mp.Lock()
+            self.version = mp.Value('q', 0, lock=False)
+            self.owner = True
+        else:
+            self.block = shared_memory.SharedMemory(name=name)
+            self.lock = lock
+            self.version = version
+            self.owner = False
+        self.layout = layout
+        self.flat = np.ndarray(sum(int(np.prod(shape)) for _, shape, _ in layout), dtype=np.float32, buffer=self.block.buf)
+        if state_dict is not None:
+            self.publish(state_dict)
+
+    def handle(self):
+        """Arguments for attaching to the buffer from another process"""
+        return {'name': self.block.name, 'layout': self.layout, 'lock': self.lock, 'version': self.version}
+
+    def publish(self, state_dict):
+        with self.lock:
+            offset = 0
+            for key, shape, _ in self.layout:
+                size = int(np.prod(shape))
+                self.flat[offset:offset + size] = state_dict[key].detach().cpu().numpy().ravel()
+                offset += size
+            self.version.value += 1
+
+    def load(self, module, version=None):
+        """Copy the weights into module if they changed since version; returns the loaded version"""
+        if version is not None and self.version.value == version:
+            return version
+        with self.lock:
+            flat = self.flat.copy()
+            version = self.version.value
+        module.load_state_dict(self._state_dict(flat))
+        return version
+
+    def _state_dict(self, flat):
+        state_dict = {}
+        offset = 0
+        for key, shape, dtype in self.layout:
+            size = int(np.prod(shape))
+            state_dict[key] = torch.from_numpy(flat[offset:offset + size].reshape(shape)).to(dtype)
+            offset += size
+        return state_dict
+
+    def close(self):
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+class OpponentPool:
+    """Past Q-network weights on disk, sampled as opponents.
+
+    Snapshots are written as path/opponent_<step>.pt; only the newest max_size
+    are kept.
+    """
+
+    def __init__(self, path, max_size=20):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def files(self):
+        return sorted(glob.glob(os.path.join(self.path, 'opponent_*.pt')))
+
+    def add(self, state_dict, step):
+        filename = os.path.join(self.path, 'opponent_{:09d}.pt'.format(step))
+        # Written under a temporary name so that actors never load a partial file
+        torch.save(state_dict, filename + '.tmp')
+        os.replace(filename + '.tmp', filename)
+        for old in self.files()[:-self.max_size]:
+            os.remove(old)
+
+    def sample(self, rng):
+        """State dict of a random snapshot, or None if the pool is empty"""
+        files = self.files()
+        while files:
+            filename = files.pop(rng.randrange(len(files)))
+            try:
+                return torch.load(filename)
+            except (FileNotFoundError, EOFError, RuntimeError):  # Pruned while we were loading it
+                continue
+        return None
+
+
+def pack_transitions(transitions, state_shape, num_actions):
+    """Stack the (state, action, reward, next_state, done) transitions of an episode into arrays"""
+    n = len(transitions)
+    states = np.zeros((n, *state_shape), dtype=np.float32)
+    next_states = np.zeros((n, *state_shape), dtype=np.float32)
+    actions = np.zeros(n, dtype=np.int64)
+    rewards = np.zeros(n, dtype=np.float32)
+    dones = np.zeros(n, dtype=bool)
+    legal_actions = np.zeros((n, num_actions), dtype=bool)
+    for i, (state, action, reward, next_state, done) in enumerate(transitions):
+        states[i] = state['obs']
+        next_states[i] = next_state['obs']
+        actions[i] = action
+        rewards[i] = reward
+        dones[i] = done
+        legal_actions[i, list(next_state['legal_actions'])] = True
+    return states, actions, rewards, next_states, legal_actions, dones
+
+
+def _actor(actor_id, env_config, agent_kwargs, weights, pool_path, transitions, total_t, stop,
+           seed, refresh_every, self_play_prob):
+    # Imported here so that spawned actors register the env themselves
+    import rlcard
+    from src import rlcard_gpt_gen  # noqa: F401
+
+    # Actors are meant to run one per core
+    torch.set_num_threads(1)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    rng = random.Random(seed)
+
+    env = rlcard.make('cambio', config=dict(env_config, seed=seed))
+    state_shape = env.state_shape[0]
+    weights = WeightBuffer(**weights)
+    pool = OpponentPool(pool_path) if pool_path else None
+
+    # The learner's policy explores with the learner's epsilon; opponents play greedily
+    agent = DQNAgent(**agent_kwargs)
+    opponents = [DQNAgent(**dict(agent_kwargs, epsilon_start=0.0, epsilon_end=0.0))
+                 for _ in range(env.num_players - 1)]
+    version = None
+
+    try:
+        episode = 0
+        while not stop.is_set():
+            if episode % refresh_every == 0:
+                version = weights.load(agent.q_estimator.qnet, version)
+                for opponent in opponents:
+                    state_dict = None
+                    if pool is not None and rng.random() >= self_play_prob:
+                        state_dict = pool.sample(rng)
+                    if state_dict is None:
+                        weights.load(opponent.q_estimator.qnet)
+                    else:
+                        opponent.q_estimator.qnet.load_state_dict(state_dict)
+
+            # The learning seat moves around the table
+            seat = episode % env.num_players
+            agents = opponents[:seat] + [agent] + opponents[seat:]
+            env.set_agents(agents)
+            agent.total_t = total_t.value
+            trajectories, payoffs = env.run(is_training=True)
+            episode_transitions = reorganize(trajectories, payoffs)[seat]
+            if episode_transitions:
+                batch = pack_transitions(episode_transitions, state_shape, env.num_actions)
+                while not stop.is_set():
+                    try:
+                        transitions.put((actor_id, batch), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+            episode += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transitions.cancel_join_thread()
+        weights.close()
+
+
+class ActorLearner:
+    """Asynchronous DQN self-play: actor processes play, the calling process learns.
+
+    Each actor runs CambioEnv games with a copy of the learner's Q-network in a
+    rotating seat and the other seats taken by greedy opponents, and streams
+    the learner seat's transitions through a queue. The learner stores them in
+    agent.memory and trains as fast as it can, publishing its weights every
+    publish_every updates; actors reload them every refresh_every episodes.
+
+    With pool_path set, the learner also saves its weights there every
+    pool_every updates, and each opponent seat plays the current weights with
+    probability self_play_prob or a random past snapshot otherwise.
+    """
+
+    def __init__(self, agent_kwargs, num_actors=2, env_config=None, seed=0, queue_size=64,
+                 publish_every=20, refresh_every=10, pool_path=None, pool_size=20, pool_every=500,
+                 self_play_prob=0.5, min_transitions_per_update=0):
+        self.agent_kwargs = dict(agent_kwargs)
+        self.num_actors = num_actors
+        self.env_config = dict(env_config or {})
+        self.seed = seed
+        self.publish_every = publish_every
+        self.refresh_every = refresh_every
+        self.pool = OpponentPool(pool_path, pool_size) if pool_path else None
+        self.pool_every = pool_every
+        self.self_play_prob = self_play_prob
+        # Wait for this many new transitions per update, to cap how often old data is replayed
+        self.min_transitions_per_update = min_transitions_per_update
+
+        self.agent = DQNAgent(**self.agent_kwargs)
+        self.weights = WeightBuffer(self.agent.q_estimator.qnet.state_dict())
+        self.transitions = mp.Queue(queue_size)
+        self.total_t = mp.Value('q', 0, lock=False)
+        self.stop = mp.Event()
+        self.actors = []
+        self.episodes = 0
+
+    def start(self):
+        for actor_id in range(self.num_actors):
+            actor = mp.Process(target=_actor, daemon=True, args=(
+                actor_id, self.env_config, self.agent_kwargs, self.weights.handle(),
+                self.pool.path if self.pool is not None else None, self.transitions, self.total_t,
+                self.stop, self.seed + 1000 * (actor_id + 1), self.refresh_every, self.self_play_prob,
+            ))
+            actor.start()
+            self.actors.append(actor)
+
+    def train(self, num_episodes, callback=None):
+        """Learn from num_episodes more actor episodes.
+
+        callback(episode) is called after every received episode, e.g. to
+        evaluate self.agent. Returns throughput statistics of this call.
+        """
+        if not self.actors:
+            self.start()
+        agent = self.agent
+        memory_init = agent.replay_memory_init_size
+        start = time.perf_counter()
+        start_t, start_train_t = agent.total_t, agent.train_t
+        wait = 0.0
+        pending = 0
+        target = self.episodes + num_episodes
+
+        while self.episodes < target:
+            # Take everything the actors sent; only block if there is nothing to train on
+            block = agent.total_t < memory_init or pending < self.min_transitions_per_update
+            received = 0
+            while self.episodes < target:
+                try:
+                    if block and received == 0:
+                        wait_start = time.perf_counter()
+                        batch = self._get()
+                        wait += time.perf_counter() - wait_start
+                    else:
+                        batch = self.transitions.get_nowait()[1]
+                except queue.Empty:
+                    break
+                self._feed(batch)
+                pending += len(batch[0])
+                received += 1
+                self.episodes += 1
+                if callback is not None:
+                    callback(self.episodes)
+
+            if agent.total_t >= memory_init and pending >= self.min_transitions_per_update:
+                agent.train()
+                pending = max(0, pending - self.min_transitions_per_update)
+                if agent.train_t % self.publish_every == 0:
+                    self.weights.publish(agent.q_estimator.qnet.state_dict())
+                if self.pool is not None and agent.train_t % self.pool_every == 0:
+                    self.pool.add(agent.q_estimator.qnet.state_dict(), agent.train_t)
+
+        elapsed = time.perf_counter() - start
+        return {
+            'episodes': num_episodes,
+            'transitions': agent.total_t - start_t,
+            'updates': agent.train_t - start_train_t,
+            'seconds': elapsed,
+            'transitions_per_s': (agent.total_t - start_t) / elapsed,
+            'updates_per_s': (agent.train_t - start_train_t) / elapsed,
+            'learner_wait_s': wait,
+            'weights_version': self.weights.version.value,
+        }
+
+    def _get(self):
+        while True:
+            try:
+                return self.transitions.get(timeout=1.0)[1]
+            except queue.Empty:
+                if not any(actor.is_alive() for actor in self.actors):
+                    raise RuntimeError('All actors have exited')
+
+    def _feed(self, batch):
+        states, actions, rewards, next_states, legal_actions, dones = batch
+        memory = self.agent.memory
+        for i in range(len(actions)):
+            memory.save(states[i], int(actions[i]), float(rewards[i]), next_states[i],
+                        np.flatnonzero(legal_actions[i]).tolist(), bool(dones[i]))
+        self.agent.total_t += len(actions)
+        self.total_t.value = self.agent.total_t
+
+    def close(self):
+        self.stop.set()
+        # Actors blocked on a full queue need it drained to notice the stop
+        deadline = time.perf_counter() + 10
+        while any(actor.is_alive() for actor in self.actors) and time.perf_counter() < deadline:
+            try:
+                self.transitions.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for actor in self.actors:
+            actor.join(timeout=1)
+            if actor.is_alive():
+                actor.terminate()
+        self.actors = []
+        self.weights.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
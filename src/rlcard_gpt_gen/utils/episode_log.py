@@ -0,0 +1,190 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.envs.obs_encoder import CardPlaneObsEncoder, IncrementalObsEncoder
+from src.rlcard_gpt_gen.games.dealer import DECK_SIZE, num_decks_for
+from src.rlcard_gpt_gen.games.game import CambioGame, DELTA_ACTION
+
+
+# One index entry per episode. Its record in the chunk file is the initial deck
+# order (one byte per card of the table's decks) followed by one byte per action.
+# The table shape is not stored: readers and writers of a log must be given the same one.
+INDEX_DTYPE = np.dtype([
+    ('chunk', np.uint32),
+    ('offset', np.uint64),
+    ('num_actions', np.uint32),
+    ('seed', np.int64),  # -1 if the game was not dealt from a known seed
+])
+INDEX_FILE = 'index.bin'
+
+
+def _chunk_path(path, chunk):
+    return os.path.join(path, 'chunk_{:05d}.bin'.format(chunk))
+
+
+def game_actions(game):
+    """Actions played so far in the game, from its delta log."""
+    return [delta[2] for delta in game.deltas if delta[0] == DELTA_ACTION]
+
+
+class EpisodeWriter:
+    """Appends finished games to chunked binary files under path.
+
+    Records are buffered and written every flush_every episodes; the index is
+    only extended after the chunk data it points to is on disk. Opening an
+    existing log appends to it.
+    """
+
+    def __init__(self, path, episodes_per_chunk=100000, flush_every=1000,
+                 num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE, num_decks=None):
+        self.path = path
+        self.episodes_per_chunk = episodes_per_chunk
+        self.flush_every = flush_every
+        self.deck_size = (num_decks if num_decks is not None else num_decks_for(num_players, hand_size)) * DECK_SIZE
+        os.makedirs(path, exist_ok=True)
+
+        index_path = os.path.join(path, INDEX_FILE)
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE) if os.path.exists(index_path) else np.empty(0, INDEX_DTYPE)
+        if len(index):
+            last = index[-1]
+            self.chunk = int(last['chunk'])
+            self.chunk_episodes = int(np.sum(index['chunk'] == last['chunk']))
+            self.offset = int(last['offset']) + self.deck_size + int(last['num_actions'])
+            # Drop data of episodes that never made it into the index
+            with open(_chunk_path(path, self.chunk), 'r+b') as f:
+                f.truncate(self.offset)
+        else:
+            self.chunk = 0
+            self.chunk_episodes = 0
+            self.offset = 0
+        self.num_episodes = len(index)
+
+        self.data = bytearray()
+        self.entries = []
+
+    def record(self, game):
+        """Record the game played so far (normally a finished one)."""
+        self.write(game.dealer.deck, game_actions(game), game.dealer.game_seed)
+
+    def write(self, deck, actions, seed=None):
+        if self.chunk_episodes == self.episodes_per_chunk:
+            self.flush()
+            self.chunk += 1
+            self.chunk_episodes = 0
+            self.offset = 0
+
+        self.data += bytes(np.asarray(deck, dtype=np.uint8))
+        self.data += bytes(actions)
+        self.entries.append((self.chunk, self.offset, len(actions), -1 if seed is None else seed))
+        self.offset += self.deck_size + len(actions)
+        self.chunk_episodes += 1
+        self.num_episodes += 1
+        if len(self.entries) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.entries:
+            return
+        with open(_chunk_path(self.path, self.chunk), 'ab') as f:
+            f.write(self.data)
+        with open(os.path.join(self.path, INDEX_FILE), 'ab') as f:
+            f.write(np.array(self.entries, dtype=INDEX_DTYPE).tobytes())
+        self.data = bytearray()
+        self.entries = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EpisodeReader:
+    """Replays games from an episode log without agents or an rlcard env.
+
+    Games are rebuilt on a bare CambioGame from the recorded deck order and
+    action stream, so every step of a recorded game can be restored exactly.
+    """
+
+    def __init__(self, path, num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE, num_decks=None):
+        self.path = path
+        self.index = np.fromfile(os.path.join(path, INDEX_FILE), dtype=INDEX_DTYPE)
+        self.chunks = {}
+        self.game = CambioGame(num_players, hand_size, num_decks)
+        self.game.include_history = False
+        self.deck_size = self.game.dealer.deck_size
+        self.encoders = {
+            'vector': IncrementalObsEncoder(num_players, hand_size),
+            'planes': CardPlaneObsEncoder.for_game(self.game),
+        }
+
+    def __len__(self):
+        return len(self.index)
+
+    def _chunk(self, chunk):
+        if chunk not in self.chunks:
+            self.chunks[chunk] = np.memmap(_chunk_path(self.path, chunk), dtype=np.uint8, mode='r')
+        return self.chunks[chunk]
+
+    def episode(self, k):
+        """(seed, deck, actions) of episode k; seed is None if unknown"""
+        entry = self.index[k]
+        data = self._chunk(int(entry['chunk']))
+        start = int(entry['offset'])
+        deck_end = start + self.deck_size
+        end = deck_end + int(entry['num_actions'])
+        seed = int(entry['seed'])
+        return (None if seed < 0 else seed), data[start:deck_end], data[deck_end:end].tolist()
+
+    def replay(self, k, num_steps=None):
+        """Game of episode k after its first num_steps actions (all of them by default).
+
+        The returned game is reused by the next call.
+        """
+        seed, deck, actions = self.episode(k)
+        game = self.game
+        game._set_up_game(seed, deck)
+        for action in actions[:num_steps]:
+            game.apply_action(action)
+        return game
+
+    def transitions(self, k, player_id=0, obs_mode='vector'):
+        """Yield the (state, action, reward, next_state, done) transitions of one seat.
+
+        They match rlcard.utils.reorganize on the trajectory CambioEnv.run would
+        have produced, with states holding 'obs' and 'legal_actions', and can be
+        passed to DQNAgent.feed. obs_mode 'vector' gives the vector observation,
+        'planes' the card planes.
+        """
+        seed, deck, actions = self.episode(k)
+        game = self.game
+        game._set_up_game(seed, deck)
+        encoder = self.encoders[obs_mode]
+
+        def state():
+            return {
+                'obs': encoder.encode(game, player_id).copy(),
+                'legal_actions': OrderedDict.fromkeys(game.get_legal_action_ids()),
+            }
+
+        previous = None
+        for action in actions:
+            if game.current_player == player_id:
+                current = state()
+                if previous is not None:
+                    yield previous[0], previous[1], 0, current, False
+                previous = (current, action)
+            game.apply_action(action)
+
+        if previous is not None:
+            yield previous[0], previous[1], game.get_payoffs()[player_id], state(), True
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.episode(k)
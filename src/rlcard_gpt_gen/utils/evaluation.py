@@ -0,0 +1,135 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from src.rlcard_gpt_gen.agents.batched import batch_eval_step
+from src.rlcard_gpt_gen.envs.vector_env import VectorCambioEnv
+from src.rlcard_gpt_gen.utils.profiling import perf_counter_ns
+
+
+def summarize(payoffs, scores, truncated, confidence=0.95):
+    """Per-seat statistics of finished games.
+
+    payoffs and scores have shape (num_games, num_players). The *_ci entries are
+    half-widths of normal-approximation confidence intervals.
+    """
+    num_games = len(payoffs)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    wins = payoffs > 0
+
+    def half_width(values):
+        if num_games < 2:
+            return np.full(values.shape[1], np.inf)
+        return z * values.std(axis=0, ddof=1) / np.sqrt(num_games)
+
+    return {
+        'num_games': num_games,
+        'num_truncated': int(truncated.sum()),
+        'win_rate': wins.mean(axis=0),
+        'win_rate_ci': half_width(wins.astype(float)),
+        'mean_payoff': payoffs.mean(axis=0),
+        'payoff_ci': half_width(payoffs),
+        'mean_score': scores.mean(axis=0),
+    }
+
+
+class Evaluator:
+    """Plays evaluation games on a persistent VectorCambioEnv.
+
+    Game k is always dealt from seed + k, so results only depend on the agents
+    and not on how games are spread over workers. Each step runs one batched
+    inference call per seat over all games waiting on that seat. Games longer
+    than max_game_steps are scored on the hands at that point.
+    """
+
+    def __init__(self, num_envs=32, num_workers=None, seed=0, config=None, max_game_steps=1000):
+        self.seed = seed
+        self.venv = VectorCambioEnv(num_envs, num_workers, config=config, seed=seed, max_game_steps=max_game_steps)
+        # Optional utils.profiling.Profiler timing batched inference and env steps
+        self.profiler = None
+
+    def evaluate(self, agents, num_games, ci_tolerance=None, min_games=100, confidence=0.95):
+        """Play up to num_games with agents[i] in seat i.
+
+        With ci_tolerance set, stop early once games 0..k-1 are all finished for
+        some k >= min_games and the payoff confidence interval of every seat over
+        them is narrower than +/- ci_tolerance; the statistics are then those of
+        games 0..k-1. Games finished out of order are left out, since short games
+        finish first and would bias the estimate.
+        """
+        if self.profiler is None:
+            return self._evaluate(agents, num_games, ci_tolerance, min_games, confidence)
+        with self.profiler.timer('evaluate'):
+            stats = self._evaluate(agents, num_games, ci_tolerance, min_games, confidence)
+        self.profiler.count('eval_games', stats['num_games'])
+        return stats
+
+    def _evaluate(self, agents, num_games, ci_tolerance, min_games, confidence):
+        for agent in agents:
+            if hasattr(agent, 'bind_game'):
+                raise ValueError('{} plays on the game core, which stays in the env workers; '
+                                 'play it through CambioEnv.run instead'.format(type(agent).__name__))
+        profiler = self.profiler
+        venv = self.venv
+        num_envs = venv.num_envs
+        num_players = venv.num_players
+
+        # Game index currently played by each env, and the one it starts next
+        env_games = np.arange(num_envs)
+        next_games = env_games + num_envs
+        next_game = 2 * num_envs
+
+        venv.seeds[:] = self.seed + env_games
+        obs, legal_actions, player_ids = venv.reset()
+        venv.seeds[:] = self.seed + next_games
+
+        payoffs = np.zeros((num_games, num_players))
+        scores = np.zeros((num_games, num_players))
+        truncated = np.zeros(num_games, dtype=bool)
+        finished = np.zeros(num_games, dtype=bool)
+        actions = np.zeros(num_envs, dtype=np.int64)
+
+        while not finished.all():
+            for seat, agent in enumerate(agents):
+                idx = np.nonzero(player_ids == seat)[0]
+                if len(idx) > 0:
+                    if profiler is None:
+                        actions[idx] = batch_eval_step(agent, obs[idx], legal_actions[idx])
+                    else:
+                        start = perf_counter_ns()
+                        actions[idx] = batch_eval_step(agent, obs[idx], legal_actions[idx])
+                        profiler.add('eval_inference', perf_counter_ns() - start)
+            if profiler is None:
+                obs, legal_actions, player_ids, step_payoffs, dones = venv.step(actions)
+            else:
+                start = perf_counter_ns()
+                obs, legal_actions, player_ids, step_payoffs, dones = venv.step(actions)
+                profiler.add('eval_env_step', perf_counter_ns() - start)
+
+            if not dones.any():
+                continue
+            for i in np.nonzero(dones)[0]:
+                game = env_games[i]
+                if game < num_games:
+                    payoffs[game] = step_payoffs[i]
+                    scores[game] = venv.scores[i]
+                    truncated[game] = venv.truncated[i]
+                    finished[game] = True
+                env_games[i] = next_games[i]
+                next_games[i] = next_game
+                venv.seeds[i] = self.seed + next_game
+                next_game += 1
+
+            if ci_tolerance is None:
+                continue
+            # Length of the prefix of games that are all finished
+            prefix = num_games if finished.all() else int(np.argmin(finished))
+            if prefix >= min_games:
+                stats = summarize(payoffs[:prefix], scores[:prefix], truncated[:prefix], confidence)
+                if np.all(stats['payoff_ci'] <= ci_tolerance):
+                    return stats
+
+        return summarize(payoffs, scores, truncated, confidence)
+
+    def close(self):
+        self.venv.close()
@@ -0,0 +1,146 @@
+import os
+import time
+from contextlib import contextmanager
+
+# cProfile, csv and json are imported where they are used: the envs import this
+# module for perf_counter_ns alone, and it is on the import path of every worker
+
+perf_counter_ns = time.perf_counter_ns
+
+
+class Profiler:
+    """Per-phase timers and event counters.
+
+    Instrumented objects (CambioEnv, Evaluator) keep a profiler attribute that is
+    None by default, so disabled profiling costs one attribute check per call.
+    Hot paths measure themselves with perf_counter_ns and call add(); other code
+    can use the timer() context manager.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.times = {}  # Phase name -> total ns
+        self.calls = {}  # Phase name -> number of timed calls
+        self.counters = {}
+        self.start_ns = perf_counter_ns()
+
+    def add(self, name, elapsed_ns, calls=1):
+        self.times[name] = self.times.get(name, 0) + elapsed_ns
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, name):
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter_ns() - start)
+
+    def summary(self):
+        """Flat dict of mean us per call, calls and total seconds per phase, counters and their rates"""
+        wall = (perf_counter_ns() - self.start_ns) / 1e9
+        result = {'wall_s': wall}
+        for name, total in sorted(self.times.items()):
+            calls = self.calls[name]
+            result[name + '_us'] = total / 1e3 / calls if calls else 0.0
+            result[name + '_calls'] = calls
+            result[name + '_s'] = total / 1e9
+        for name, n in sorted(self.counters.items()):
+            result[name] = n
+            result[name + '_per_s'] = n / wall if wall > 0 else 0.0
+        return result
+
+
+class ProfileWriter:
+    """Appends profiler summaries to a JSON lines or CSV file (by extension), or to an rlcard Logger."""
+
+    def __init__(self, path=None, logger=None):
+        self.path = path
+        self.logger = logger
+        self.fieldnames = None
+
+    def write(self, profiler, **fields):
+        row = dict(fields, **profiler.summary())
+        if self.logger is not None:
+            self.logger.log('  '.join('{}={}'.format(k, _fmt(v)) for k, v in row.items()))
+        if self.path is None:
+            return row
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if self.path.endswith('.csv'):
+            import csv
+            # Phases seen after the first row are dropped to keep the columns fixed
+            new_file = self.fieldnames is None
+            if new_file:
+                self.fieldnames = list(row)
+            with open(self.path, 'w' if new_file else 'a', newline='') as f:
+                writer = csv.DictWriter(f, self.fieldnames, extrasaction='ignore')
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+        else:
+            import json
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(row) + '\n')
+        return row
+
+
+def _fmt(value):
+    return '{:.4g}'.format(value) if isinstance(value, float) else value
+
+
+class EpisodeProfile:
+    """cProfile the next num_episodes episodes and dump pstats to path.
+
+    Call episode_done() after every episode; the dump is readable with pstats,
+    snakeviz or flameprof.
+    """
+
+    def __init__(self, path, num_episodes):
+        import cProfile
+        self.path = path
+        self.remaining = num_episodes
+        self.profile = cProfile.Profile()
+        if self.remaining > 0:
+            self.profile.enable()
+
+    def episode_done(self):
+        if self.remaining <= 0:
+            return
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.profile.disable()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.profile.dump_stats(self.path)
+
+
+_IMPORT_SNIPPET = '''
+import sys, time
+{preload}
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1e3, ' '.join(sorted(sys.modules)))
+'''
+
+
+def import_time(module, repeat=5, preload=()):
+    """Median ms to import module in a fresh interpreter, and the modules loaded after it.
+
+    Each run starts a new python process, so nothing is cached in sys.modules
+    (the OS file cache is warm after the first run). The preload modules are
+    imported before the timer starts.
+    """
+    import statistics
+    import subprocess
+    import sys
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _IMPORT_SNIPPET.format(module=module, preload='\n'.join('import ' + name for name in preload))],
+                                check=True, capture_output=True, text=True).stdout.split()
+        times.append(float(output[0]))
+    return statistics.median(times), set(output[1:])
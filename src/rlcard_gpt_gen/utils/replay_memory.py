@@ -0,0 +1,184 @@
+import os
+
+import numpy as np
+
+from src.rlcard_gpt_gen import config
+from src.rlcard_gpt_gen.envs.obs_encoder import VectorLayout
+
+
+class ObsPacking:
+    """Bit-packing of the vector observations of one table shape.
+
+    The vector observation is binary except for its last entry, current_player / num_players.
+    The binary part is bit-packed and the player id goes into the spare low bits of the
+    last byte, or into one more byte if they are too few.
+    """
+
+    def __init__(self, num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE):
+        self.num_players = num_players
+        self.hand_size = hand_size
+        self.num_actions = config.num_actions(hand_size)
+        self.obs_dim = VectorLayout(num_players, hand_size).dim
+        self.obs_bits = self.obs_dim - 1
+        self.packed_obs_bytes = (self.obs_bits + 7) // 8
+        self.player_bits = self.packed_obs_bytes * 8 - self.obs_bits
+        if num_players >= 2 ** self.player_bits:
+            self.packed_obs_bytes += 1
+            self.player_bits = 8
+        self.packed_legal_bytes = (self.num_actions + 7) // 8
+        self.transition_dtype = np.dtype([
+            ('state', np.uint8, (self.packed_obs_bytes,)),
+            ('action', np.uint8),
+            ('reward', np.float32),
+            ('next_state', np.uint8, (self.packed_obs_bytes,)),
+            ('legal_actions', np.uint8, (self.packed_legal_bytes,)),  # Legal actions of next_state
+            ('done', np.bool_),
+        ])
+
+    def pack_obs(self, obs):
+        """Pack (..., obs_dim) observations into (..., packed_obs_bytes) uint8."""
+        obs = np.asarray(obs)
+        packed = np.zeros(obs.shape[:-1] + (self.packed_obs_bytes,), dtype=np.uint8)
+        bits = np.packbits(obs[..., :self.obs_bits] > 0.5, axis=-1)
+        packed[..., :bits.shape[-1]] = bits
+        packed[..., -1] |= np.rint(obs[..., self.obs_bits] * self.num_players).astype(np.uint8)
+        return packed
+
+    def unpack_obs(self, packed):
+        """Inverse of pack_obs, as float32."""
+        packed = np.asarray(packed)
+        obs = np.empty(packed.shape[:-1] + (self.obs_dim,), dtype=np.float32)
+        obs[..., :self.obs_bits] = np.unpackbits(packed, axis=-1, count=self.obs_bits)
+        obs[..., self.obs_bits] = (packed[..., -1] & (2 ** self.player_bits - 1)) / self.num_players
+        return obs
+
+    def pack_legal_actions(self, legal_actions):
+        mask = np.zeros(self.num_actions, dtype=bool)
+        mask[list(legal_actions)] = True
+        return np.packbits(mask)
+
+    def unpack_legal_actions(self, packed):
+        """Legal action lists of (n, packed_legal_bytes) packed masks"""
+        masks = np.unpackbits(packed, axis=1, count=self.num_actions)
+        return [np.flatnonzero(mask).tolist() for mask in masks]
+
+
+# Packing of the default table
+_DEFAULT_PACKING = ObsPacking()
+OBS_BITS = _DEFAULT_PACKING.obs_bits
+PACKED_OBS_BYTES = _DEFAULT_PACKING.packed_obs_bytes
+PLAYER_BITS = _DEFAULT_PACKING.player_bits
+PACKED_LEGAL_BYTES = _DEFAULT_PACKING.packed_legal_bytes
+TRANSITION_DTYPE = _DEFAULT_PACKING.transition_dtype
+pack_obs = _DEFAULT_PACKING.pack_obs
+unpack_obs = _DEFAULT_PACKING.unpack_obs
+pack_legal_actions = _DEFAULT_PACKING.pack_legal_actions
+
+
+class CambioReplayMemory:
+    """Replay memory for Cambio DQN agents, kept in memory-mapped files under path.
+
+    Drop-in replacement for the memory of rlcard's DQNAgent (agent.memory):
+    save() and sample() have the same signatures. Each transition takes
+    ObsPacking.transition_dtype.itemsize bytes (39 for the default table)
+    instead of two float64 observation arrays. Only the vector observations
+    ('vector' and 'incremental' obs_mode) of the given table shape fit: a
+    state_shape, and every saved observation, of another shape or dtype is
+    rejected with a ValueError.
+    Reopening an existing path continues the same ring buffer, and with
+    readonly=True several processes can sample from a buffer that one
+    process keeps writing.
+    """
+
+    def __init__(self, path, memory_size, batch_size, readonly=False, seed=None,
+                 num_players=config.N_PLAYERS, hand_size=config.HAND_SIZE, state_shape=None):
+        self.path = path
+        self.memory_size = memory_size
+        self.batch_size = batch_size
+        self.readonly = readonly
+        self.np_random = np.random.default_rng(seed)
+        self.packing = ObsPacking(num_players, hand_size)
+        if state_shape is not None and tuple(state_shape) != (self.packing.obs_dim,):
+            raise ValueError('Replay memory packs vector observations of shape ({},), not {}'.format(
+                self.packing.obs_dim, tuple(state_shape)))
+        transition_dtype = self.packing.transition_dtype
+
+        data_path = os.path.join(path, 'transitions.npy')
+        header_path = os.path.join(path, 'header.npy')
+        if os.path.exists(data_path):
+            mode = 'r' if readonly else 'r+'
+            self.data = np.load(data_path, mmap_mode=mode)
+            self.header = np.load(header_path, mmap_mode=mode)
+            if self.data.dtype != transition_dtype or len(self.data) != memory_size:
+                raise ValueError('Replay memory at {} has a different layout or size'.format(path))
+        elif readonly:
+            raise FileNotFoundError(data_path)
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.data = np.lib.format.open_memmap(data_path, mode='w+', dtype=transition_dtype, shape=(memory_size,))
+            # Number of stored transitions, index of the next write
+            self.header = np.lib.format.open_memmap(header_path, mode='w+', dtype=np.int64, shape=(2,))
+
+    def __len__(self):
+        return int(self.header[0])
+
+    def save(self, state, action, reward, next_state, legal_actions, done):
+        """Save a transition; state and next_state are observation vectors."""
+        self._check_obs(state)
+        self._check_obs(next_state)
+        size, index = int(self.header[0]), int(self.header[1])
+        packing = self.packing
+        record = self.data[index]
+        record['state'] = packing.pack_obs(state)
+        record['action'] = action
+        record['reward'] = reward
+        record['next_state'] = packing.pack_obs(next_state)
+        record['legal_actions'] = packing.pack_legal_actions(legal_actions)
+        record['done'] = done
+
+        # Publish the record only once it is written
+        self.header[1] = (index + 1) % self.memory_size
+        self.header[0] = min(size + 1, self.memory_size)
+
+    def _check_obs(self, obs):
+        # Anything else would be bit-packed wrong without an error, e.g. the int8 card planes
+        obs = np.asarray(obs)
+        if obs.shape != (self.packing.obs_dim,) or obs.dtype.kind != 'f':
+            raise ValueError('Replay memory packs float vector observations of shape ({},), not {} {}'.format(
+                self.packing.obs_dim, obs.dtype, obs.shape))
+
+    def sample(self):
+        """Sample a minibatch in the format of rlcard's Memory.sample"""
+        size = len(self)
+        idx = np.sort(self.np_random.choice(size, self.batch_size, replace=False))
+        batch = self.data[idx]
+        packing = self.packing
+        return (
+            packing.unpack_obs(batch['state']),
+            batch['action'].astype(np.int64),
+            batch['reward'],
+            packing.unpack_obs(batch['next_state']),
+            batch['done'],
+            packing.unpack_legal_actions(batch['legal_actions']),
+        )
+
+    def flush(self):
+        if not self.readonly:
+            self.data.flush()
+            self.header.flush()
+
+    def checkpoint_attributes(self):
+        self.flush()
+        return {
+            'memory_size': self.memory_size,
+            'batch_size': self.batch_size,
+            'path': self.path,
+            'num_players': self.packing.num_players,
+            'hand_size': self.packing.hand_size,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint):
+        return cls(checkpoint['path'], checkpoint['memory_size'], checkpoint['batch_size'],
+                   num_players=checkpoint.get('num_players', config.N_PLAYERS),
+                   hand_size=checkpoint.get('hand_size', config.HAND_SIZE))
@@ -0,0 +1,282 @@
+import copy
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import queue
+import random
+import signal
+import traceback
+from collections import deque
+
+import numpy as np
+
+RESULT_FILE = 'result.json'
+CONFIG_FILE = 'config.json'
+
+
+def grid_search(space):
+    """Every combination of the values in space, a dict of arg -> list of values.
+
+    Values that are not lists are the same in every run; a list value such as
+    mlp_layers goes in another list.
+    """
+    names = list(space)
+    values = [space[name] if isinstance(space[name], list) else [space[name]] for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def random_search(space, num_runs, seed=0):
+    """num_runs random draws from space, the same for the same seed.
+
+    A list is a choice of values, ('uniform', low, high), ('loguniform', low, high)
+    and ('int', low, high) are ranges (both ends included), anything else is fixed.
+    """
+    rng = random.Random(seed)
+
+    def draw(value):
+        if isinstance(value, list):
+            return value[rng.randrange(len(value))]
+        if isinstance(value, tuple):
+            kind, low, high = value
+            if kind == 'uniform':
+                return rng.uniform(low, high)
+            if kind == 'loguniform':
+                return math.exp(rng.uniform(math.log(low), math.log(high)))
+            if kind == 'int':
+                return rng.randint(low, high)
+            raise ValueError('Unknown range {!r}'.format(kind))
+        return value
+
+    return [{name: draw(value) for name, value in space.items()} for _ in range(num_runs)]
+
+
+def apply_overrides(args, overrides):
+    """Copy of args with overrides set; 'agent_kwargs.learning_rate' sets a key of a nested dict."""
+    args = copy.deepcopy(args)
+    for name, value in overrides.items():
+        *parents, key = name.split('.')
+        target = args
+        for parent in parents:
+            target = target[parent]
+        if not parents and key not in target:
+            raise KeyError('Unknown argument {!r}'.format(name))
+        target[key] = value
+    return args
+
+
+class MedianStopping:
+    """Median stopping rule on evaluation curves of mean payoff.
+
+    A run is stopped at an evaluation when the average of its curve so far is
+    below the median of the averages of the other runs over the same
+    episodes. Runs get grace_evaluations evaluations first, and the rule only
+    applies once at least min_runs other runs got as far.
+    """
+
+    def __init__(self, grace_evaluations=5, min_runs=3):
+        self.grace_evaluations = grace_evaluations
+        self.min_runs = min_runs
+
+    def should_stop(self, curve, other_curves):
+        if len(curve) < max(1, self.grace_evaluations):
+            return False
+        episode = curve[-1]['episode']
+        others = [np.mean([point['mean_payoff'] for point in other if point['episode'] <= episode])
+                  for other in other_curves if other and other[-1]['episode'] >= episode]
+        if len(others) < self.min_runs:
+            return False
+        return np.mean([point['mean_payoff'] for point in curve]) < np.median(others)
+
+
+def cpu_slots(cpus_per_run=1, max_parallel=None):
+    """Disjoint CPU sets, one per concurrent run, from the CPUs this process may use"""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    num_slots = max(1, len(cpus) // cpus_per_run)
+    if max_parallel is not None:
+        num_slots = min(num_slots, max_parallel)
+    return [tuple(cpus[i * cpus_per_run:(i + 1) * cpus_per_run]) or tuple(cpus) for i in range(num_slots)]
+
+
+def load_result(run_dir):
+    path = os.path.join(run_dir, RESULT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, value):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _run(train_fn, run_dir, args, cpus, reports, stop):
+    # Ctrl-C reaches the whole process group; the scheduler stops the runs itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Pinned before the trainer starts its threads and evaluation workers, which inherit the CPUs
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(len(cpus) or 1)
+    stopped = False
+
+    def callback(curve):
+        nonlocal stopped
+        reports.put((run_dir, curve))
+        stopped = stop.is_set()
+        return stopped
+
+    try:
+        curve = train_fn(args, callback)
+    except Exception:
+        traceback.print_exc()
+        raise SystemExit(1)
+    _write_json(os.path.join(run_dir, RESULT_FILE), {'status': 'stopped' if stopped else 'done', 'curve': curve})
+
+
+class SweepScheduler:
+    """Runs train_fn(args, callback) for many args on a pool of local processes.
+
+    Each run gets its own process pinned to one of cpu_slots(cpus_per_run,
+    max_parallel), its own run directory, and a result.json there once it
+    finishes. train_fn must call callback(curve) after every evaluation (see
+    exe.train_dqn.train) and stop when it returns True: the scheduler answers
+    with the stopping rule, one evaluation late since runs do not wait for it.
+    Runs that already have a result are skipped, so a sweep interrupted or
+    with failed runs continues when started again; resuming a run halfway is
+    up to train_fn (exe.train_dqn checkpoints in the run directory).
+    """
+
+    def __init__(self, train_fn, cpus_per_run=1, max_parallel=None, stopping=None, start_method=None):
+        self.train_fn = train_fn
+        self.slots = cpu_slots(cpus_per_run, max_parallel)
+        self.stopping = stopping
+        self.ctx = mp.get_context(start_method)
+
+    def run(self, runs, poll_interval=0.5):
+        """Run a list of (run_dir, args, overrides); returns one result dict per run, in order.
+
+        Results have the run_dir, overrides, status ('done', 'stopped', 'failed'
+        or 'pending' after an interruption) and the evaluation curve.
+        """
+        results = {}
+        curves = {}
+        pending = deque()
+        for run_dir, args, overrides in runs:
+            os.makedirs(run_dir, exist_ok=True)
+            config_path = os.path.join(run_dir, CONFIG_FILE)
+            if os.path.exists(config_path):
+                with open(config_path) as f:
+                    if json.load(f) != json.loads(json.dumps(overrides)):
+                        raise ValueError('{} holds a run of different settings'.format(run_dir))
+            else:
+                _write_json(config_path, overrides)
+            result = load_result(run_dir)
+            if result is None:
+                pending.append((run_dir, args))
+            else:
+                results[run_dir] = result
+                curves[run_dir] = result['curve']
+
+        reports = self.ctx.Queue()
+        free_slots = list(self.slots)
+        running = {}  # run_dir -> (process, stop event, slot)
+        try:
+            while pending or running:
+                while pending and free_slots:
+                    run_dir, args = pending.popleft()
+                    slot = free_slots.pop(0)
+                    stop = self.ctx.Event()
+                    process = self.ctx.Process(target=_run, args=(self.train_fn, run_dir, args, slot, reports, stop))
+                    process.start()
+                    running[run_dir] = (process, stop, slot)
+                    curves[run_dir] = []
+
+                try:
+                    report = reports.get(timeout=poll_interval)
+                except queue.Empty:
+                    report = None
+                while report is not None:
+                    run_dir, curve = report
+                    if run_dir in running:
+                        curves[run_dir] = curve
+                        others = [other for name, other in curves.items() if name != run_dir]
+                        if self.stopping is not None and self.stopping.should_stop(curve, others):
+                            running[run_dir][1].set()
+                    try:
+                        report = reports.get_nowait()
+                    except queue.Empty:
+                        report = None
+
+                for run_dir, (process, stop, slot) in list(running.items()):
+                    if process.is_alive():
+                        continue
+                    process.join()
+                    del running[run_dir]
+                    free_slots.append(slot)
+                    result = load_result(run_dir)
+                    if result is None:
+                        result = {'status': 'failed', 'curve': curves[run_dir], 'exitcode': process.exitcode}
+                    results[run_dir] = result
+                    curves[run_dir] = result['curve']
+        except KeyboardInterrupt:
+            # Checkpoints are replaced atomically, so runs only lose the episodes since their last one
+            for process, _, _ in running.values():
+                process.terminate()
+            for process, _, _ in running.values():
+                process.join()
+            for run_dir in running:
+                results[run_dir] = {'status': 'pending', 'curve': curves[run_dir]}
+            for run_dir, _ in pending:
+                results[run_dir] = {'status': 'pending', 'curve': []}
+
+        return [dict(results.get(run_dir, {'status': 'pending', 'curve': []}), run_dir=run_dir, overrides=overrides)
+                for run_dir, _, overrides in runs]
+
+
+def summarize_runs(results, final_evaluations=5):
+    """One row per run, best first: status, last evaluated episode, mean payoffs, minutes and overrides.
+
+    final is the average of the last final_evaluations evaluations, which is
+    less noisy than the best one and is what the rows are sorted by.
+    """
+    rows = []
+    for result in results:
+        curve = result['curve']
+        payoffs = [point['mean_payoff'] for point in curve]
+        rows.append(dict({
+            'run': os.path.basename(result['run_dir']),
+            'status': result['status'],
+            'last_episode': curve[-1]['episode'] if curve else 0,
+            'best': max(payoffs) if payoffs else float('nan'),
+            'final': float(np.mean(payoffs[-final_evaluations:])) if payoffs else float('nan'),
+            'win_rate': curve[-1]['win_rate'] if curve else float('nan'),
+            'minutes': curve[-1]['seconds'] / 60 if curve else 0.0,
+        }, **result['overrides']))
+    # Runs without evaluations last
+    return sorted(rows, key=lambda row: math.inf if math.isnan(row['final']) else -row['final'])
+
+
+def format_table(rows):
+    """Plain text table of summarize_runs rows"""
+    if not rows:
+        return ''
+    columns = list(dict.fromkeys(name for row in rows for name in row))
+
+    def cell(value):
+        if isinstance(value, float):
+            return '{:.4g}'.format(value)
+        return str(value)
+
+    cells = [[cell(row.get(name, '')) for name in columns] for row in rows]
+    widths = [max(len(name), *(len(line[i]) for line in cells)) for i, name in enumerate(columns)]
+    lines = ['  '.join(name.rjust(width) for name, width in zip(columns, widths))]
+    lines += ['  '.join(value.rjust(width) for value, width in zip(line, widths)) for line in cells]
+    return '\n'.join(lines)